@@ -1,79 +1,448 @@
 from output_validation.risk.AttackerModelStatistics import AttackerModelStatistics
 from output_validation.risk.PrivacyModelVerifier import PrivacyModelVerifier
+from output_validation.risk.QiLattice import QiLattice
+from output_validation.risk.RiskiestClasses import RiskiestClasses
 from output_validation.utility.SummaryStatistics import SummaryStatistics
 from output_validation.utility.ClassSizes import ClassSizes
 from output_validation.utility.Distribution import Distribution
+from output_validation.utility.InformationLoss import InformationLoss
+from output_validation.utility.Contingency import Contingency
 from output_validation.utils.QiQuery import QiQuery
+from output_validation.utils.Partitioner import Partitioner
+from output_validation.utils.Hierarchy import Hierarchy
+from output_validation.utils.SuppressionMask import SuppressionMask
+from output_validation.utils.Results import Report, render, percent
+from output_validation.utils.ColumnExecutor import ColumnExecutor
+from output_validation.utils.Snapshot import Snapshot
+from output_validation.utils.Progress import Progress, ProgressReader, ValidationCancelled, DeadlineExceeded
 from output_validation.utils.Constants import *
-from output_validation.input.Simulator import getSepNaive
+from output_validation.input.Simulator import getSepNaive, getCompression, decompressingReader
+from output_validation.input.DatasetCache import DatasetCache
+from output_validation.input.ShardedDataset import ShardedDataset, isSharded, jointFrequencies
 from numpyencoder import NumpyEncoder
 from output_validation.input.Simulator import populateConfigFromFile
-import logging, time, json
+import logging, time, json, os
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import argparse
 
 class Validator:
 
-    def __init__(self, inFilePath: str, outFilePath: str, config, blindSymbol = '*'):
-        self.inDataDf, self.outDataDf = self.initializeDfs(inFilePath, outFilePath)
+    def __init__(self, inFilePath: str, outFilePath: str, config, blindSymbol = '*',
+                violationsPath: str = None, violationsSample: int = 10,
+                partitions: int = None, workers: int = None, recordRiskPath: str = None,
+                kSweep: tuple = None, qiLatticeSize: int = None, aligned: bool = False,
+                cache: DatasetCache = None, progress: Progress = None, plotSpecs: str = None,
+                columnWorkers: int = None, riskiestClasses: int = None,
+                snapshotPath: str = None, baselinePath: str = None, qiContribution: bool = False,
+                snapshotKey: bytes = None):
+        self.cache = cache
+        # Per column statistics are counted by columnWorkers processes
+        self.columnExecutor = ColumnExecutor(columnWorkers)
+        # Chart specifications are embedded if empty, written to the path otherwise
+        self.plotSpecs = plotSpecs
+        self.progress = progress if progress is not None else Progress()
+        # Several output paths are compared as candidate anonymizations of the input
+        self.outFilePaths = list(outFilePath) if isinstance(outFilePath, (list, tuple)) else [outFilePath]
+        # Directories and glob patterns of shard files are never loaded as a whole
+        self.sharded = isSharded(inFilePath) or any([isSharded(path) for path in self.outFilePaths])
+        if self.sharded and len(self.outFilePaths) > 1:
+            raise ValueError('Sharded datasets cannot be compared as output candidates.')
+        if self.sharded:
+            self.inDataDf, self.outDataDf = None, None
+        else:
+            self.inDataDf, self.outDataDf = self.initializeDfs(inFilePath, self.outFilePaths[0])
+        self.candidateDfs = [self.outDataDf] + [self.readCandidate(path) for path in self.outFilePaths[1:]]
+        self.violationsPath = violationsPath
+        self.violationsSample = violationsSample
+        self.recordRiskPath = recordRiskPath
+        self.kSweep = kSweep
+        self.qiLatticeSize = qiLatticeSize
+        self.qiContribution = qiContribution
+        self.riskiestClasses = riskiestClasses
+        # The run is stored as a snapshot and compared with an earlier one
+        self.snapshotPath = snapshotPath
+        self.baselinePath = baselinePath
+        # Violating classes are stored as HMACs under the key
+        self.snapshotKey = snapshotKey
+        self.aligned = aligned
+        self.workers = workers
         self.confMinK = self.cast(K_ANONYMITY, config[CONF_ARX][K_ANONYMITY])
         self.confMinL = self.cast(L_DIVERSITY, config[CONF_ARX][L_DIVERSITY])
+        self.samplingFraction = self.castFraction(SAMPLING_FRACTION, config[CONF_ARX].get(SAMPLING_FRACTION))
         self.qiQueryHelper = QiQuery(config[CONF_MAIN][IDENTIFYING], 
                                     config[CONF_MAIN][QUASI_IDENTIFYING],
                                     config[CONF_MAIN][SENSITIVE_ATTRIBUTES],
                                     blindSymbol)
+        self.inShards, self.outShards = (self.initializeShards(inFilePath, self.outFilePaths[0], workers)
+                                        if self.sharded else (None, None))
+        # Suppressed cells are detected once and shared by all modules
+        self.inMask = SuppressionMask(self.inDataDf, self.qiQueryHelper) if self.inDataDf is not None else None
+        self.outMask = SuppressionMask(self.outDataDf, self.qiQueryHelper) if self.outDataDf is not None else None
+        self.partitioner = Partitioner(self.qiQueryHelper, partitions, workers, progress=self.progress) if partitions else None
+        self.hierarchies = self.loadHierarchies(config)
+        self.contingencyColumns = self.parseColumnGroups(config[CONF_MAIN].get(CONTINGENCY_COLUMNS))
 
     
-    def analyzeAndValidate(self) -> str:
+    def analyzeAndValidate(self, timeBudget: float = None) -> str:
         '''Returns the collective result of risk and utility analysis as
-        a json formatted string and generates distribution and risk plots.'''
+        a json formatted string and generates distribution and risk plots.
+        With a time budget in seconds, the sections finished before the
+        deadline are returned, each marked complete, partial or skipped.'''
+        if len(self.outFilePaths) > 1:
+            return self.compareCandidates()
+
+        if self.skipsValidation():
+            return json.dumps(dict())
+
+        jsonDict = self.analyze(timeBudget).toDict()
+        return jsonDict, json.dumps(jsonDict,
+                    cls=NumpyEncoder, 
+                    indent=4, 
+                    sort_keys=True,
+                    separators=(', ', ': '))
+
+
+    def analyze(self, timeBudget: float = None) -> Report:
+        '''Returns the result of risk and utility analysis as a report of
+        raw numbers and generates distribution and risk plots. Sections run
+        from the cheapest to the most expensive, the ones not finished
+        within the optional time budget in seconds are skipped.'''
+        if len(self.outFilePaths) > 1:
+            raise ValueError('A report is computed for a single output, compare candidates with analyzeAndValidate.')
+
         start = time.time()
-        jsonDict = dict()
+        report = Report()
+        if self.skipsValidation():
+            return report
+
+        if self.sharded:
+            return self.analyzeShards(report, timeBudget)
+
+        status = report.status
+        self.progress.setDeadline(timeBudget)
+        try:
+            # The class sizes give the exact k, l and XY need a further aggregation
+            classSizes = self.runSection(None, status, EQUIVALENCE_CLASSES,
+                                        ClassSizes(self.inDataDf, self.outDataDf, self.qiQueryHelper, self.partitioner,
+                                                    self.inMask, self.outMask).computeResults)
+            summary = self.runSection(None, status, SUMMARY_STATISTICS,
+                                    SummaryStatistics(self.inDataDf, self.outDataDf, self.qiQueryHelper, self.aligned,
+                                                    self.inMask, self.outMask, self.columnExecutor).computeResults)
+            if summary is not None:
+                report.inputSummary, report.outputSummary = summary
+            if classSizes is None:
+                # The remaining sections build on the class sizes
+                status.update(dict.fromkeys([PRIVACY_VERIFICATION, ATTACK_RISKS, DISTRIBUTION_DISTANCES, PLOTS], ST_SKIPPED))
+                return report
+
+            report.inputClasses, report.outputClasses = classSizes
+            equivalenceClassStats = {EQ_INPUT: render(report.inputClasses), EQ_OUTPUT: render(report.outputClasses)}
+            trueMinK = report.outputClasses.smallest if report.outputClasses is not None else 0
+            verifier = PrivacyModelVerifier(self.confMinK, trueMinK, self.confMinL, self.outDataDf, self.qiQueryHelper,
+                                            self.violationsPath, self.violationsSample, self.partitioner, self.progress)
+            report.privacy = self.runSection(None, status, PRIVACY_VERIFICATION, verifier.computeResult, lambda: verifier.complete)
+
+            if self.riskiestClasses and self.outDataDf is not None:
+                self.runSection(report.sections, status, RISKIEST_CLASSES,
+                                RiskiestClasses(self.outDataDf, self.riskiestClasses, self.qiQueryHelper, self.progress).compute)
+
+            attackerModelStatistics = AttackerModelStatistics(self.inDataDf,
+                                                        self.outDataDf,
+                                                        self.confMinK,
+                                                        equivalenceClassStats,
+                                                        self.qiQueryHelper,
+                                                        self.samplingFraction,
+                                                        self.recordRiskPath,
+                                                        self.kSweep,
+                                                        generatePlots=False)
+            risks = self.runSection(None, status, ATTACK_RISKS, attackerModelStatistics.computeResults)
+            if risks is not None:
+                report.inputRisks, report.outputRisks = risks
+
+            if report.outputClasses is not None:
+                self.runSection(report.sections, status, INFORMATION_LOSS,
+                                lambda: InformationLoss(self.inDataDf, self.outDataDf, self.qiQueryHelper, self.hierarchies,
+                                                        equivalenceClassStats[EQ_OUTPUT], self.confMinK).compute())
+
+            if self.contingencyColumns and self.inDataDf is not None and self.outDataDf is not None:
+                self.runSection(report.sections, status, CONTINGENCY,
+                                lambda: Contingency(self.inDataDf, self.outDataDf, self.contingencyColumns).compute())
+
+            distribution = Distribution(self.inDataDf, self.outDataDf, self.qiQueryHelper, self.columnExecutor, self.hierarchies)
+            self.runSection(report.sections, status, DISTRIBUTION_DISTANCES, distribution.computeDistances)
+
+            # Subsets of at most qiLatticeSize QID, 0 for all subsets, both
+            # analyses roll up the same class size table
+            if (self.qiLatticeSize is not None or self.qiContribution) and self.outDataDf is not None:
+                lattice = QiLattice(self.outDataDf, self.confMinK, self.qiQueryHelper,
+                                    self.qiLatticeSize, self.workers, self.progress)
+                if self.qiLatticeSize is not None:
+                    self.runSection(report.sections, status, QI_LATTICE, lattice.compute, lambda: lattice.complete)
+                if self.qiContribution:
+                    self.runSection(report.sections, status, QI_CONTRIBUTION, lattice.contribution, lambda: lattice.complete)
 
+            if self.snapshotPath is not None or self.baselinePath is not None:
+                self.runSection(None, status, SNAPSHOT, lambda: self.snapshot(report, verifier))
+
+            # Generate plots to output_validation/plots/
+            def generatePlots():
+                if self.plotSpecs is not None:
+                    self.writePlotSpecs(report.sections, {**attackerModelStatistics.specs(), **distribution.specs()})
+                    return
+                attackerModelStatistics.generate()
+                distribution.generate()
+            self.runSection(None, status, PLOTS, generatePlots)
+        finally:
+            self.progress.setDeadline(None)
+            if self.partitioner is not None:
+                self.partitioner.close()
+            logging.info('Analyzed and validated output in %s seconds', time.time()-start)
+
+        return report
+
+
+    def analyzeShards(self, report: Report, timeBudget: float = None) -> Report:
+        '''Fills the report from the merged partial aggregates of sharded
+        datasets: class sizes, summary statistics, privacy models, attacker
+        model risks and distribution distances. The sections that need the
+        records themselves are skipped.'''
+        start = time.time()
+        status = report.status
+        self.progress.setDeadline(timeBudget)
+        inShards, outShards = self.inShards, self.outShards
+        try:
+            classSizes = self.runSection(None, status, EQUIVALENCE_CLASSES,
+                                        lambda: (inShards.classSizeResult() if inShards is not None else None,
+                                                outShards.classSizeResult() if outShards is not None else None))
+            summary = self.runSection(None, status, SUMMARY_STATISTICS,
+                                    lambda: (inShards.summaryResult() if inShards is not None else None,
+                                            outShards.summaryResult(inShards, True) if outShards is not None else None))
+            if summary is not None:
+                report.inputSummary, report.outputSummary = summary
+            if classSizes is not None:
+                report.inputClasses, report.outputClasses = classSizes
+                trueMinK = report.outputClasses.smallest if report.outputClasses is not None else 0
+                verifier = PrivacyModelVerifier(self.confMinK, trueMinK, self.confMinL, None, self.qiQueryHelper,
+                                                self.violationsPath, self.violationsSample, progress=self.progress,
+                                                shards=outShards)
+                report.privacy = self.runSection(None, status, PRIVACY_VERIFICATION, verifier.computeResult,
+                                                lambda: verifier.complete)
+
+                attackerModelStatistics = AttackerModelStatistics(None, None, self.confMinK,
+                                                            {EQ_INPUT: render(report.inputClasses), EQ_OUTPUT: render(report.outputClasses)},
+                                                            self.qiQueryHelper, self.samplingFraction, kSweep=self.kSweep,
+                                                            generatePlots=False)
+                risks = self.runSection(None, status, ATTACK_RISKS,
+                                        lambda: (attackerModelStatistics.computeInputResult() if inShards is not None else None,
+                                                attackerModelStatistics.computeOutputResult() if outShards is not None else None))
+                if risks is not None:
+                    report.inputRisks, report.outputRisks = risks
+
+            if inShards is not None and outShards is not None:
+                def distances():
+                    distribution = Distribution(None, None, self.qiQueryHelper, hierarchies=self.hierarchies)
+                    columns = [col for col in self.qiQueryHelper.quasiIdentifyingColumnsList + self.qiQueryHelper.sensitiveColumnsList
+                               if col in inShards.columns and col in outShards.columns]
+                    return dict([(col, distribution.columnDistances(col, values, *counts))
+                                 for col, (values, counts) in jointFrequencies([inShards, outShards], columns, asText=True).items()])
+                self.runSection(report.sections, status, DISTRIBUTION_DISTANCES, distances)
+
+            # Sections over the records themselves are not computed from shards
+            status.update(dict.fromkeys([INFORMATION_LOSS, PLOTS], ST_SKIPPED))
+        finally:
+            self.progress.setDeadline(None)
+            logging.info('Analyzed and validated sharded datasets in %s seconds', time.time()-start)
+
+        return report
+
+
+    def skipsValidation(self) -> bool:
+        '''Whether the configuration leaves nothing to validate.'''
         if not self.qiQueryHelper.quasiIdentifyingColumns:
             logging.warning('No QID columns specified. Skipped output validation.')
-            return json.dumps(jsonDict)
+            return True
 
         if self.confMinK is None and self.confMinL is None:
             logging.warning('Privacy model configuration unspecified. Skipped output validation.')
+            return True
+        return False
+
+
+    def snapshot(self, report: Report, verifier: PrivacyModelVerifier) -> None:
+        '''Writes the snapshot of the run and adds the changes since the
+        baseline snapshot to the result sections. Violating classes are
+        only kept if the privacy model verification is complete.'''
+        complete = report.privacy is not None and verifier.complete
+        snapshot = Snapshot(report, verifier.violatingClasses() if complete else None, self.snapshotKey)
+        if self.baselinePath is not None:
+            report.sections[SNAPSHOT_DIFF] = snapshot.diff(snapshot.read(self.baselinePath))
+        if self.snapshotPath is not None:
+            snapshot.write(self.snapshotPath)
+            report.sections[SNAPSHOT_FILE] = self.snapshotPath
+
+
+    def writePlotSpecs(self, sections: dict, specs: dict) -> None:
+        '''Adds the chart specifications to the result sections, or writes
+        them to a side file and refers to it.'''
+        if not self.plotSpecs:
+            sections[PLOT_SPECS] = specs
+            return
+        with open(self.plotSpecs, 'w', encoding='UTF-8') as f:
+            json.dump(specs, f, cls=NumpyEncoder)
+        sections[PLOT_SPECS_FILE] = self.plotSpecs
+        logging.info(f'Wrote {len(specs)} chart specifications to {self.plotSpecs}')
+
+
+    def runSection(self, sections: dict, status: dict, section: str, compute, complete = None):
+        '''Runs a section of the analysis and stores its result in sections
+        (unless None) and its status. A section interrupted by the deadline
+        is skipped, unless the complete function of a section returning
+        partial results tells otherwise. Returns the result, None if the
+        section was skipped.'''
+        try:
+            self.progress.stage(section)
+            result = compute()
+        except DeadlineExceeded:
+            logging.warning(f'Deadline reached. Skipped {section}.')
+            status[section] = ST_SKIPPED
+            return None
+        status[section] = ST_COMPLETE if complete is None or complete() else ST_PARTIAL
+        if sections is not None:
+            sections[section] = result
+        return result
+
+
+    def compareCandidates(self) -> tuple:
+        '''Returns the risk and utility analysis of every output candidate
+        and their ranking. The input side is analyzed once, the candidates
+        are analyzed in parallel without plots, violation side files or
+        record risk files.'''
+        start = time.time()
+        jsonDict = dict()
+
+        if self.skipsValidation():
             return json.dumps(jsonDict)
 
-        summaryStats = SummaryStatistics(self.inDataDf, self.outDataDf, self.qiQueryHelper).compute()
-        equivalenceClassStats = ClassSizes(self.inDataDf, self.outDataDf, self.qiQueryHelper).compute()
+        inputDict = dict()
+        inputEquivalenceClassStats = dict()
+        if self.inDataDf is not None:
+            self.progress.stage(CANDIDATE_INPUT)
+            inputDict[SUMMARY_STATISTICS] = SummaryStatistics(self.inDataDf, None, self.qiQueryHelper,
+                                                            inMask=self.inMask, executor=self.columnExecutor).compute()[SS_INPUT]
+            inputEquivalenceClassStats = ClassSizes(self.inDataDf, None, self.qiQueryHelper,
+                                                    inMask=self.inMask).compute()[EQ_INPUT]
+            inputDict[EQUIVALENCE_CLASSES] = inputEquivalenceClassStats
+            inputDict[ATTACK_RISKS] = AttackerModelStatistics(self.inDataDf, None, self.confMinK,
+                                                            {EQ_INPUT: inputEquivalenceClassStats}, self.qiQueryHelper,
+                                                            self.samplingFraction, kSweep=self.kSweep).computeAndGenerate()[AR_INPUT]
+        jsonDict[CANDIDATE_INPUT] = inputDict
 
-        trueMinK = 0 if not equivalenceClassStats[EQ_OUTPUT] else equivalenceClassStats[EQ_OUTPUT][EQ_SMALLEST]
-        privacyStats = PrivacyModelVerifier(self.confMinK, trueMinK, self.confMinL, self.outDataDf, self.qiQueryHelper).compute()
+        candidates = [(path, df) for path, df in zip(self.outFilePaths, self.candidateDfs) if df is not None]
+        self.progress.stage(CANDIDATES, len(candidates))
+        done = [0]
+        def analyze(candidate):
+            result = self.analyzeCandidate(candidate[1], inputEquivalenceClassStats)
+            done[0] += 1
+            self.progress.advance(CANDIDATES, done[0], len(candidates))
+            return result
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(analyze, candidates))
+        jsonDict[CANDIDATES] = dict([(path, result) for (path, _), (result, _) in zip(candidates, results)])
+        jsonDict[CANDIDATE_RANKING] = self.rankCandidates([dict(row, **{CR_CANDIDATE: path})
+                                                           for (path, _), (_, row) in zip(candidates, results)])
 
-        jsonDict[PRIVACY_VERIFICATION] = privacyStats
-        jsonDict[SUMMARY_STATISTICS] = summaryStats
-        jsonDict[EQUIVALENCE_CLASSES] = equivalenceClassStats
-    
-        attackerModelStatistics = AttackerModelStatistics(self.inDataDf,
-                                                     self.outDataDf,
-                                                     self.confMinK,
-                                                     equivalenceClassStats, 
-                                                     self.qiQueryHelper).computeAndGenerate()
-        jsonDict[ATTACK_RISKS] = attackerModelStatistics
-
-        # Generate plots to output_validation/plots/distribution/
-        Distribution(self.inDataDf, self.outDataDf, self.qiQueryHelper).generate()
-        
         spent = time.time()-start
-        logging.info('Analyzed and validated output in %s seconds', spent)
-        
+        logging.info('Analyzed and validated %s output candidates in %s seconds', len(candidates), spent)
+
         return jsonDict, json.dumps(jsonDict,
-                    cls=NumpyEncoder, 
-                    indent=4, 
+                    cls=NumpyEncoder,
+                    indent=4,
                     sort_keys=True,
                     separators=(', ', ': '))
 
 
+    def analyzeCandidate(self, outDataDf: pd.DataFrame, inputEquivalenceClassStats: dict) -> tuple:
+        '''Returns the output side analysis of one output candidate and
+        the raw values it is ranked by.'''
+        outMask = SuppressionMask(outDataDf, self.qiQueryHelper)
+        resDict = dict()
+        summary = SummaryStatistics(self.inDataDf, outDataDf, self.qiQueryHelper, self.aligned,
+                                    self.inMask, outMask, self.columnExecutor).computeOutputResult()
+        resDict[SUMMARY_STATISTICS] = summary.toDict()
+        equivalenceClassStats = ClassSizes(self.inDataDf, outDataDf, self.qiQueryHelper,
+                                            inMask=self.inMask, outMask=outMask).computeOutput()
+        resDict[EQUIVALENCE_CLASSES] = equivalenceClassStats
+        resDict[PRIVACY_VERIFICATION] = PrivacyModelVerifier(self.confMinK, equivalenceClassStats[EQ_SMALLEST], self.confMinL,
+                                                            outDataDf, self.qiQueryHelper, progress=self.progress).compute()
+        risks = AttackerModelStatistics(self.inDataDf, outDataDf, self.confMinK,
+                                        {EQ_INPUT: inputEquivalenceClassStats, EQ_OUTPUT: equivalenceClassStats},
+                                        self.qiQueryHelper, self.samplingFraction, kSweep=self.kSweep,
+                                        generatePlots=False).computeOutputResult()
+        resDict[ATTACK_RISKS] = risks.toDict()
+        resDict[ATTACK_RISKS][AR_RECORDS_AT_RISK] = percent(risks.recordsAtRisk) if risks.recordsAtRisk is not None else None
+        resDict[INFORMATION_LOSS] = InformationLoss(self.inDataDf, outDataDf, self.qiQueryHelper, self.hierarchies,
+                                                    equivalenceClassStats, self.confMinK).compute()
+        resDict[DISTRIBUTION_DISTANCES] = Distribution(self.inDataDf, outDataDf, self.qiQueryHelper,
+                                                        self.columnExecutor, self.hierarchies).computeDistances()
+
+        row = dict()
+        row[EQ_SMALLEST] = equivalenceClassStats[EQ_SMALLEST]
+        row[AR_RECORDS_AT_RISK] = risks.recordsAtRisk
+        row[IL_DISCERNIBILITY] = resDict[INFORMATION_LOSS][IL_DISCERNIBILITY]
+        if IL_TOTAL_GENILOSS in resDict[INFORMATION_LOSS]:
+            row[IL_TOTAL_GENILOSS] = resDict[INFORMATION_LOSS][IL_TOTAL_GENILOSS]
+        row[SS_TOTAL_SUP] = summary.totalSuppressed / summary.totalValues if summary.totalValues else 0.0
+        row[CR_SATISFIED] = self.satisfiesPrivacyModels(resDict[PRIVACY_VERIFICATION])
+        return resDict, row
+
+
+    def rankCandidates(self, rows: list) -> list:
+        '''Ranks the candidates by their rows of raw values: the ones
+        satisfying the configured privacy models first, then by records at
+        risk, information loss (generalized information loss if hierarchies
+        are given, discernibility otherwise) and suppressed values. The
+        fractions are rendered as percentages once ranked.'''
+        rows = sorted(rows, key=lambda row: (not row[CR_SATISFIED],
+                                             row[AR_RECORDS_AT_RISK] or 0.0,
+                                             row.get(IL_TOTAL_GENILOSS, row[IL_DISCERNIBILITY]),
+                                             row[SS_TOTAL_SUP]))
+        for rank, row in enumerate(rows, 1):
+            row[CR_RANK] = rank
+            row[AR_RECORDS_AT_RISK] = percent(row[AR_RECORDS_AT_RISK]) if row[AR_RECORDS_AT_RISK] is not None else None
+            row[SS_TOTAL_SUP] = percent(row[SS_TOTAL_SUP])
+        return rows
+
+
+    def satisfiesPrivacyModels(self, privacyStats: dict) -> bool:
+        '''Whether the configured k-anonymity and l-diversity hold.'''
+        if self.confMinK is not None and privacyStats[PR_K][0] < self.confMinK:
+            return False
+        if self.confMinL is not None and self.qiQueryHelper.sensitiveColumnsList and privacyStats[PR_L][0] < self.confMinL:
+            return False
+        return True
+
+
+    def readCandidate(self, path: str) -> pd.DataFrame:
+        '''Reads an additional output candidate, None if it cannot be read.'''
+        try:
+            return self.readCsv(path)
+        except ValidationCancelled:
+            raise
+        except Exception:
+            logging.warning(f'Output candidate {path} read failed. Skipping the candidate.')
+            return None
+
+
     def initializeDfs(self, inPath: str, outPath:str) -> tuple:
         '''Initializes input and output datasets as pandas
         dataframes for risk and utility analysis, necessary
         for operations that rely on comparison.'''
         try:
-            inDataDf = pd.read_csv(inPath, sep=getSepNaive(inPath))
+            inDataDf = self.readCsv(inPath)
+        except ValidationCancelled:
+            raise
         except:
             logging.warning('''Input data read failed. Skipping analysis for input.
             If input analysis is desired, make sure the file path was specified
@@ -81,7 +450,9 @@ class Validator:
             inDataDf = None
         
         try:
-            outDataDf = pd.read_csv(outPath, sep=getSepNaive(outPath))
+            outDataDf = self.readCsv(outPath)
+        except ValidationCancelled:
+            raise
         except:
             logging.warning('''Output data read failed. Skipping analysis for output.
             If output analysis is desired, make sure the file path was specified
@@ -95,6 +466,43 @@ class Validator:
         return inDataDf, outDataDf
 
 
+    def initializeShards(self, inPath: str, outPath: str, workers: int = None) -> tuple:
+        '''Initializes input and output datasets as sharded datasets, a
+        single file being a dataset of one shard.'''
+        shards = list()
+        for path, description in [(inPath, 'Input'), (outPath, 'Output')]:
+            try:
+                if path is None or not (isSharded(path) or os.path.isfile(path)):
+                    raise ValueError(f'No dataset found at {path}.')
+                shards.append(ShardedDataset(path, self.qiQueryHelper, workers, self.progress))
+            except ValueError:
+                logging.warning(f'{description} data read failed. Skipping analysis for {description.lower()}.')
+                shards.append(None)
+
+        if shards[0] is None and shards[1] is None:
+            raise ValueError('''Module is unable to produce meaningful output without proper input data. 
+                                Please provide either input or output data or both.''')
+        return tuple(shards)
+
+
+    def readCsv(self, path: str) -> pd.DataFrame:
+        '''Parses a dataset, or reads it from the dataset cache if one is used.'''
+        return self.parseCsv(path) if self.cache is None else self.cache.read(path, self.parseCsv)
+
+
+    def parseCsv(self, path: str) -> pd.DataFrame:
+        '''Parses a dataset, reporting the bytes parsed so far. A compressed
+        dataset is parsed as it is decompressed, its progress reported in
+        compressed bytes.'''
+        sep = getSepNaive(path)
+        self.progress.stage(LOADING, os.path.getsize(path))
+        with open(path, 'rb') as f:
+            reader = decompressingReader(ProgressReader(f, LOADING, os.path.getsize(path), self.progress), getCompression(path))
+            df = pd.read_csv(reader, sep=sep)
+        logging.info(f'Parsed {df.shape[0]} rows from {path}')
+        return df
+
+
     def cast(self, description: str, confIntstring: str) -> int:
         '''Verifies the usability of numeric values specified in configuration.'''
         try:
@@ -108,19 +516,113 @@ class Validator:
         return None
 
 
+    def castFraction(self, description: str, confFloatstring: str) -> float:
+        '''Verifies the usability of optional fractions specified in configuration.'''
+        if confFloatstring is None:
+            return None
+        try:
+            asFloat = float(confFloatstring)
+            if 0 < asFloat <= 1:
+                return asFloat
+            else:
+                logging.warning(f'Expected {description} configuration value to be in (0, 1]')
+        except ValueError:
+            logging.warning(f'Expected "{description}" configuration value to be a number string.')
+        return None
+
+
+    def loadHierarchies(self, config) -> dict:
+        '''Loads the generalization hierarchies of the QID columns listed
+        in the optional hierarchies section of the configuration.'''
+        if not config.has_section(CONF_HIERARCHIES):
+            return dict()
+        hierarchies = dict()
+        qiColumns = self.qiQueryHelper.quasiIdentifyingColumnsList
+        for col in qiColumns:
+            # Configparser keys are case insensitive
+            path = config[CONF_HIERARCHIES].get(col)
+            if path is not None:
+                hierarchies[col] = Hierarchy(path)
+        return hierarchies
+
+
+    def parseColumnGroups(self, confGroupString: str) -> list:
+        '''Parses the optional groups of columns to compare jointly,
+        groups separated by semicolons and columns by commas.'''
+        if not confGroupString:
+            return list()
+        return [[col.strip() for col in group.split(',') if col.strip()]
+                for group in confGroupString.split(';') if group.strip()]
+
+
+def kRange(value: str) -> tuple:
+    '''Parses a k-sweep range MIN:MAX of positive integers, MIN at most MAX.'''
+    parts = value.split(':')
+    try:
+        if len(parts) != 2:
+            raise ValueError
+        minK, maxK = int(parts[0]), int(parts[1])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'Expected a range MIN:MAX of integers, got {value}')
+    if not 1 <= minK <= maxK:
+        raise argparse.ArgumentTypeError(f'Expected 1 <= MIN <= MAX, got {value}')
+    return minK, maxK
+
 
 # Runner
 if __name__ == '__main__':
     logging.basicConfig()
     logging.getLogger().setLevel(logging.INFO)
     parser = argparse.ArgumentParser()
-    parser.add_argument('-i', '--input')
-    parser.add_argument('-o', '--output')
+    parser.add_argument('-i', '--input', help='Input file, or a directory or quoted glob pattern of shard files')
+    parser.add_argument('-o', '--output', nargs='+',
+                        help='Output file, or several output candidates to compare, or a directory or quoted glob pattern of shard files')
     parser.add_argument('-c', '--config', required=True)
+    parser.add_argument('-v', '--violations', help='Side file (.parquet or .csv) for privacy model violations')
+    parser.add_argument('--violations-sample', type=int, default=10)
+    parser.add_argument('-p', '--partitions', type=int, help='Compute equivalence classes in N on-disk hash partitions')
+    parser.add_argument('-w', '--workers', type=int, help='Number of partitions, QID subsets or shards processed in parallel')
+    parser.add_argument('-r', '--record-risk', help='File (.parquet or .csv) for the risk of every output record')
+    parser.add_argument('-k', '--k-sweep', type=kRange,
+                        help='Range MIN:MAX of k values to compute records at risk for')
+    parser.add_argument('-l', '--qi-lattice', type=int, nargs='?', const=0,
+                        help='Risks of attackers knowing only subsets of at most N QID (all subsets if N is omitted)')
+    parser.add_argument('--qi-contribution', action='store_true',
+                        help='Risks of the QID without each of its columns')
+    parser.add_argument('--riskiest-classes', type=int,
+                        help='Report the N output equivalence classes with the highest risk')
+    parser.add_argument('--snapshot', help='Store a compact snapshot of the run in FILE')
+    parser.add_argument('--diff', help='Report the changes since the snapshot in FILE')
+    parser.add_argument('--snapshot-key-file', help='Store the violating classes of snapshots as HMACs under the secret key in FILE')
+    parser.add_argument('-a', '--aligned', action='store_true',
+                        help='Count changed values by comparing every output record with its input record')
+    parser.add_argument('--cache', nargs='?', const='',
+                        help='Cache parsed datasets in DIR (a temporary directory if omitted) for later runs')
+    parser.add_argument('--cache-size', type=int, default=1024, help='Size cap of the dataset cache in MiB')
+    parser.add_argument('-t', '--time-budget', type=float,
+                        help='Return the sections finished within this many seconds')
+    parser.add_argument('--column-workers', type=int,
+                        help='Number of processes counting the values of the columns')
+    parser.add_argument('--plot-specs', nargs='?', const='',
+                        help='Emit chart specifications to FILE (the json if omitted) instead of rendering plots')
     args = parser.parse_args()
     if not (args.input or args.output):
         print('Either input, output or both input and output is required!')
         print('Please specify the input file path with -i/--input and/or the output file with -o/--output')
     else:
-        validator = Validator(args.input, args.output, populateConfigFromFile(args.config))
-        print(validator.analyzeAndValidate()[1])
\ No newline at end of file
+        snapshotKey = None
+        if args.snapshot_key_file:
+            with open(args.snapshot_key_file, 'rb') as f:
+                snapshotKey = f.read().strip()
+        validator = Validator(args.input, args.output, populateConfigFromFile(args.config),
+                            violationsPath=args.violations, violationsSample=args.violations_sample,
+                            partitions=args.partitions, workers=args.workers,
+                            recordRiskPath=args.record_risk, kSweep=args.k_sweep,
+                            qiLatticeSize=args.qi_lattice, aligned=args.aligned,
+                            cache=DatasetCache(args.cache, args.cache_size << 20) if args.cache is not None else None,
+                            plotSpecs=args.plot_specs, columnWorkers=args.column_workers,
+                            riskiestClasses=args.riskiest_classes,
+                            snapshotPath=args.snapshot, baselinePath=args.diff,
+                            snapshotKey=snapshotKey,
+                            qiContribution=args.qi_contribution)
+        print(validator.analyzeAndValidate(args.time_budget)[1])
\ No newline at end of file
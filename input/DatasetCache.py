@@ -0,0 +1,147 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+import numpy as np
+import pandas as pd
+
+
+class DatasetCache:
+    '''Local cache of parsed datasets for repeated runs on the same file.
+    A dataset is stored as one NumPy array file per column: numeric columns
+    as they are, text columns as integer codes with a json dictionary of
+    the values. Entries are keyed by the path, size and modification time
+    of the source file, so a changed file is parsed again. A dataset is
+    read back into memory, numeric columns as they are and text columns
+    from their codes; nothing stays memory-mapped, as the data frame would
+    copy the arrays into its blocks anyway. Datasets with text columns
+    holding other values than strings are not cached, as they could not be
+    restored as parsed. The least recently used entries are evicted when
+    the cache outgrows its size cap.'''
+
+    META = 'meta.json'
+
+    def __init__(self, directory: str = None, maxBytes: int = 1 << 30):
+        self._directory = directory if directory else os.path.join(tempfile.gettempdir(), 'output_validation_cache')
+        self._maxBytes = maxBytes
+        os.makedirs(self._directory, exist_ok=True)
+
+
+    @property
+    def directory(self):
+        '''Directory holding the cache entries.'''
+        return self._directory
+
+
+    @property
+    def maxBytes(self):
+        '''Size cap of the cache in bytes.'''
+        return self._maxBytes
+
+
+    def read(self, path: str, parse) -> pd.DataFrame:
+        '''Returns the dataset at path from the cache, or parses it with
+        parse(path) and adds it to the cache.'''
+        entry = os.path.join(self.directory, self.key(path))
+        if os.path.isfile(os.path.join(entry, self.META)):
+            try:
+                df = self.load(entry)
+                # Modification time of the metadata marks the last use
+                os.utime(os.path.join(entry, self.META))
+                logging.info(f'Read {path} from dataset cache.')
+                return df
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f'Dataset cache entry for {path} is unreadable, parsing again: {e}')
+                shutil.rmtree(entry, ignore_errors=True)
+
+        df = parse(path)
+        if not self.cacheable(df):
+            logging.info(f'Not caching {path}, its text columns hold values other than strings.')
+            return df
+        try:
+            self.store(df, entry)
+            self.evict()
+        except OSError as e:
+            logging.warning(f'Could not cache {path}: {e}')
+        return df
+
+
+    def key(self, path: str) -> str:
+        '''Cache key of the file: a hash of its path, size and
+        modification time.'''
+        stat = os.stat(path)
+        return hashlib.sha1(f'{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}'.encode('utf-8')).hexdigest()
+
+
+    def cacheable(self, df: pd.DataFrame) -> bool:
+        '''Whether every value of the text columns of df is a string or
+        missing, i.e. the columns are restored from the cache as parsed.'''
+        for col in df.columns:
+            if df[col].dtype == object:
+                values = df[col].dropna()
+                if not values.map(type).eq(str).all():
+                    return False
+        return True
+
+
+    def store(self, df: pd.DataFrame, entry: str) -> None:
+        '''Writes the columns of df to the entry directory. The entry
+        is written next to its final location and moved in place, so
+        concurrent readers never see a partial entry.'''
+        tmpEntry = tempfile.mkdtemp(dir=self.directory)
+        columns = list()
+        for i, col in enumerate(df.columns):
+            fileName = f'{i}.npy'
+            if df[col].dtype == object:
+                codes, values = pd.factorize(df[col])
+                np.save(os.path.join(tmpEntry, fileName), codes.astype(np.int32))
+                columns.append({'name': col, 'file': fileName, 'values': list(values)})
+            else:
+                np.save(os.path.join(tmpEntry, fileName), df[col].to_numpy())
+                columns.append({'name': col, 'file': fileName})
+        with open(os.path.join(tmpEntry, self.META), 'w', encoding='UTF-8') as f:
+            json.dump({'rows': df.shape[0], 'columns': columns}, f)
+        try:
+            os.replace(tmpEntry, entry)
+        except OSError:
+            # Another run cached the same file meanwhile
+            shutil.rmtree(tmpEntry, ignore_errors=True)
+
+
+    def load(self, entry: str) -> pd.DataFrame:
+        '''Reads a dataset from the entry directory.'''
+        with open(os.path.join(entry, self.META), 'r', encoding='UTF-8') as f:
+            meta = json.load(f)
+        data = dict()
+        for column in meta['columns']:
+            array = np.load(os.path.join(entry, column['file']), allow_pickle=False)
+            if 'values' in column:
+                # Code -1 marks missing values
+                values = np.array(column['values'] + [np.nan], dtype=object)
+                data[column['name']] = values[array]
+            else:
+                data[column['name']] = array
+        return pd.DataFrame(data, columns=[column['name'] for column in meta['columns']])
+
+
+    def evict(self) -> None:
+        '''Removes the least recently used entries until the cache
+        fits its size cap.'''
+        entries = list()
+        for name in os.listdir(self.directory):
+            entry = os.path.join(self.directory, name)
+            meta = os.path.join(entry, self.META)
+            if not os.path.isfile(meta):
+                continue
+            size = sum([os.path.getsize(os.path.join(entry, fileName)) for fileName in os.listdir(entry)])
+            entries.append((os.path.getmtime(meta), size, entry))
+
+        total = sum([size for _, size, _ in entries])
+        for _, size, entry in sorted(entries):
+            if total <= self.maxBytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            logging.info(f'Evicted {entry} from dataset cache.')
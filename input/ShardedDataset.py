@@ -0,0 +1,297 @@
+import os
+import glob
+import logging
+import duckdb
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from output_validation.utils import QiQuery
+from output_validation.utils.Constants import *
+from output_validation.utils.Progress import Progress
+from output_validation.utils.Results import ClassSizeResult, SummaryResult
+from output_validation.input.Simulator import getSepNaive, getCompression
+
+
+# Files of a shard directory, text shards possibly compressed
+SHARD_SUFFIXES = tuple([suffix + compressed for suffix in ('.csv', '.tsv', '.txt')
+                        for compressed in ('', '.gz', '.zst')]) + ('.parquet',)
+# Row ids of a shard are offset by the shard number times this, so the
+# first occurrence of a value is ordered by shard, then by row
+SHARD_OFFSET = 1 << 40
+
+
+def isSharded(path: str) -> bool:
+    '''Whether the path is a directory or a glob pattern of shard files.'''
+    return path is not None and (os.path.isdir(path) or any([char in path for char in '*?[']))
+
+
+def shardPaths(path: str) -> list:
+    '''Returns the shard files, in name order, of a directory (its csv,
+    compressed csv and parquet files) or of a glob pattern.'''
+    if os.path.isdir(path):
+        paths = [os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith(SHARD_SUFFIXES)]
+    else:
+        paths = [match for match in glob.glob(path) if os.path.isfile(match)]
+    if not paths:
+        raise ValueError(f'No shard files found at {path}.')
+    return sorted(paths)
+
+
+def jointFrequencies(datasets: list, columns: list, asText: bool = False) -> dict:
+    '''Frequency tables of the columns of several sharded datasets in the
+    layout of ColumnExecutor.frequencies: the values of every column and,
+    for every dataset, the counts of the values with the number of
+    missing values last, None if the dataset does not have the column.
+    As text, missing values are counted as the value 'nan'.'''
+    def counted(dataset, col):
+        if dataset is None or col not in dataset.frequencies():
+            return None
+        counts = dict()
+        for value, count in dataset.frequencies()[col]:
+            value = 'nan' if asText and value is None else value
+            counts[value] = counts.get(value, 0) + count
+        return counts
+
+    resDict = dict()
+    for col in columns:
+        tables = [counted(dataset, col) for dataset in datasets]
+        values = list(dict.fromkeys([value for table in tables if table is not None for value in table if value is not None]))
+        counts = [np.array([table.get(value, 0) for value in values] + [table.get(None, 0)], dtype=np.int64)
+                  if table is not None else None for table in tables]
+        resDict[col] = (pd.Index(values, dtype=object), counts)
+    return resDict
+
+
+class ShardedDataset:
+    '''A dataset stored as shard files, e.g. the part files of a
+    distributed job, that is never combined in memory. Every shard is
+    read into DuckDB on its own, on a pool of workers, and reduced to
+    partial aggregates: the size of every equivalence class with the
+    distinct values of the sensitive columns and the first identifying
+    column in it, and a frequency table per column. The partial
+    aggregates merge exactly, as class sizes and value counts add up and
+    distinct values are unions, so the merged aggregates are those of
+    the combined dataset. All values are read and compared as text.'''
+
+    def __init__(self,
+                path: str,
+                qiQueryHelper: QiQuery,
+                workers: int = None,
+                progress: Progress = None):
+        self._path = path
+        self._paths = shardPaths(path) if isSharded(path) else [path]
+        self._qiQueryHelper = qiQueryHelper
+        self._workers = workers if workers else os.cpu_count()
+        self._progress = progress if progress is not None else Progress()
+        self._columns = None
+        self._distinctColumns = None
+        self._classStatsDf = None
+        self._frequencies = None
+
+
+    @property
+    def path(self):
+        '''Directory, glob pattern or file the shards were found at.'''
+        return self._path
+
+
+    @property
+    def paths(self):
+        '''The shard files.'''
+        return list(self._paths)
+
+
+    @property
+    def qiQueryHelper(self):
+        '''Queryhelper attribute.'''
+        return self._qiQueryHelper
+
+
+    @property
+    def workers(self):
+        '''Number of shards reduced in parallel.'''
+        return self._workers
+
+
+    @property
+    def progress(self):
+        '''Progress reporter, checked for cancellation between shards.'''
+        return self._progress
+
+
+    @property
+    def columns(self):
+        '''Columns of the dataset, the same in every shard.'''
+        self.scan()
+        return list(self._columns)
+
+
+    @property
+    def records(self):
+        '''Number of records in all shards.'''
+        return int(self.classStatistics()[K_ANONYMITY].sum())
+
+
+    def classStatistics(self) -> pd.DataFrame:
+        '''Returns one row per equivalence class with its QID values, size
+        and, for the sensitive columns and the first identifying column of
+        the dataset, the number of distinct values in the class (missing
+        values counted as a value of their own) under the name of the
+        column. Ordered by class size.'''
+        self.scan()
+        return self._classStatsDf
+
+
+    def frequencies(self) -> dict:
+        '''Maps every column to its values (None for missing values) and
+        their counts, in the order of their first occurrence.'''
+        self.scan()
+        return self._frequencies
+
+
+    def scan(self) -> None:
+        '''Reduces every shard to its partial aggregates and merges them.
+        Every shard is read on a connection of its own, which is closed as
+        soon as the shard is reduced.'''
+        if self._classStatsDf is not None:
+            return
+        con = duckdb.connect()
+        self._columns = [row[0] for row in con.execute(f'DESCRIBE {self.shardQuery(self.paths[0])}').fetchall()]
+        con.close()
+        self._distinctColumns = [col for col in self.qiQueryHelper.sensitiveColumnsList
+                                 + self.qiQueryHelper.identifyingColumnsList[:1] if col in self._columns]
+        missing = [col for col in self.qiQueryHelper.quasiIdentifyingColumnsList if col not in self._columns]
+        if missing:
+            raise ValueError(f'QID columns {missing} not found in the shards at {self.path}.')
+
+        done = [0]
+        def reduce(i):
+            self.progress.check()
+            shardCon = duckdb.connect()
+            try:
+                res = self.reduceShard(shardCon, i)
+            finally:
+                shardCon.close()
+            done[0] += 1
+            self.progress.advance(LOADING, done[0], len(self.paths))
+            return res
+
+        self.progress.stage(LOADING, len(self.paths))
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            reduced = list(executor.map(reduce, range(len(self.paths))))
+        self._frequencies = self.mergeFrequencies(pd.concat([frequenciesDf for _, frequenciesDf in reduced], ignore_index=True))
+        self._classStatsDf = self.mergeClasses(pd.concat([classesDf for classesDf, _ in reduced], ignore_index=True))
+        logging.info(f'Reduced {len(self.paths)} shards of {self.path}')
+
+
+    def shardQuery(self, path: str) -> str:
+        '''Query reading a shard file with all columns as text.'''
+        escaped = path.replace("'", "''")
+        if path.lower().endswith('.parquet'):
+            con = duckdb.connect()
+            columns = [row[0] for row in con.execute(f'''DESCRIBE SELECT * FROM parquet_scan('{escaped}')''').fetchall()]
+            con.close()
+            casts = ', '.join([f'CAST({quoted} AS VARCHAR) AS {quoted}' for quoted in map(self.qiQueryHelper.quoteIdentifier, columns)])
+            return f'''SELECT {casts} FROM parquet_scan('{escaped}')'''
+        # DuckDB decompresses gzip and zstd shards as it reads them
+        compression = getCompression(path)
+        if compression not in (None, 'gzip', 'zstd'):
+            raise ValueError(f'Shard {path} is {compression} compressed, shards can be gzip or zstd compressed.')
+        sep = getSepNaive(path).replace("'", "''")
+        return f'''SELECT * FROM read_csv_auto('{escaped}', delim='{sep}', header=true, all_varchar=true,
+                    compression='{compression if compression else 'none'}')'''
+
+
+    def reduceShard(self, con, i: int) -> tuple:
+        '''Reads the i-th shard and reduces it to its class table and its
+        frequency table. The class table has a row with the size of every
+        class and, for every distinct column j, a row per distinct value
+        v{j} of the column in the class, with n{j} marking a missing value.'''
+        con.execute(f'CREATE TABLE shard AS {self.shardQuery(self.paths[i])}')
+        columns = [row[0] for row in con.execute('DESCRIBE shard').fetchall()]
+        if columns != self._columns:
+            raise ValueError(f'Shard {self.paths[i]} has the columns {columns}, expected {self._columns}.')
+
+        qiColumns = self.qiQueryHelper.quotedQuasiIdentifyingColumns
+        distinctColumns = list(map(self.qiQueryHelper.quoteIdentifier, self._distinctColumns))
+        def selected(j = None):
+            return ', '.join([(f'{col} AS v{k}, CASE WHEN {col} IS NULL THEN 1 ELSE 0 END AS n{k}' if k == j
+                               else f'CAST(NULL AS VARCHAR) AS v{k}, 0 AS n{k}') for k, col in enumerate(distinctColumns)])
+        parts = [f'SELECT {qiColumns}, CAST(count(*) AS BIGINT) AS {K_ANONYMITY}' + (f', {selected()}' if distinctColumns else '')
+                    + f' FROM shard GROUP BY {qiColumns}']
+        parts += [f'SELECT DISTINCT {qiColumns}, CAST(0 AS BIGINT) AS {K_ANONYMITY}, {selected(j)} FROM shard'
+                    for j in range(len(distinctColumns))]
+        classesDf = con.execute(' UNION ALL '.join(parts)).fetchdf()
+
+        counts = [f'''SELECT {j} AS col, {col} AS value, CAST(count(*) AS BIGINT) AS count, min(rowid) + {i * SHARD_OFFSET} AS first
+                        FROM shard GROUP BY {col}'''
+                  for j, col in enumerate(map(self.qiQueryHelper.quoteIdentifier, self._columns))]
+        frequenciesDf = con.execute(' UNION ALL '.join(counts)).fetchdf()
+        return classesDf, frequenciesDf
+
+
+    def mergeClasses(self, classesDf: pd.DataFrame) -> pd.DataFrame:
+        '''Merges the class tables of the shards.'''
+        qiColumns = self.qiQueryHelper.quotedQuasiIdentifyingColumns
+        aggregates = [f'CAST(sum({K_ANONYMITY}) AS BIGINT) AS {K_ANONYMITY}']
+        for j, col in enumerate(map(self.qiQueryHelper.quoteIdentifier, self._distinctColumns)):
+            aggregates.append(f'CAST(count(DISTINCT v{j}) + max(n{j}) AS BIGINT) AS {col}')
+        con = duckdb.connect()
+        con.register('classesDf', classesDf)
+        res = con.execute(f'''SELECT {qiColumns}, {', '.join(aggregates)} FROM classesDf
+                            GROUP BY {qiColumns} ORDER BY {K_ANONYMITY} ASC''').fetchdf()
+        con.close()
+        return res
+
+
+    def mergeFrequencies(self, frequenciesDf: pd.DataFrame) -> dict:
+        '''Merges the frequency tables of the shards.'''
+        con = duckdb.connect()
+        con.register('frequenciesDf', frequenciesDf)
+        rows = con.execute('''SELECT col, value, CAST(sum(count) AS BIGINT), min(first) AS first FROM frequenciesDf
+                            GROUP BY col, value ORDER BY col, first''').fetchall()
+        con.close()
+        frequencies = dict([(col, list()) for col in self._columns])
+        for j, value, count, _ in rows:
+            frequencies[self._columns[j]].append((value, int(count)))
+        return frequencies
+
+
+    def classSizeResult(self) -> ClassSizeResult:
+        '''Equivalence class statistics of the dataset.'''
+        classStatsDf = self.classStatistics()
+        if not classStatsDf.shape[0]:
+            raise RuntimeError(f'Dataset at {self.path} has no rows!')
+        qiColumns = self.qiQueryHelper.quasiIdentifyingColumnsList
+        suppressed = (classStatsDf[qiColumns] == self.qiQueryHelper.blindSymbol).all(axis=1)
+        histogram = classStatsDf.loc[~suppressed, K_ANONYMITY].value_counts()
+        return ClassSizeResult(self.records, int(classStatsDf.loc[suppressed, K_ANONYMITY].sum()),
+                               dict(sorted([(int(size), int(count)) for size, count in histogram.items()])))
+
+
+    def summaryResult(self, inputDataset = None, output: bool = False) -> SummaryResult:
+        '''Summary statistics of the dataset. For an output dataset the
+        suppressed values are counted as well and, given the input
+        dataset, the changed values.'''
+        frequencies = self.frequencies()
+        blindSymbol = self.qiQueryHelper.blindSymbol
+        distinct = dict([(col, len([value for value, _ in table if value is not None])) for col, table in frequencies.items()])
+        modes = dict()
+        for col, table in frequencies.items():
+            # Of equally frequent values, the one occurring first is the mode
+            candidates = [(value, count) for value, count in table if value is not None and value != blindSymbol]
+            candidates += [(value, count) for value, count in table if value is None]
+            value, count = max(candidates, key=lambda candidate: candidate[1]) if candidates else (blindSymbol, self.records)
+            modes[col] = [value if value is not None else np.nan, count]
+        result = SummaryResult(self.records, distinct, modes)
+        if not output:
+            return result
+
+        result.suppressed = dict([(col, dict(table).get(blindSymbol, 0)) for col, table in frequencies.items()])
+        if inputDataset is not None:
+            result.changed = dict()
+            for col, table in inputDataset.frequencies().items():
+                if col in frequencies:
+                    inputValues = dict(table)
+                    result.changed[col] = sum([count for value, count in frequencies[col] if value not in inputValues])
+        return result
@@ -1,9 +1,20 @@
 import time
 import configparser
 import os
+import bz2
+import gzip
 import logging
 
 
+# Leading bytes of the compressed formats read transparently, a bz2
+# header ends with the block size digit
+COMPRESSION_MAGIC = [(b'\x1f\x8b', 'gzip'),
+                     (tuple([b'BZh' + str(size).encode() for size in range(1, 10)]), 'bz2'),
+                     (b'\x28\xb5\x2f\xfd', 'zstd')]
+# Bytes decompressed to detect the separator
+SNIFF_BLOCK_SIZE = 1 << 16
+
+
 def populateConfigFromFile(file_name_path):
     '''Loob konfiguratsiooni objekti'''
     start = time.time()
@@ -21,12 +32,42 @@ def populateConfigFromFile(file_name_path):
     return config
 
 
+def getCompression(path):
+    '''Returns the compression of a data file detected from its leading
+    bytes, gzip, bz2 or zstd, None if the file is not compressed'''
+    with open(path, 'rb') as f:
+        head = f.read(4)
+    for magic, compression in COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def decompressingReader(f, compression):
+    '''Wraps a binary file in a reader decompressing it as it is read, so
+    a compressed file is never decompressed as a whole. zstd requires the
+    optional zstandard package'''
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=f, mode='rb')
+    if compression == 'bz2':
+        return bz2.BZ2File(f, mode='rb')
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError('Reading zstd compressed files requires the zstandard package.')
+        return zstandard.ZstdDecompressor().stream_reader(f)
+    return f
+
+
 def getSepNaive(path):
     '''Leiab ja tagastab andmefaili veergude separaatori'''
     potential_separators = ['\t', ';', ',']
-    with open(path, 'r') as f:
-        fst_line = f.readline().strip()
-        for s in potential_separators:
-            if len(fst_line.split(s)) > 1:
-                return s
+    # Only the first block of a compressed file is decompressed
+    with open(path, 'rb') as f:
+        block = decompressingReader(f, getCompression(path)).read(SNIFF_BLOCK_SIZE)
+    fst_line = block.decode('UTF-8', errors='ignore').split('\n')[0].strip()
+    for s in potential_separators:
+        if len(fst_line.split(s)) > 1:
+            return s
     raise RuntimeError('Could not detect a separator for csv file at {0}'.format(path))
\ No newline at end of file
@@ -1,8 +1,11 @@
 import pandas as pd
-import duckdb
+import numpy as np
 import logging
 from output_validation.utils import QiQuery
 from output_validation.utils.Constants import *
+from output_validation.risk.PopulationUniqueness import PopulationUniqueness
+from output_validation.risk.RecordRisk import RecordRisk
+from output_validation.utils.Results import AttackRiskResult, KSweepResult
 import plotly.graph_objects as go
 import os
 
@@ -13,7 +16,8 @@ class AttackerModelStatistics:
     '''Computation of risk probabilities imposed by
     three main attack models is implemented here in a
     simplified manner due to the assumption of our sample
-    always being equivalent to the population.'''
+    being equivalent to the population, unless a sampling
+    fraction is given for the journalist and marketer.'''
 
     def __init__(self, 
                 inDataDf: pd.DataFrame, 
@@ -21,12 +25,20 @@ class AttackerModelStatistics:
                 confMinK: int, 
                 eqClassStats: dict,
                 qiQueryHelper: QiQuery,
+                samplingFraction: float = None,
+                recordRiskPath: str = None,
+                kSweep: tuple = None,
+                generatePlots: bool = True,
                 ):
         self._inDataDf = inDataDf
         self._outDataDf = outDataDf
         self._threshold = confMinK
         self._eqClassStats = eqClassStats
         self._qiQueryHelper = qiQueryHelper
+        self._samplingFraction = samplingFraction
+        self._recordRiskPath = recordRiskPath
+        self._kSweep = kSweep
+        self._generatePlots = generatePlots
 
 
     @property
@@ -61,6 +73,35 @@ class AttackerModelStatistics:
         return self._qiQueryHelper
 
 
+    @property
+    def samplingFraction(self):
+        '''Share of the population contained in the datasets. If
+        specified, population uniqueness is estimated and the journalist
+        and marketer risks are based on the estimated population.'''
+        return self._samplingFraction
+
+
+    @property
+    def recordRiskPath(self):
+        '''File the record level risks of the output dataset are
+        written to. If specified, the record level risk distribution
+        is summarized as well.'''
+        return self._recordRiskPath
+
+
+    @property
+    def kSweep(self):
+        '''Inclusive range (smallest k, biggest k) of k values the
+        records at risk are computed for, if specified.'''
+        return self._kSweep
+
+
+    @property
+    def generatePlots(self):
+        '''Whether gauge charts are generated.'''
+        return self._generatePlots
+
+
     def computeAndGenerate(self) -> dict:
         '''Computes the risk overview and generates
         risk analysis gauge charts for both datasets.'''
@@ -70,73 +111,174 @@ class AttackerModelStatistics:
         return resDict
 
 
+    def computeResults(self) -> tuple:
+        '''Attacker model risks of the input and output datasets,
+        None for a missing dataset. No plots are generated.'''
+        return (self.computeInputResult() if self.inDataDf is not None else None,
+                self.computeOutputResult() if self.outDataDf is not None else None)
+
+
+    def generate(self) -> None:
+        '''Generates risk analysis gauge charts for both datasets,
+        for analyses computed without plots.'''
+        if self.inDataDf is not None:
+            self.generateGaugePlots(EQ_INPUT, self.getRecordsAtRisk(self.inDataDf, EQ_INPUT), IN)
+        if self.outDataDf is not None:
+            self.generateGaugePlots(EQ_OUTPUT, self.getRecordsAtRisk(self.outDataDf, EQ_OUTPUT), OUT)
+
+
     def computeInput(self) -> dict:
         '''Computes the risk overview and generates
         risk analysis gauge charts for the input dataset.'''
-        recordsAtRisk = self.getRecordsAtRisk(self.inDataDf)
-
         # Generate plots to plots/attackmodels
-        self.generateGaugePlots(EQ_INPUT, recordsAtRisk, IN)
-
-        return self.computeOverview(self.inDataDf, EQ_INPUT)
+        if self.generatePlots:
+            self.generateGaugePlots(EQ_INPUT, self.getRecordsAtRisk(self.inDataDf, EQ_INPUT), IN)
+        return self.computeInputResult().toDict()
 
     
     def computeOutput(self) -> dict:
         '''Computes the risk overview and generates
         risk analysis gauge charts for the output dataset.'''
-        recordsAtRisk = self.getRecordsAtRisk(self.outDataDf)
-
         # Generate plots to plots/attackmodels
-        self.generateGaugePlots(EQ_OUTPUT, recordsAtRisk, OUT)
-
-        return self.computeOverview(self.outDataDf, EQ_OUTPUT)
+        if self.generatePlots:
+            self.generateGaugePlots(EQ_OUTPUT, self.getRecordsAtRisk(self.outDataDf, EQ_OUTPUT), OUT)
+        return self.computeOutputResult().toDict()
+
+
+    def computeInputResult(self) -> AttackRiskResult:
+        '''Attacker model risks of the input dataset.'''
+        result = self.computeOverview(self.inDataDf, EQ_INPUT)
+        if self.samplingFraction is not None:
+            self.computePopulationUniqueness(result, EQ_INPUT)
+        if self.kSweep is not None:
+            result.kSweep = self.computeKSweep(self.inDataDf, EQ_INPUT)
+        return result
+
+
+    def computeOutputResult(self) -> AttackRiskResult:
+        '''Attacker model risks of the output dataset.'''
+        result = self.computeOverview(self.outDataDf, EQ_OUTPUT)
+        if self.samplingFraction is not None:
+            self.computePopulationUniqueness(result, EQ_OUTPUT)
+        if self.kSweep is not None:
+            result.kSweep = self.computeKSweep(self.outDataDf, EQ_OUTPUT)
+        if self.recordRiskPath is not None:
+            result.recordRisk = RecordRisk(self.outDataDf, self.eqClassStats[EQ_OUTPUT],
+                                            self.qiQueryHelper, self.recordRiskPath).compute()
+        return result
 
     
-    def computeOverview(self, df, inOut) -> dict:
+    def computeOverview(self, df, inOut) -> AttackRiskResult:
         '''Computes the risk overview for the given dataset.'''
-        overviewDict = dict()
-        overviewDict[AR_PROSECUTOR_LOWEST] = self.percentize(1.0, self.eqClassStats[inOut][EQ_BIGGEST])
-        overviewDict[AR_PROSECUTOR_AVERAGE] = self.percentize(1.0, self.eqClassStats[inOut][EQ_AVG_SUP])
-        overviewDict[AR_PROSECUTOR_HIGHEST] = self.percentize(1.0, self.eqClassStats[inOut][EQ_SMALLEST])
-        overviewDict[AR_RECORDS_AFFECTED_LOWEST] = self.computeRecordsAffectedLowest(df, inOut)
-        overviewDict[AR_RECORDS_AFFECTED_HIGHEST] = self.computeRecordsAffectedHighest(df, inOut)
-        overviewDict[AR_ESTIMATED_JOURNALIST_RISK] = self.percentize(1.0, self.eqClassStats[inOut][EQ_SMALLEST])
-        overviewDict[AR_ESTIMATED_MARKETER_RISK] = self.percentize(1.0, self.eqClassStats[inOut][EQ_AVG_SUP])
-        overviewDict = dict([(key, str(value) + ' %') for key, value in overviewDict.items()])
-        return overviewDict
+        return AttackRiskResult(1.0 / self.eqClassStats[inOut][EQ_BIGGEST],
+                                1.0 / self.eqClassStats[inOut][EQ_AVG_SUP],
+                                1.0 / self.eqClassStats[inOut][EQ_SMALLEST],
+                                self.computeRecordsAffectedLowest(df, inOut),
+                                self.computeRecordsAffectedHighest(df, inOut),
+                                recordsAtRisk=(self.recordsInClasses(df, inOut, lambda size: size < self.threshold)
+                                               if self.threshold is not None else None))
+
+
+    def computePopulationUniqueness(self, result: AttackRiskResult, inOut) -> None:
+        '''Estimates the share of population records unique with respect
+        to the QID for the given sample dataset, on which the journalist and
+        marketer risks of the result are then based.'''
+        estimator = PopulationUniqueness(self.eqClassStats[inOut][EQ_HISTOGRAM], self.samplingFraction)
+        result.population = estimator.compute()
+        result.samplingFraction = self.samplingFraction
+        result.sampleRecords = self.eqClassStats[inOut][EQ_NORECORDS]
+        result.populationUniqueness = estimator.dankar()[1]
+
+
+    def computeKSweep(self, df, inOut) -> list:
+        '''Returns the records at risk, the number of classes violating
+        k-anonymity and the number of records that would need to be suppressed
+        for every k in the sweep range, from one cumulative sum over the
+        sorted class sizes. The completely suppressed class is at risk and
+        violating if it is smaller than k, but needs no further suppression.'''
+        histogram = self.eqClassStats[inOut][EQ_HISTOGRAM]
+        suppressedClassSize = self.eqClassStats[inOut][EQ_SUPPRESSED]
+        sizes = np.array(list(histogram.keys()), dtype=np.int64)
+        counts = np.array(list(histogram.values()), dtype=np.int64)
+        cumulativeClasses = np.concatenate(([0], np.cumsum(counts)))
+        cumulativeRecords = np.concatenate(([0], np.cumsum(sizes * counts)))
+
+        sweep = list()
+        for k in range(self.kSweep[0], self.kSweep[1] + 1):
+            # Histogram sizes are sorted, the classes smaller than k precede index
+            index = int(np.searchsorted(sizes, k, side='left'))
+            suppressionNeeded = int(cumulativeRecords[index])
+            violating = int(cumulativeClasses[index])
+            atRisk = suppressionNeeded
+            if suppressedClassSize and suppressedClassSize < k:
+                violating += 1
+                atRisk += suppressedClassSize
+            sweep.append(KSweepResult(k, atRisk / self.eqClassStats[inOut][EQ_NORECORDS], violating, suppressionNeeded))
+        return sweep
 
 
     def computeProsecutorJournalistMarketerRiskPlotData(self, inOut) -> tuple:
-        '''Returns all risks for gauge plots, computed in a unified manner due
-        to the assumption that sample is equivalent to population.'''
+        '''Returns the highest risk and success rate of the prosecutor and of
+        the journalist for gauge plots. The journalist risks are those of the
+        prosecutor if the sample is assumed to be the population, otherwise
+        they are based on the estimated population, the marketer success
+        rate being the journalist one.'''
         highestRisk = self.percentize(1.0, self.eqClassStats[inOut][EQ_SMALLEST])
         successRate = self.percentize(1.0, self.eqClassStats[inOut][EQ_AVG_SUP])
-        
-        return highestRisk, successRate
+        if self.samplingFraction is None:
+            return highestRisk, successRate, highestRisk, successRate
+
+        # Only the risks are plotted, the records affected are not needed
+        risks = AttackRiskResult(1.0 / self.eqClassStats[inOut][EQ_BIGGEST], 1.0 / self.eqClassStats[inOut][EQ_AVG_SUP],
+                                 1.0 / self.eqClassStats[inOut][EQ_SMALLEST], 0.0, 0.0)
+        self.computePopulationUniqueness(risks, inOut)
+        return highestRisk, successRate, self.percentize(risks.journalistRisk, 1.0), self.percentize(risks.marketerRisk, 1.0)
 
 
     def generateGaugePlots(self, inOut, recordsAtRisk, ioName):
         '''Generates gauge charts for the given dataset.'''
-        highestRisk, successRate = self.computeProsecutorJournalistMarketerRiskPlotData(inOut)
+        for name, spec in self.gaugeSpecs(inOut, recordsAtRisk, ioName).items():
+            output_file_name = os.path.join('plots', *name.split('/')) + '.png'
+            go.Figure(spec).write_image(output_file_name)
+
+
+    def specs(self) -> dict:
+        '''Plotly figure specifications of the gauge charts of both
+        datasets, keyed like the plot files. Nothing is rendered.'''
+        specDict = dict()
+        if self.inDataDf is not None:
+            specDict.update(self.gaugeSpecs(EQ_INPUT, self.getRecordsAtRisk(self.inDataDf, EQ_INPUT), IN))
+        if self.outDataDf is not None:
+            specDict.update(self.gaugeSpecs(EQ_OUTPUT, self.getRecordsAtRisk(self.outDataDf, EQ_OUTPUT), OUT))
+        return specDict
+
+
+    def gaugeSpecs(self, inOut, recordsAtRisk, ioName) -> dict:
+        '''Returns the Plotly figure specifications of the gauge charts
+        of the given dataset.'''
+        highestRisk, successRate, journalistHighestRisk, journalistSuccessRate = \
+            self.computeProsecutorJournalistMarketerRiskPlotData(inOut)
         iterableRisks = [{AR_RECORDS_AT_RISK : recordsAtRisk,
-                         AR_HIGHEST_RISK : highestRisk,
-                         AR_SUCCESS_RATE : successRate}
-                         for i in range(3) if i < 2]
-        iterableRisks.append({AR_SUCCESS_RATE : successRate})
+                         AR_HIGHEST_RISK : highest,
+                         AR_SUCCESS_RATE : success}
+                         for highest, success in [(highestRisk, successRate), (journalistHighestRisk, journalistSuccessRate)]]
+        iterableRisks.append({AR_SUCCESS_RATE : journalistSuccessRate})
         names = ['Prosecutor', 'Journalist', 'Marketer']
 
+        specDict = dict()
         for i, d in enumerate(iterableRisks):
             for k, v in d.items():
                 k = k.lower()
-                fig = go.Figure(go.Indicator(
-                    mode = "gauge+number+delta",
-                    value = v,
-                    delta = {'reference': self.percentize(1.0, self.threshold),
-                    'increasing.color': "red", 'decreasing.color': "green"},
-                    number = {'suffix': "%"},
-                    domain = {'x': [0, 1], 'y': [0, 1]},
-                    title = {'text': names[i] + ' ' + k, 'font': {'size': 24}},
-                    gauge = {
+                indicator = {
+                    'type': 'indicator',
+                    'mode': "gauge+number+delta",
+                    'value': v,
+                    'delta': {'reference': self.percentize(1.0, self.threshold),
+                    'increasing': {'color': "red"}, 'decreasing': {'color': "green"}},
+                    'number': {'suffix': "%"},
+                    'domain': {'x': [0, 1], 'y': [0, 1]},
+                    'title': {'text': names[i] + ' ' + k, 'font': {'size': 24}},
+                    'gauge': {
                         'axis': {'range': [0, 100], 'tickwidth': 1, 'tickcolor': "black", 'ticksuffix': "%",
                         'tickmode': "array", 'tickvals' : [0, 25, 50, 75, 100]},
                         'bar': {'color': "black"},
@@ -148,55 +290,40 @@ class AttackerModelStatistics:
                             {'range': [25, 50], 'color': 'yellow'},
                             {'range': [50, 75], 'color': 'orange'},
                             {'range': [75, 100], 'color': 'red'}],
-                        }))
-                namekey = names[i] + '_' + k.replace(' ', '_') + '.png'
-                output_file_name = os.path.join('plots', 'attackmodels', ioName, namekey)
-                fig.write_image(output_file_name) 
+                        }}
+                specDict['/'.join(['attackmodels', ioName, names[i] + '_' + k.replace(' ', '_')])] = {
+                    'data': [indicator], 'layout': dict()}
+        return specDict
 
     
-    def getRecordsAtRisk(self, df) -> float:
+    def getRecordsAtRisk(self, df, inOut) -> float:
         '''Returns the percentage of records at risk
         in terms of the current provided threshold.'''
-        recordRiskQuery = duckdb.query(f'''
-                            SELECT SUM({K_ANONYMITY}) FROM
-                            (SELECT DISTINCT {self.qiQueryHelper.quasiIdentifyingColumns}, 
-                            count(*) as {K_ANONYMITY} FROM df
-                            GROUP BY {self.qiQueryHelper.quasiIdentifyingColumns}
-                            HAVING {K_ANONYMITY} < {self.threshold} 
-                            ORDER BY {K_ANONYMITY} DESC)''').fetchall()
-        return (self.percentize(recordRiskQuery[0][0], df.shape[0]) if 
-                        recordRiskQuery[0][0] is not None
-                        else 0.0)
+        return round(self.recordsInClasses(df, inOut, lambda size: size < self.threshold)*100, 3)
 
 
     def computeRecordsAffectedHighest(self, df, inOut) -> float:
-        '''Returns the percentage of records affected by the highest
+        '''Returns the fraction of records affected by the highest
         risk based on the smallest physical equivalence class.'''
-        highestRecordRiskQuery = duckdb.query(f'''
-                            SELECT SUM({K_ANONYMITY}) FROM
-                            (SELECT DISTINCT {self.qiQueryHelper.quasiIdentifyingColumns}, 
-                            count(*) as {K_ANONYMITY} FROM df
-                            GROUP BY {self.qiQueryHelper.quasiIdentifyingColumns}
-                            HAVING {K_ANONYMITY} = {self.eqClassStats[inOut][EQ_SMALLEST]} 
-                            )''').fetchall()
-        return (self.percentize(highestRecordRiskQuery[0][0], df.shape[0]) if 
-                        highestRecordRiskQuery[0][0] is not None
-                        else 0.0)
+        return self.recordsInClasses(df, inOut, lambda size: size == self.eqClassStats[inOut][EQ_SMALLEST])
 
 
     def computeRecordsAffectedLowest(self, df, inOut) -> float:
-        '''Returns the percentage of records affected by the lowest
+        '''Returns the fraction of records affected by the lowest
         risk based on the biggest physical equivalence class.'''
-        highestRecordRiskQuery = duckdb.query(f'''
-                            SELECT SUM({K_ANONYMITY}) FROM
-                            (SELECT DISTINCT {self.qiQueryHelper.quasiIdentifyingColumns}, 
-                            count(*) as {K_ANONYMITY} FROM df
-                            GROUP BY {self.qiQueryHelper.quasiIdentifyingColumns}
-                            HAVING {K_ANONYMITY} = {self.eqClassStats[inOut][EQ_BIGGEST]} 
-                            )''').fetchall()
-        return (self.percentize(highestRecordRiskQuery[0][0], df.shape[0]) if 
-                        highestRecordRiskQuery[0][0] is not None
-                        else 0.0)
+        return self.recordsInClasses(df, inOut, lambda size: size == self.eqClassStats[inOut][EQ_BIGGEST])
+
+
+    def recordsInClasses(self, df, inOut, condition) -> float:
+        '''Returns the fraction of records in equivalence classes whose
+        size meets the condition, derived from the class size histogram.
+        The completely suppressed class counts as a class of its own.'''
+        histogram = self.eqClassStats[inOut][EQ_HISTOGRAM]
+        records = sum([size * count for size, count in histogram.items() if condition(size)])
+        suppressedClassSize = self.eqClassStats[inOut][EQ_SUPPRESSED]
+        if suppressedClassSize and condition(suppressedClassSize):
+            records += suppressedClassSize
+        return records / self.eqClassStats[inOut][EQ_NORECORDS] if records else 0.0
 
 
     def percentize(self, numerator, denominator) -> float:
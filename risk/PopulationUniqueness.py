@@ -0,0 +1,232 @@
+import math
+import logging
+from output_validation.utils.Constants import *
+
+
+class PopulationUniqueness:
+    '''Estimation of the share of population records that are unique
+    with respect to the QID, for datasets that are a sample of the
+    population. All models work on the class size frequency table
+    (class size -> number of classes of that size) and the sampling
+    fraction only, so their cost is proportional to the number of
+    distinct class sizes.'''
+
+    def __init__(self, classSizeFrequencies: dict, samplingFraction: float):
+        if not 0 < samplingFraction <= 1:
+            raise ValueError(f'Expected sampling fraction to be in (0, 1], got {samplingFraction}.')
+        self._classSizeFrequencies = dict([(int(size), int(count)) for size, count in classSizeFrequencies.items() if count > 0])
+        self._samplingFraction = samplingFraction
+
+
+    @property
+    def classSizeFrequencies(self):
+        '''Class size frequency table of the sample.'''
+        return self._classSizeFrequencies
+
+
+    @property
+    def samplingFraction(self):
+        '''Share of the population contained in the sample.'''
+        return self._samplingFraction
+
+
+    @property
+    def sampleSize(self):
+        '''Number of records in the sample.'''
+        return sum([size * count for size, count in self.classSizeFrequencies.items()])
+
+
+    @property
+    def populationSize(self):
+        '''Estimated number of records in the population.'''
+        return self.sampleSize / self.samplingFraction
+
+
+    @property
+    def sampleUniques(self):
+        '''Number of classes of size one in the sample.'''
+        return self.classSizeFrequencies.get(1, 0)
+
+
+    def compute(self) -> dict:
+        '''Returns the estimated population uniqueness of all models
+        and the one chosen by the decision rule of Dankar et al.'''
+        resDict = dict()
+        resDict[AR_SAMPLING_FRACTION] = self.samplingFraction
+        resDict[AR_PITMAN] = self.asPercentString(self.pitman())
+        resDict[AR_ZAYATZ] = self.asPercentString(self.zayatz())
+        resDict[AR_SNB] = self.asPercentString(self.snb())
+        model, uniqueness = self.dankar()
+        resDict[AR_DANKAR_MODEL] = model
+        resDict[AR_DANKAR] = self.asPercentString(uniqueness)
+        return resDict
+
+
+    def dankar(self) -> tuple:
+        '''Decision rule of Dankar et al. (2012): Pitman for sampling
+        fractions up to 10 %, Zayatz otherwise or if Pitman does not
+        converge. Returns the name of the chosen model and its estimate.'''
+        if self.samplingFraction <= 0.1:
+            uniqueness = self.pitman()
+            if uniqueness is not None:
+                return AR_PITMAN, uniqueness
+        return AR_ZAYATZ, self.zayatz()
+
+
+    def zayatz(self) -> float:
+        '''Zayatz (1991): the probability of a sample unique being
+        a population unique is estimated from hypergeometric draws
+        of the observed class sizes.'''
+        if self.sampleUniques == 0:
+            return 0.0
+        n = self.sampleSize
+        N = self.populationSize
+        nrOfClasses = sum(self.classSizeFrequencies.values())
+        weights = dict([(size, count / nrOfClasses * self.hypergeometricSingle(N, size, n))
+                        for size, count in self.classSizeFrequencies.items()])
+        total = sum(weights.values())
+        if total == 0:
+            return 0.0
+        uniqueGivenUnique = weights[1] / total
+        populationUniques = uniqueGivenUnique * self.sampleUniques / self.samplingFraction
+        return min(1.0, populationUniques / N)
+
+
+    def pitman(self) -> float:
+        '''Pitman (1996) sampling formula as applied by Hoshino (2001): the
+        parameters theta and alpha are fitted by maximum likelihood, the
+        population uniques are then Gamma(theta+1)/Gamma(theta+alpha) * N^alpha.
+        Returns None if the fit does not converge.'''
+        if self.sampleUniques == 0:
+            return 0.0
+        n = self.sampleSize
+        u = sum(self.classSizeFrequencies.values())
+        if u == n or u == 1:
+            logging.info('Pitman model not applicable, all or none of the records are unique.')
+            return None
+
+        def negLogLikelihood(x):
+            theta, alpha = math.exp(x[0]), self.sigmoid(x[1])
+            # sum_{i=1}^{u-1} log(theta + i*alpha) in closed form
+            res = (u-1) * math.log(alpha) + math.lgamma(theta/alpha + u) - math.lgamma(theta/alpha + 1)
+            res -= math.lgamma(theta + n) - math.lgamma(theta + 1)
+            res += sum([count * (math.lgamma(size - alpha) - math.lgamma(1 - alpha))
+                        for size, count in self.classSizeFrequencies.items()])
+            return -res
+
+        x, converged = self.minimize(negLogLikelihood, [math.log(u), 0.0])
+        theta, alpha = math.exp(x[0]), self.sigmoid(x[1])
+        # alpha tending to 0 is the Ewens limit, for which the estimate still holds
+        if not converged or alpha > 1 - 1e-6:
+            logging.info('Pitman model did not converge.')
+            return None
+        N = self.populationSize
+        populationUniques = math.exp(math.lgamma(theta + 1) - math.lgamma(theta + alpha) + alpha * math.log(N))
+        return min(1.0, populationUniques / N)
+
+
+    def snb(self) -> float:
+        '''Shifted negative binomial model of Chen and McNulty (1998): population
+        class sizes are 1 + NegBin(k, p) and every record is sampled with the
+        sampling fraction. k and p are fitted to the observed shares of sample
+        classes of size one and two, the number of population classes follows
+        from the number of sample classes. Returns None if no fit is found.'''
+        if self.sampleUniques == 0:
+            return 0.0
+        u = sum(self.classSizeFrequencies.values())
+        r1 = self.sampleUniques / u
+        r2 = self.classSizeFrequencies.get(2, 0) / u
+
+        def squaredError(x):
+            p0, p1, p2 = self.snbSampleProbabilities(math.exp(x[0]), self.sigmoid(x[1]))
+            return ((p1 / (1-p0) - r1)**2 + (p2 / (1-p0) - r2)**2) * 1e6
+
+        x, converged = self.minimize(squaredError, [0.0, 0.0])
+        k, p = math.exp(x[0]), self.sigmoid(x[1])
+        if not converged or squaredError(x) > 1e-2:
+            logging.info('SNB model did not converge.')
+            return None
+        p0 = self.snbSampleProbabilities(k, p)[0]
+        populationClasses = u / (1-p0)
+        populationUniques = populationClasses * p**k
+        return min(1.0, populationUniques / self.populationSize)
+
+
+    def snbSampleProbabilities(self, k: float, p: float) -> tuple:
+        '''Probabilities of a population class having zero, one or two of its
+        records in the sample, from the probability generating function
+        G(z) = z * (p / (1 - qz))^k of the population class sizes.'''
+        q = 1 - p
+        w = 1 - self.samplingFraction
+        h = (p / (1 - q*w))**k
+        dh = h * k * q / (1 - q*w)
+        ddh = h * k * (k+1) * q**2 / (1 - q*w)**2
+        p0 = w * h
+        p1 = self.samplingFraction * (h + w*dh)
+        p2 = self.samplingFraction**2 * (2*dh + w*ddh) / 2
+        return min(p0, 1 - 1e-12), p1, p2
+
+
+    def hypergeometricSingle(self, N: float, size: int, n: int) -> float:
+        '''Probability of exactly one record of a population class of the
+        given size ending up in a sample of n out of N records.'''
+        if N - size < n - 1:
+            return 0.0
+        logProbability = (math.log(size) + self.logBinomial(N - size, n - 1) - self.logBinomial(N, n))
+        return math.exp(logProbability)
+
+
+    def logBinomial(self, a: float, b: float) -> float:
+        '''Logarithm of the binomial coefficient, defined for real a.'''
+        return math.lgamma(a + 1) - math.lgamma(b + 1) - math.lgamma(a - b + 1)
+
+
+    def sigmoid(self, x: float) -> float:
+        '''Maps the real line to (0, 1).'''
+        return 1 / (1 + math.exp(-x)) if x >= 0 else math.exp(x) / (1 + math.exp(x))
+
+
+    def minimize(self, func, x0: list, tolerance: float = 1e-10, maxIterations: int = 2000) -> tuple:
+        '''Two dimensional Nelder-Mead minimization. Returns the minimum
+        and whether the simplex collapsed before maxIterations.'''
+        def value(x):
+            try:
+                res = func(x)
+            except (ValueError, OverflowError, ZeroDivisionError):
+                return float('inf')
+            return res if math.isfinite(res) else float('inf')
+
+        simplex = [list(x0), [x0[0] + 1, x0[1]], [x0[0], x0[1] + 1]]
+        values = [value(x) for x in simplex]
+        for _ in range(maxIterations):
+            order = sorted(range(3), key=lambda i: values[i])
+            simplex = [simplex[i] for i in order]
+            values = [values[i] for i in order]
+            if abs(values[2] - values[0]) <= tolerance * (abs(values[0]) + tolerance) and \
+                max([abs(simplex[2][d] - simplex[0][d]) for d in range(2)]) < 1e-6:
+                return simplex[0], True
+
+            centroid = [(simplex[0][d] + simplex[1][d]) / 2 for d in range(2)]
+            reflected = [centroid[d] + (centroid[d] - simplex[2][d]) for d in range(2)]
+            reflectedValue = value(reflected)
+            if reflectedValue < values[0]:
+                expanded = [centroid[d] + 2*(centroid[d] - simplex[2][d]) for d in range(2)]
+                expandedValue = value(expanded)
+                simplex[2], values[2] = (expanded, expandedValue) if expandedValue < reflectedValue else (reflected, reflectedValue)
+            elif reflectedValue < values[1]:
+                simplex[2], values[2] = reflected, reflectedValue
+            else:
+                contracted = [centroid[d] + 0.5*(simplex[2][d] - centroid[d]) for d in range(2)]
+                contractedValue = value(contracted)
+                if contractedValue < values[2]:
+                    simplex[2], values[2] = contracted, contractedValue
+                else:
+                    for i in (1, 2):
+                        simplex[i] = [simplex[0][d] + 0.5*(simplex[i][d] - simplex[0][d]) for d in range(2)]
+                        values[i] = value(simplex[i])
+        return simplex[0], False
+
+
+    def asPercentString(self, fraction: float) -> str:
+        '''Formats an estimate like the rest of the risk overview.'''
+        return None if fraction is None else str(round(fraction*100, 3)) + ' %'
@@ -3,21 +3,42 @@ import duckdb
 import logging
 from output_validation.utils.Constants import *
 from output_validation.utils import QiQuery
+from output_validation.utils.Partitioner import Partitioner
+from output_validation.input.ShardedDataset import ShardedDataset
+from output_validation.utils.Progress import Progress, DeadlineExceeded
+from output_validation.utils.Results import PrivacyResult
 
 class PrivacyModelVerifier:
 
+    # Number of violating classes collected between progress reports
+    PROGRESS_INTERVAL = 1000
 
     def __init__(self,
                 confMinK: int,
                 trueMinK: int,
                 confMinL: int,
                 outDataDf: pd.DataFrame,
-                qiQueryHelper: QiQuery):
+                qiQueryHelper: QiQuery,
+                violationsPath: str = None,
+                violationsSample: int = 10,
+                partitioner: Partitioner = None,
+                progress: Progress = None,
+                shards: ShardedDataset = None):
         self._confMinK = confMinK
         self._trueMinK = trueMinK
         self._confMinL = confMinL
         self._outDataDf = outDataDf
         self._qiQueryHelper = qiQueryHelper
+        self._violationsPath = violationsPath
+        self._violationsSample = violationsSample
+        self._partitioner = partitioner
+        self._progress = progress if progress is not None else Progress()
+        self._shards = shards
+        self._classStatsDf = None
+        self._classCount = 0
+        self._minimums = None
+        self._bounds = dict()
+        self._complete = True
 
 
     @property
@@ -54,17 +75,209 @@ class PrivacyModelVerifier:
         return self._qiQueryHelper
 
 
+    @property
+    def violationsPath(self):
+        '''Path of the side file violating equivalence classes are
+        written to. If None, violations are embedded in the result.'''
+        return self._violationsPath
+
+
+    @property
+    def violationsSample(self):
+        '''Number of violations kept in the result when violations
+        are written to a side file.'''
+        return self._violationsSample
+
+
+    @property
+    def partitioner(self):
+        '''Hash partitioner, if equivalence classes are computed
+        partition by partition.'''
+        return self._partitioner
+
+
+    @property
+    def shards(self):
+        '''Sharded output dataset, if the equivalence classes are merged
+        from the partial aggregates of its shards instead.'''
+        return self._shards
+
+
+    @property
+    def progress(self):
+        '''Progress reporter, also checked for cancellation.'''
+        return self._progress
+
+
+    @property
+    def bounds(self):
+        '''Whether the computed k, l and XY values are exact or lower
+        bounds, the latter if the deadline was reached before the
+        equivalence classes were aggregated.'''
+        return self._bounds
+
+
+    @property
+    def complete(self):
+        '''Whether all values and violations were computed before
+        the deadline.'''
+        return self._complete
+
+
     def compute(self) -> dict:
         '''Computes privacy model values and detects
         violations.'''
-        pvmDict = dict()
+        result = self.computeResult()
+        return result.toDict() if result is not None else dict()
+
+
+    def computeResult(self) -> PrivacyResult:
+        '''Computes privacy model values and detects violations, None
+        without an output dataset. If the deadline is reached, returns
+        what was computed, with lower bounds for the missing values.'''
         if not self.qiQueryHelper.quasiIdentifyingColumns:
             raise RuntimeError('Unable to verify privacy models, quasi-identifying columns not specified.')
-        
-        if self.outDataDf is not None:
+        if self.outDataDf is None and self.shards is None:
+            return None
+
+        pvmDict = dict()
+        # The smallest class size is known from the class sizes
+        pvmDict[PR_K] = [self.trueMinK, dict()]
+        self._bounds[PR_K] = VB_EXACT
+        try:
             pvmDict[PR_K] = self.kAnonymityFindIllegal()
             pvmDict[PR_XY], pvmDict[PR_L] = self.checkLDiversityAndXYAnonymityAndFindIllegal()
-        return pvmDict
+            self._bounds[PR_L] = self._bounds[PR_XY] = VB_EXACT
+            if self.violationsPath is not None:
+                self.progress.check()
+                self.writeViolations()
+        except DeadlineExceeded:
+            logging.warning('Deadline reached during privacy model verification. Results are partial.')
+            self._complete = False
+            if PR_L not in pvmDict:
+                # Every class holds at least one value and one identifier
+                lowerBound = min(self.trueMinK, 1)
+                pvmDict[PR_L] = [lowerBound if self.sensitiveColumnsList() else 0, dict()]
+                pvmDict[PR_XY] = [lowerBound, dict()]
+                self._bounds[PR_L] = self._bounds[PR_XY] = VB_LOWER_BOUND
+        return PrivacyResult(*pvmDict[PR_K], *pvmDict[PR_L], *pvmDict[PR_XY], dict(self.bounds))
+
+
+    def equivalenceClassStatistics(self) -> pd.DataFrame:
+        '''Returns one row per equivalence class with its QID values, size,
+        number of distinct values per sensitive attribute and number of
+        distinct identifiers (if XY-anonymity is computable), ordered by
+        class size. Computed once with a single aggregation. In partitioned
+        mode only the classes violating a privacy model are kept.'''
+        if self._classStatsDf is not None:
+            return self._classStatsDf
+        self.progress.check()
+
+        query = f'{self.classStatisticsQuery()} ORDER BY {K_ANONYMITY} ASC'
+        doXYAnalysis = self.checkXYAnonymityComputable()
+
+        if self.shards is not None:
+            # The merged class table holds the distinct value counts under the column names
+            renames = dict([(col, self.lDiversityColumn(col)) for col in self.sensitiveColumnsList()])
+            if doXYAnalysis[0]:
+                renames[doXYAnalysis[1]] = XY_ANONYMITY
+            classStatsDf = self.shards.classStatistics()
+            classStatsDf = classStatsDf[self.qiQueryHelper.quasiIdentifyingColumnsList + [K_ANONYMITY] + list(renames)].rename(columns=renames)
+            self._classCount = classStatsDf.shape[0]
+            self._minimums = classStatsDf.min(numeric_only=True)
+            self._classStatsDf = classStatsDf
+            return self._classStatsDf
+
+        if self.partitioner is None or self.outDataDf.shape[0] == 0:
+            # A connection of its own, as candidates may be verified in parallel
+            con = duckdb.connect()
+            con.register('df', self.outDataDf)
+            classStatsDf = con.execute(query).fetchdf()
+            con.close()
+            self._classCount = classStatsDf.shape[0]
+            self._minimums = classStatsDf.min(numeric_only=True)
+            self._classStatsDf = classStatsDf
+            return self._classStatsDf
+
+        def reduce(con):
+            partitionDf = con.execute(query).fetchdf()
+            return (partitionDf.shape[0],
+                    partitionDf.min(numeric_only=True),
+                    partitionDf[self.violationMask(partitionDf)])
+
+        # Partitions hold disjoint classes, so class counts add up,
+        # minimums are minimums of partition minimums and the
+        # violations are the union of partition violations
+        results = self.partitioner.mapPartitions(self.outDataDf, reduce)
+        self._classCount = sum([result[0] for result in results])
+        self._minimums = pd.concat([result[1] for result in results], axis=1).min(axis=1)
+        self._classStatsDf = pd.concat([result[2] for result in results]).sort_values(K_ANONYMITY, kind='stable').reset_index(drop=True)
+        return self._classStatsDf
+
+
+    def classStatisticsQuery(self, source: str = 'df') -> str:
+        '''Returns the aggregation query of equivalenceClassStatistics over
+        the given table or table function.'''
+        aggregates = [f'count(*) as {K_ANONYMITY}']
+        # Null values are counted as a distinct value of their own
+        for col in self.sensitiveColumnsList():
+            quoted = self.qiQueryHelper.quoteIdentifier(col)
+            aggregates.append(f'''count(DISTINCT {quoted}) + max(CASE WHEN {quoted} IS NULL THEN 1 ELSE 0 END)
+                            as {self.qiQueryHelper.quoteIdentifier(self.lDiversityColumn(col))}''')
+        doXYAnalysis = self.checkXYAnonymityComputable()
+        if doXYAnalysis[0]:
+            quoted = self.qiQueryHelper.quoteIdentifier(doXYAnalysis[1])
+            aggregates.append(f'''count(DISTINCT {quoted}) + max(CASE WHEN {quoted} IS NULL THEN 1 ELSE 0 END)
+                            as {XY_ANONYMITY}''')
+        return f'''SELECT DISTINCT {self.qiQueryHelper.quotedQuasiIdentifyingColumns}, {', '.join(aggregates)} FROM {source} 
+                            GROUP BY {self.qiQueryHelper.quotedQuasiIdentifyingColumns}'''
+
+
+    def violationCondition(self) -> str:
+        '''Returns the condition marking the rows of equivalenceClassStatistics
+        violating k-anonymity, l-diversity or XY-anonymity, like violationMask.
+        The thresholds are integers from the configuration.'''
+        conditions = list()
+        if self.confMinK is not None:
+            conditions.append(f'{K_ANONYMITY} < {int(self.confMinK)}')
+            if self.checkXYAnonymityComputable()[0]:
+                conditions.append(f'{XY_ANONYMITY} < {int(self.confMinK)}')
+        if self.confMinL is not None:
+            conditions.extend([f'{self.qiQueryHelper.quoteIdentifier(self.lDiversityColumn(col))} < {int(self.confMinL)}'
+                               for col in self.sensitiveColumnsList()])
+        return ' OR '.join(conditions) or 'false'
+
+
+    def violationMask(self, classStatsDf: pd.DataFrame) -> pd.Series:
+        '''Marks the equivalence classes violating k-anonymity,
+        l-diversity or XY-anonymity.'''
+        mask = pd.Series(False, index=classStatsDf.index)
+        for modelMask in self.violationMasks(classStatsDf).values():
+            mask |= modelMask
+        return mask
+
+
+    def violationMasks(self, classStatsDf: pd.DataFrame) -> dict:
+        '''Marks the equivalence classes violating each privacy model.'''
+        masks = dict()
+        if self.confMinK is not None:
+            masks[PR_K] = classStatsDf[K_ANONYMITY] < self.confMinK
+            if XY_ANONYMITY in classStatsDf.columns:
+                masks[PR_XY] = classStatsDf[XY_ANONYMITY] < self.confMinK
+        if self.confMinL is not None and self.sensitiveColumnsList():
+            lColumns = [self.lDiversityColumn(col) for col in self.sensitiveColumnsList()]
+            masks[PR_L] = (classStatsDf[lColumns] < self.confMinL).any(axis=1)
+        return masks
+
+
+    def violatingClasses(self) -> pd.DataFrame:
+        '''Returns the QID values of the equivalence classes violating a
+        privacy model, with a column per privacy model marking whether the
+        class violates it.'''
+        classStatsDf = self.equivalenceClassStatistics()
+        masks = self.violationMasks(classStatsDf)
+        violatingDf = classStatsDf[self.qiQueryHelper.quasiIdentifyingColumnsList].assign(**masks)
+        return violatingDf[self.violationMask(classStatsDf)].reset_index(drop=True)
 
 
     # Record level k-anonymity
@@ -76,29 +289,16 @@ class PrivacyModelVerifier:
         all combinations of QID that violate the k-anonymity privacy model
         imposed by the configuration file.'''
 
-        df = self.outDataDf
         if self.trueMinK >= self.confMinK:
             logging.info('Minimum record level k-anonymity is guaranteed. Skipping violation detection.')
             return [self.trueMinK, dict()]
         
         logging.info('Minimum record level k-anonymity is violated. Gathering violating QID.')
-        violations = dict()
-        eqClassesSizesDf = duckdb.query(f'''SELECT DISTINCT {self.qiQueryHelper.quasiIdentifyingColumns}, count(*) as {K_ANONYMITY} FROM df 
-                            GROUP BY {self.qiQueryHelper.quasiIdentifyingColumns} ORDER BY {K_ANONYMITY} ASC''').to_df()
-        i = 0
-        rowdict = dict(eqClassesSizesDf.iloc[i])
-        while int(rowdict[K_ANONYMITY]) < self.confMinK:
-            local_k = rowdict[K_ANONYMITY]
-            rowdict.pop(K_ANONYMITY, None)
-            clause = self.qiQueryHelper.dictToQueryString(self.qiQueryHelper.AND, ' = ', rowdict)
-            violations[clause] = local_k
-            i += 1
-            try:
-                rowdict = dict(eqClassesSizesDf.iloc[i])
-            except:
-                logging.warning('All equivalence classes violate K!')
-                break
-        return [self.trueMinK, violations]
+        eqClassesSizesDf = self.equivalenceClassStatistics()
+        violatingDf = eqClassesSizesDf[eqClassesSizesDf[K_ANONYMITY] < self.confMinK]
+        if violatingDf.shape[0] == self._classCount:
+            logging.warning('All equivalence classes violate K!')
+        return [self.trueMinK, self.collectViolations(violatingDf, lambda row: row[K_ANONYMITY], PR_K)]
 
 
     # Equivalence class level l-diversity
@@ -107,52 +307,103 @@ class PrivacyModelVerifier:
         and all cominations of QID that violate the l-diversity privacy model
         imposed by the configuration file.'''
 
-        df = self.outDataDf
-        eqClassesSizesDf = duckdb.query(f'''SELECT DISTINCT {self.qiQueryHelper.quasiIdentifyingColumns}, count(*) as {K_ANONYMITY} FROM df 
-                            GROUP BY {self.qiQueryHelper.quasiIdentifyingColumns} ORDER BY {K_ANONYMITY} ASC''').to_df()
-        resdictL = dict()
-        lResult = [0, resdictL]
+        eqClassesSizesDf = self.equivalenceClassStatistics()
+        lResult = [0, dict()]
+        xyResult = [self.trueMinK, dict()]
 
-        XYViolations = dict()
+        sensitiveColumns = self.sensitiveColumnsList()
+        if sensitiveColumns and self._classCount > 0:
+            lColumns = [self.lDiversityColumn(col) for col in sensitiveColumns]
+            lResult[0] = int(self._minimums[lColumns].min())
+            if self.confMinL is not None:
+                violatingDf = eqClassesSizesDf[(eqClassesSizesDf[lColumns] < self.confMinL).any(axis=1)]
+                lResult[1] = self.collectViolations(violatingDf,
+                                lambda row: dict([(col, row[self.lDiversityColumn(col)]) for col in sensitiveColumns 
+                                                    if row[self.lDiversityColumn(col)] < self.confMinL]), PR_L)
 
-        doXYAnalysis = self.checkXYAnonymityComputable()
-        xyResult = [self.trueMinK, dict()]
+        if XY_ANONYMITY in eqClassesSizesDf.columns and self.confMinK is not None:
+            violatingDf = eqClassesSizesDf[eqClassesSizesDf[XY_ANONYMITY] < self.confMinK]
+            if violatingDf.shape[0] > 0:
+                xyResult = [int(self._minimums[XY_ANONYMITY]),
+                            self.collectViolations(violatingDf, lambda row: row[XY_ANONYMITY], PR_XY)]
 
-        i = 0
-        trueMinL = float('inf')
-        trueMinXY = float('inf')
-        while i < eqClassesSizesDf.shape[0]:
-            rowdict = dict(eqClassesSizesDf.iloc[i])
-            rowdict.pop(K_ANONYMITY, None)
-            clause = self.qiQueryHelper.dictToQueryString(self.qiQueryHelper.AND, ' = ', rowdict)
-            eqclassdf = duckdb.query(f'''SELECT * FROM df WHERE {clause}''').to_df()
-            
-            # Calculate L and violations
-            if self.qiQueryHelper.sensitiveColumns:
-                currdictL = dict()
-                for col in self.qiQueryHelper.commaSeparatedColumnsAsList(self.qiQueryHelper.sensitiveColumns):
-                    currunique = len(list(eqclassdf[col].unique()))
-                    trueMinL = min(trueMinL, currunique)
-                    if currunique < self.confMinL:
-                        currdictL[col] = currunique
-                if currdictL:
-                    resdictL[clause] = currdictL
-
-            # Calculate XY and violations
-            if doXYAnalysis[0]:
-                unique = len(list(eqclassdf[doXYAnalysis[1]].unique()))
-                trueMinXY = min(trueMinXY, unique)
-                if unique < self.confMinK:
-                    XYViolations[clause] = unique
+        return [xyResult, lResult]
 
-            i += 1
 
-        if XYViolations:
-            xyResult = [trueMinXY, XYViolations]
-        if self.qiQueryHelper.sensitiveColumns and trueMinL < float('inf'):
-            lResult[0] = trueMinL
+    def collectViolations(self, violatingDf: pd.DataFrame, valueOf, stage: str = PRIVACY_VERIFICATION) -> dict:
+        '''Maps the QID combination of every violating equivalence class
+        to the violated value. If violations are written to a side file,
+        returns the number of violations with a sample of them instead.
+        Progress is reported per class under the given stage. If the
+        deadline is reached, the violations collected so far are kept.'''
+        sampleDf = violatingDf if self.violationsPath is None else violatingDf.head(self.violationsSample)
+        violations = dict()
+        try:
+            for i, row in enumerate(sampleDf.itertuples(index=False, name=None)):
+                if i % self.PROGRESS_INTERVAL == 0:
+                    self.progress.advance(stage, i, sampleDf.shape[0])
+                rowdict = dict(zip(sampleDf.columns, row))
+                violations[self.classClause(rowdict)] = valueOf(rowdict)
+            self.progress.advance(stage, sampleDf.shape[0], sampleDf.shape[0])
+        except DeadlineExceeded:
+            logging.warning(f'Deadline reached, collected {len(violations)} of {sampleDf.shape[0]} violations.')
+            self._complete = False
 
-        return [xyResult, lResult]
+        if self.violationsPath is None:
+            return violations
+        return {PR_VIOLATION_COUNT: violatingDf.shape[0],
+                PR_VIOLATION_SAMPLE: violations,
+                PR_VIOLATION_FILE: self.violationsPath}
+
+
+    def writeViolations(self) -> None:
+        '''Streams all equivalence classes violating k-anonymity, l-diversity
+        or XY-anonymity to the side file, one row per class, ordered by class
+        size. The classes are aggregated and filtered by DuckDB while it
+        writes the file (partition by partition in partitioned mode), only
+        merged shard classes are already in memory. Parquet is used if the
+        path ends with .parquet, csv otherwise.'''
+        condition = self.violationCondition()
+        con = duckdb.connect()
+        if self.shards is not None:
+            con.register('classes', self.equivalenceClassStatistics())
+            classes = 'SELECT * FROM classes'
+        elif self.partitioner is not None and self.outDataDf.shape[0] > 0:
+            # Partitions hold disjoint classes, so every one is aggregated on its own
+            classes = ' UNION ALL '.join([self.classStatisticsQuery("parquet_scan('{}')".format(partitionPath.replace("'", "''")))
+                                          for partitionPath in self.partitioner.partition(self.outDataDf)])
+        else:
+            con.register('df', self.outDataDf)
+            classes = self.classStatisticsQuery()
+
+        fileFormat = 'FORMAT PARQUET' if self.violationsPath.lower().endswith('.parquet') else 'FORMAT CSV, HEADER'
+        path = self.violationsPath.replace("'", "''")
+        con.execute(f'''COPY (SELECT * FROM ({classes}) classes WHERE {condition} ORDER BY {K_ANONYMITY} ASC)
+                        TO '{path}' ({fileFormat})''')
+        con.close()
+        logging.info(f'Wrote privacy model violations to {self.violationsPath}')
+
+
+    def classClause(self, rowdict: dict) -> str:
+        '''Returns the where condition matching the equivalence class
+        of a row of equivalenceClassStatistics.'''
+        qiDict = dict([(key, value) for key, value in rowdict.items() if key not in self.aggregateColumns()])
+        return self.qiQueryHelper.dictToQueryString(self.qiQueryHelper.AND, ' = ', qiDict)
+
+
+    def aggregateColumns(self) -> list:
+        '''Names of the computed columns in equivalenceClassStatistics.'''
+        return [K_ANONYMITY, XY_ANONYMITY] + [self.lDiversityColumn(col) for col in self.sensitiveColumnsList()]
+
+
+    def sensitiveColumnsList(self) -> list:
+        '''The sensitive columns as a list.'''
+        return self.qiQueryHelper.sensitiveColumnsList
+
+
+    def lDiversityColumn(self, col: str) -> str:
+        '''Name of the column holding the l value of a sensitive attribute.'''
+        return f'{L_DIVERSITY}_{col}'
 
 
     # Individual level k-anonymity (requires non-suppressed identifying column)
@@ -160,18 +411,16 @@ class PrivacyModelVerifier:
         '''Runs all necessary checks to verify whether or not
         computing (X, Y)-anonymization violations is feasible.'''
         
-        identifyingColumns = self.qiQueryHelper.commaSeparatedColumnsAsList(self.qiQueryHelper.identifyingColumns)
+        identifyingColumns = self.qiQueryHelper.identifyingColumnsList
         if not identifyingColumns:
             logging.info('Unable to calculate individual level k-anonymity, missing identifying column.')
             return False, None
         # Only need one, take first
         identifyingColumn = identifyingColumns[0]
 
-        df = self.outDataDf
-        distinctIdCount = duckdb.query(f'''SELECT count(DISTINCT {identifyingColumn}) FROM df''').fetchall()
-        if distinctIdCount and distinctIdCount[0][0] > 0:
-            distinctIdCount = distinctIdCount[0][0]
-            if distinctIdCount == df.shape[0]:
+        distinctIdCount, records = self.identifierCounts(identifyingColumn)
+        if distinctIdCount:
+            if distinctIdCount == records:
                 logging.info('Record level k-anonymity is equal to individual level, as all identifying attributes are unique.')
                 return False, None
         else:
@@ -180,4 +429,19 @@ class PrivacyModelVerifier:
                         identifying attribute contains null values.''')
             return False, None
         
-        return True, identifyingColumn
\ No newline at end of file
+        return True, identifyingColumn
+
+
+    def identifierCounts(self, identifyingColumn: str) -> tuple:
+        '''Number of distinct identifiers, missing identifiers not counted,
+        and the number of records of the output dataset.'''
+        if self.shards is not None:
+            values = self.shards.frequencies().get(identifyingColumn, list())
+            return len([value for value, _ in values if value is not None]), self.shards.records
+
+        df = self.outDataDf
+        con = duckdb.connect()
+        con.register('df', df)
+        distinctIdCount = con.execute(f'''SELECT count(DISTINCT {self.qiQueryHelper.quoteIdentifier(identifyingColumn)}) FROM df''').fetchall()
+        con.close()
+        return (distinctIdCount[0][0] if distinctIdCount else 0), df.shape[0]
\ No newline at end of file
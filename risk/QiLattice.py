@@ -0,0 +1,200 @@
+import os
+import itertools
+import duckdb
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from output_validation.utils import QiQuery
+from output_validation.utils.Progress import Progress, DeadlineExceeded
+from output_validation.utils.Constants import *
+from output_validation.utils.Results import percent
+
+
+class QiLattice:
+    '''Risk of attackers knowing only some of the QID. The equivalence
+    classes of every subset of the QID are rolled up from the class sizes
+    of the full QID, which requires a single scan of the dataset. The
+    subsets are then aggregated in parallel over the (much smaller)
+    class size table.'''
+
+    def __init__(self,
+                df: pd.DataFrame,
+                confMinK: int,
+                qiQueryHelper: QiQuery,
+                maxSubsetSize: int = None,
+                workers: int = None,
+                progress: Progress = None):
+        self._df = df
+        self._confMinK = confMinK
+        self._qiQueryHelper = qiQueryHelper
+        self._maxSubsetSize = maxSubsetSize
+        self._workers = workers if workers else os.cpu_count()
+        self._progress = progress if progress is not None else Progress()
+        self._complete = True
+        self._classesDf = None
+
+
+    @property
+    def df(self):
+        '''The dataset.'''
+        return self._df
+
+
+    @property
+    def confMinK(self):
+        '''The minimum k-anonymity threshold specified
+        in the configuration file.'''
+        return self._confMinK
+
+
+    @property
+    def qiQueryHelper(self):
+        '''Queryhelper attribute.'''
+        return self._qiQueryHelper
+
+
+    @property
+    def maxSubsetSize(self):
+        '''Biggest QID subset analyzed, all subsets if None.'''
+        return self._maxSubsetSize
+
+
+    @property
+    def workers(self):
+        '''Number of subsets aggregated in parallel.'''
+        return self._workers
+
+
+    @property
+    def progress(self):
+        '''Progress reporter, also checked for cancellation.'''
+        return self._progress
+
+
+    @property
+    def complete(self):
+        '''Whether all subsets of the last analysis were aggregated
+        before the deadline.'''
+        return self._complete
+
+
+    def compute(self) -> list:
+        '''Returns the smallest equivalence class size, the number of classes
+        and the records at risk for every QID subset, ordered by subset size.
+        Subsets not reached before the deadline are left out.'''
+        qiColumns = self.qiQueryHelper.quasiIdentifyingColumnsList
+        maxSubsetSize = len(qiColumns) if not self.maxSubsetSize else min(self.maxSubsetSize, len(qiColumns))
+        subsets = [list(subset) for size in range(1, maxSubsetSize + 1) for subset in itertools.combinations(qiColumns, size)]
+
+        results = self.rollUp(subsets, QI_LATTICE)
+        self._complete = None not in results
+        return [self.subsetStatistics(subset, aggregates) for subset, aggregates in zip(subsets, results) if aggregates is not None]
+
+
+    def contribution(self) -> dict:
+        '''Returns the smallest equivalence class size, the records at risk
+        and the number of unique records of the full QID and, for every QID
+        column, of the QID without that column with the changes this makes.
+        Generalizing a column to a single value gives the same classes as
+        leaving it out. The column leaving out which removes the most unique
+        records (then records at risk) is the most identifying one. Columns
+        not reached before the deadline are left out.'''
+        qiColumns = self.qiQueryHelper.quasiIdentifyingColumnsList
+        subsets = [qiColumns] + [[other for other in qiColumns if other != col] for col in qiColumns]
+        results = self.rollUp(subsets, QI_CONTRIBUTION)
+        self._complete = None not in results
+        if results[0] is None:
+            return dict()
+
+        full = self.riskStatistics(results[0])
+        leftOut = dict()
+        for col, aggregates in zip(qiColumns, results[1:]):
+            if aggregates is None:
+                continue
+            leftOut[col] = self.riskStatistics(aggregates)
+            leftOut[col][CN_CHANGE] = {EQ_SMALLEST: leftOut[col][EQ_SMALLEST] - full[EQ_SMALLEST],
+                                        AR_RECORDS_AT_RISK: percent((aggregates[2] - results[0][2]) / results[0][3] if results[0][3] else 0.0),
+                                        CN_UNIQUE_RECORDS: leftOut[col][CN_UNIQUE_RECORDS] - full[CN_UNIQUE_RECORDS]}
+
+        resDict = {CN_ALL: full, CN_LEFT_OUT: leftOut}
+        if leftOut:
+            resDict[CN_MOST_IDENTIFYING] = min(leftOut, key=lambda col: (leftOut[col][CN_CHANGE][CN_UNIQUE_RECORDS],
+                                                                        results[1 + qiColumns.index(col)][2]))
+        return resDict
+
+
+    def classSizes(self) -> pd.DataFrame:
+        '''Returns the class size table of the full QID, computed
+        with a single scan of the dataset.'''
+        if self._classesDf is None:
+            df = self.df
+            self._classesDf = duckdb.query(f'''SELECT {self.qiQueryHelper.quotedQuasiIdentifyingColumns}, count(*) as {K_ANONYMITY} FROM df
+                            GROUP BY {self.qiQueryHelper.quotedQuasiIdentifyingColumns}''').to_df()
+        return self._classesDf
+
+
+    def rollUp(self, subsets: list, stage: str) -> list:
+        '''Aggregates the class size table to the classes of every QID
+        subset in parallel. Returns the aggregates of every subset, None
+        for the subsets not reached before the deadline.'''
+        classesDf = self.classSizes()
+
+        done = [0]
+        def aggregate(subset):
+            try:
+                self.progress.check()
+            except DeadlineExceeded:
+                return None
+            con = duckdb.connect()
+            con.register('classesDf', classesDf)
+            res = self.subsetAggregates(con, subset)
+            con.close()
+            done[0] += 1
+            try:
+                self.progress.advance(stage, done[0], len(subsets))
+            except DeadlineExceeded:
+                pass
+            return res
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(aggregate, subsets))
+
+
+    def subsetAggregates(self, con, subset: list) -> tuple:
+        '''Aggregates the class size table of the full QID registered as
+        classesDf in the connection to the classes of the QID subset. Returns
+        the smallest class size (not counting the completely suppressed
+        class), the number of classes, the records at risk, the number of
+        records and the number of unique records. Without columns, all
+        records are in one class.'''
+        columns = ', '.join([self.qiQueryHelper.quoteIdentifier(col) for col in subset])
+        classes = f'SELECT {columns}, sum({K_ANONYMITY}) AS {K_ANONYMITY} FROM classesDf GROUP BY {columns}' if subset \
+                    else f'SELECT sum({K_ANONYMITY}) AS {K_ANONYMITY} FROM classesDf'
+        # Comparing as text avoids type errors in numeric columns
+        noBlind = self.qiQueryHelper.parameterizedCondition(self.qiQueryHelper.OR, 'IS DISTINCT FROM', subset, 'CAST({} AS VARCHAR)')
+        atRisk = f'{K_ANONYMITY} < {self.confMinK}' if self.confMinK is not None else 'false'
+        stats = con.execute(f'''SELECT min(CASE WHEN {noBlind} THEN {K_ANONYMITY} END),
+                                count(*),
+                                sum(CASE WHEN {atRisk} THEN {K_ANONYMITY} ELSE 0 END),
+                                sum({K_ANONYMITY}),
+                                sum(CASE WHEN ({noBlind}) AND {K_ANONYMITY} = 1 THEN 1 ELSE 0 END)
+                            FROM ({classes})''',
+                            [self.qiQueryHelper.blindSymbol] * len(subset) * 2).fetchall()[0]
+        return (int(stats[0]) if stats[0] is not None else 0, int(stats[1]),
+                int(stats[2] or 0), int(stats[3] or 0), int(stats[4] or 0))
+
+
+    def subsetStatistics(self, subset: list, aggregates: tuple) -> dict:
+        '''Formats the aggregates of a QID subset as a lattice entry.'''
+        resDict = dict()
+        resDict[LT_SUBSET] = subset
+        resDict[EQ_SMALLEST] = aggregates[0]
+        resDict[EQ_NOCLASSES] = aggregates[1]
+        resDict[AR_RECORDS_AT_RISK] = percent(aggregates[2] / aggregates[3] if aggregates[3] else 0.0)
+        return resDict
+
+
+    def riskStatistics(self, aggregates: tuple) -> dict:
+        '''Formats the aggregates of a QID subset as a contribution entry.'''
+        return {EQ_SMALLEST: aggregates[0],
+                AR_RECORDS_AT_RISK: percent(aggregates[2] / aggregates[3] if aggregates[3] else 0.0),
+                CN_UNIQUE_RECORDS: aggregates[4]}
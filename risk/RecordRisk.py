@@ -0,0 +1,144 @@
+import logging
+import duckdb
+import numpy as np
+import pandas as pd
+from output_validation.utils import QiQuery
+from output_validation.utils.Constants import *
+
+
+class RecordRisk:
+    '''Record level prosecutor risk, i.e. one divided by the size
+    of the equivalence class of the record. The full risk vector is
+    streamed to a file by DuckDB, while its summary is derived from
+    the class size histogram, as every record of a class of size s
+    has the risk 1/s. Memory use therefore does not depend on the
+    number of records.'''
+
+    PERCENTILES = [50, 90, 99]
+    # Upper bounds of the risk bands, the last band includes 1
+    BANDS = [0.05, 0.1, 0.2, 0.5, 1.0]
+
+    def __init__(self,
+                df: pd.DataFrame,
+                eqClassStats: dict,
+                qiQueryHelper: QiQuery,
+                path: str = None):
+        self._df = df
+        self._eqClassStats = eqClassStats
+        self._qiQueryHelper = qiQueryHelper
+        self._path = path
+
+
+    @property
+    def df(self):
+        '''The dataset.'''
+        return self._df
+
+
+    @property
+    def eqClassStats(self):
+        '''Result of the module ClassSizes.py for the dataset.'''
+        return self._eqClassStats
+
+
+    @property
+    def qiQueryHelper(self):
+        '''Queryhelper attribute.'''
+        return self._qiQueryHelper
+
+
+    @property
+    def path(self):
+        '''File the risk vector is written to (parquet if the
+        path ends with .parquet, csv otherwise).'''
+        return self._path
+
+
+    def compute(self) -> dict:
+        '''Writes the risk vector, if a path is given, and returns
+        its percentiles and distribution over risk bands.'''
+        riskDict = dict()
+        riskDict[AR_PERCENTILES] = self.percentiles()
+        riskDict[AR_RISK_BANDS] = self.riskBands()
+        if self.path is not None:
+            self.export()
+            riskDict[AR_RECORD_RISK_FILE] = self.path
+        return riskDict
+
+
+    def riskFrequencies(self) -> list:
+        '''Returns (risk, number of records) pairs in ascending order
+        of risk. The completely suppressed class is a class of its own.'''
+        histogram = dict(self.eqClassStats[EQ_HISTOGRAM])
+        suppressedClassSize = self.eqClassStats[EQ_SUPPRESSED]
+        if suppressedClassSize:
+            histogram[suppressedClassSize] = histogram.get(suppressedClassSize, 0) + 1
+        return [(1.0 / size, size * count) for size, count in sorted(histogram.items(), reverse=True)]
+
+
+    def percentiles(self) -> dict:
+        '''Returns the nearest rank percentiles and the maximum of
+        the record level risk.'''
+        frequencies = self.riskFrequencies()
+        nrOfRecords = sum([records for _, records in frequencies])
+        resDict = dict()
+        for percentile in self.PERCENTILES:
+            rank = percentile / 100 * nrOfRecords
+            cumulative = 0
+            for risk, records in frequencies:
+                cumulative += records
+                if cumulative >= rank:
+                    resDict[f'p{percentile}'] = self.asPercentString(risk)
+                    break
+        resDict[AR_MAX] = self.asPercentString(frequencies[-1][0]) if frequencies else None
+        return resDict
+
+
+    def riskBands(self) -> dict:
+        '''Returns the percentage of records per risk band.'''
+        frequencies = self.riskFrequencies()
+        nrOfRecords = sum([records for _, records in frequencies])
+        resDict = dict()
+        lower = 0.0
+        for i, upper in enumerate(self.BANDS):
+            last = i == len(self.BANDS) - 1
+            records = sum([count for risk, count in frequencies if lower <= risk and (risk < upper or last)])
+            label = f'[{self.asPercentString(lower)}, {self.asPercentString(upper)}' + (']' if last else ')')
+            resDict[label] = self.asPercentString(records / nrOfRecords if nrOfRecords else 0.0)
+            lower = upper
+        return resDict
+
+
+    def export(self) -> None:
+        '''Streams the risk of every record, computed with a single join of
+        the records with their equivalence class, to the risk file as a
+        float32 column. Records are keyed by the first identifying column,
+        or by their position in the dataset if there is none.'''
+        df = self.df
+        qiColumns = self.qiQueryHelper.quasiIdentifyingColumnsList
+        identifyingColumns = self.qiQueryHelper.identifyingColumnsList
+        if identifyingColumns:
+            recordKey, order = f'records.{self.qiQueryHelper.quoteIdentifier(identifyingColumns[0])}', ''
+        else:
+            # An explicit position column, DuckDB does not guarantee the scan order
+            df = df.assign(record=np.arange(df.shape[0]))
+            recordKey, order = 'records.record', 'ORDER BY records.record'
+        joinCondition = self.qiQueryHelper.AND.join([f'records.{col} IS NOT DISTINCT FROM classes.{col}'
+                                                    for col in map(self.qiQueryHelper.quoteIdentifier, qiColumns)])
+
+        fileFormat = 'FORMAT PARQUET' if self.path.lower().endswith('.parquet') else 'FORMAT CSV, HEADER'
+        path = self.path.replace("'", "''")
+        con = duckdb.connect()
+        con.register('df', df)
+        con.execute(f'''COPY (SELECT {recordKey}, CAST(1.0 / classes.{K_ANONYMITY} AS FLOAT) AS risk
+                            FROM df records
+                            JOIN (SELECT {self.qiQueryHelper.quotedQuasiIdentifyingColumns}, count(*) as {K_ANONYMITY} FROM df
+                                GROUP BY {self.qiQueryHelper.quotedQuasiIdentifyingColumns}) classes
+                            ON {joinCondition} {order}) TO '{path}' ({fileFormat})''')
+        con.close()
+        logging.info(f'Wrote record level risks to {self.path}')
+
+
+    def asPercentString(self, fraction: float) -> str:
+        '''Formats a risk like the rest of the risk overview.'''
+        return str(round(fraction*100, 3)) + ' %'
@@ -0,0 +1,95 @@
+import duckdb
+import numpy as np
+import pandas as pd
+from output_validation.utils import QiQuery
+from output_validation.utils.Constants import *
+from output_validation.utils.Progress import Progress
+from output_validation.utils.Results import percent
+
+
+class RiskiestClasses:
+    '''The equivalence classes with the highest prosecutor risk, i.e. the
+    smallest classes, ties broken by the smallest l. The completely
+    suppressed class is not a risk and is left out. The classes are
+    aggregated once and DuckDB selects the requested number of them
+    (ORDER BY with LIMIT, a top-N), only those are fetched.'''
+
+    def __init__(self,
+                df: pd.DataFrame,
+                count: int,
+                qiQueryHelper: QiQuery,
+                progress: Progress = None):
+        if count < 1:
+            raise ValueError(f'Expected the number of riskiest classes to be >= 1, got {count}.')
+        self._df = df
+        self._count = count
+        self._qiQueryHelper = qiQueryHelper
+        self._progress = progress if progress is not None else Progress()
+
+
+    @property
+    def df(self):
+        '''The dataset.'''
+        return self._df
+
+
+    @property
+    def count(self):
+        '''Number of classes reported.'''
+        return self._count
+
+
+    @property
+    def qiQueryHelper(self):
+        '''Queryhelper attribute.'''
+        return self._qiQueryHelper
+
+
+    @property
+    def progress(self):
+        '''Progress reporter, checked for cancellation before the query.'''
+        return self._progress
+
+
+    def compute(self) -> list:
+        '''Returns the riskiest classes, riskiest first, with their QID
+        values, size, risk, l per sensitive attribute and the key of a
+        record of the class (the smallest value of the first identifying
+        column, or the smallest position if there is none).'''
+        qiColumns = self.qiQueryHelper.quasiIdentifyingColumnsList
+        sensitiveColumns = self.qiQueryHelper.sensitiveColumnsList
+        identifyingColumns = self.qiQueryHelper.identifyingColumnsList
+        if identifyingColumns:
+            recordKey, records = self.qiQueryHelper.quoteIdentifier(identifyingColumns[0]), self.df
+        else:
+            # An explicit position column, DuckDB does not guarantee the scan order
+            recordKey, records = '__record', self.df.assign(__record=np.arange(self.df.shape[0]))
+
+        aggregates = ['count(*) AS __size', f'min({recordKey}) AS __sample']
+        lColumns = [f'__l{i}' for i in range(len(sensitiveColumns))]
+        # Null values are counted as a distinct value of their own
+        for col, lColumn in zip(map(self.qiQueryHelper.quoteIdentifier, sensitiveColumns), lColumns):
+            aggregates.append(f'count(DISTINCT {col}) + max(CASE WHEN {col} IS NULL THEN 1 ELSE 0 END) AS {lColumn}')
+        # Comparing as text avoids type errors in numeric columns
+        noBlind = self.qiQueryHelper.parameterizedCondition(self.qiQueryHelper.OR, 'IS DISTINCT FROM', qiColumns, 'CAST({} AS VARCHAR)')
+        # Smallest size first, then smallest l, ties by the native record key
+        order = ['__size'] + ([f'least({", ".join(lColumns)})'] if lColumns else list()) + ['__sample NULLS LAST']
+        query = f'''SELECT * FROM (SELECT {self.qiQueryHelper.quotedQuasiIdentifyingColumns}, {', '.join(aggregates)} FROM df
+                            WHERE {noBlind} GROUP BY {self.qiQueryHelper.quotedQuasiIdentifyingColumns}) classes
+                            ORDER BY {', '.join(order)} LIMIT {int(self.count)}'''
+
+        size, sample, lValues = len(qiColumns), len(qiColumns) + 1, slice(len(qiColumns) + 2, None)
+        self.progress.check()
+        con = duckdb.connect()
+        con.register('df', records)
+        try:
+            riskiest = con.execute(query, [self.qiQueryHelper.blindSymbol] * len(qiColumns)).fetchall()
+        finally:
+            con.close()
+
+        return [{RC_CLASS: self.qiQueryHelper.dictToQueryString(self.qiQueryHelper.AND, ' = ', dict(zip(qiColumns, row))),
+                RC_SIZE: row[size],
+                RC_RISK: percent(1 / row[size]),
+                RC_L: dict(zip(sensitiveColumns, row[lValues])),
+                RC_SAMPLE_RECORD: row[sample]}
+                for row in riskiest]
@@ -0,0 +1,59 @@
+import pytest
+import os
+import shutil
+import logging
+import pandas as pd
+from output_validation.input.DatasetCache import DatasetCache
+
+class TestDatasetCache:
+
+
+    GENERAL_TESTFILES_LOC = os.path.join(os.getcwd(), 'tests', 'testfiles', 'general_tests')
+
+
+    def testRoundTrip(self, tmp_path):
+        path = os.path.join(self.GENERAL_TESTFILES_LOC, 'general_output_test1.csv')
+        cache = DatasetCache(str(tmp_path / 'cache'))
+        parsed = list()
+        def parse(path):
+            parsed.append(path)
+            return pd.read_csv(path)
+
+        first = cache.read(path, parse)
+        second = cache.read(path, parse)
+        assert len(parsed) == 1
+        pd.testing.assert_frame_equal(first, second)
+
+
+    def testMissingValuesAndInvalidation(self, tmp_path):
+        path = str(tmp_path / 'data.csv')
+        pd.DataFrame({'id' : [1, 2, 3], 'gender' : ['M', None, '*'], 'costs' : [1.5, None, 2.0]}).to_csv(path, index=False)
+        cache = DatasetCache(str(tmp_path / 'cache'))
+
+        pd.testing.assert_frame_equal(cache.read(path, pd.read_csv), pd.read_csv(path))
+        cached = cache.read(path, lambda path: pytest.fail('Expected a cache hit'))
+        assert cached['gender'].isna().tolist() == [False, True, False]
+
+        # A changed file is parsed again
+        pd.DataFrame({'id' : [1], 'gender' : ['F'], 'costs' : [3.0]}).to_csv(path, index=False)
+        os.utime(path, ns=(0, 10**9))
+        assert cache.read(path, pd.read_csv).shape == (1, 3)
+
+
+    def testMixedTypes(self, tmp_path):
+        path = str(tmp_path / 'data.csv')
+        pd.DataFrame({'id' : [1, 2], 'age' : ['21', '*']}).to_csv(path, index=False)
+        cache = DatasetCache(str(tmp_path / 'cache'))
+        mixed = pd.DataFrame({'id' : [1, 2], 'age' : [21, '*']})
+        # A text column holding numbers would come back as strings, so it is parsed every time
+        assert cache.read(path, lambda path: mixed) is mixed
+        pd.testing.assert_frame_equal(cache.read(path, pd.read_csv), pd.read_csv(path))
+        pd.testing.assert_frame_equal(cache.read(path, lambda path: pytest.fail('Expected a cache hit')), pd.read_csv(path))
+
+
+    def testEviction(self, tmp_path):
+        cache = DatasetCache(str(tmp_path / 'cache'), maxBytes=1)
+        path = os.path.join(self.GENERAL_TESTFILES_LOC, 'general_output_test1.csv')
+        cache.read(path, pd.read_csv)
+        # Every entry is above the cap, so the least recently used one is evicted
+        assert not [name for name in os.listdir(cache.directory) if os.path.isfile(os.path.join(cache.directory, name, DatasetCache.META))]
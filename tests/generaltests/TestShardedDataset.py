@@ -0,0 +1,69 @@
+import pytest
+import os
+import duckdb
+import numpy as np
+import pandas as pd
+from output_validation.utils.Constants import *
+from output_validation.utils.QiQuery import QiQuery
+from output_validation.input.ShardedDataset import ShardedDataset, isSharded, jointFrequencies
+
+
+class TestShardedDataset:
+
+
+    PRIVACY_TESTFILES_LOC = os.path.join(os.getcwd(), 'tests', 'testfiles', 'privacy_model_verification_tests')
+
+
+    def writeShards(self, directory, df, shards):
+        '''Writes every shards-th row from i on to the i-th shard, the last
+        shard as parquet.'''
+        for i in range(shards):
+            shardDf = df.iloc[i::shards].copy()
+            if i == shards - 1:
+                con = duckdb.connect()
+                con.register('shardDf', shardDf)
+                con.execute(f'''COPY shardDf TO '{os.path.join(directory, f'part-{i}.parquet')}' (FORMAT PARQUET)''')
+                con.close()
+            else:
+                shardDf.to_csv(os.path.join(directory, f'part-{i}.csv'), index=False)
+
+
+    def testMergeEqualsCombined(self, tmp_path):
+        df = pd.read_csv(os.path.join(self.PRIVACY_TESTFILES_LOC, 'privacy_model_verification_test1.csv'))
+        df.loc[[3, 7], 'dgn'] = np.nan
+        self.writeShards(str(tmp_path), df, 3)
+        assert isSharded(str(tmp_path)) and isSharded(str(tmp_path / 'part-*'))
+
+        dataset = ShardedDataset(str(tmp_path), QiQuery('id', 'gender, ehak', 'dgn', '*'), workers=2)
+        assert len(dataset.paths) == 3
+        assert dataset.records == 20
+
+        classStatsDf = dataset.classStatistics()
+        for _, row in classStatsDf.iterrows():
+            members = df[(df['gender'] == row['gender']) & (df['ehak'].astype(str) == row['ehak'])]
+            assert row[K_ANONYMITY] == members.shape[0]
+            # Missing values count as a distinct value of their own
+            assert row['dgn'] == members['dgn'].nunique(dropna=False)
+            assert row['id'] == row[K_ANONYMITY]
+
+        assert dict(dataset.frequencies()['gender']) == {'M': 10, 'N': 10}
+        assert dict(dataset.frequencies()['dgn'])[None] == 2
+        values, counts = jointFrequencies([dataset], ['dgn'], asText=True)['dgn']
+        assert dict(zip(values, counts[0])) == df['dgn'].astype(str).value_counts().to_dict()
+
+
+    def testCompressedShards(self, tmp_path):
+        df = pd.read_csv(os.path.join(self.PRIVACY_TESTFILES_LOC, 'privacy_model_verification_test1.csv'))
+        df.iloc[:10].to_csv(tmp_path / 'part-0.csv.gz', index=False, compression='gzip')
+        df.iloc[10:].to_csv(tmp_path / 'part-1.csv', index=False)
+        dataset = ShardedDataset(str(tmp_path), QiQuery('id', 'gender, ehak', 'dgn', '*'))
+        assert len(dataset.paths) == 2
+        assert dataset.records == 20
+        assert dict(dataset.frequencies()['gender']) == {'M': 10, 'N': 10}
+
+
+    def testMismatchingShards(self, tmp_path):
+        pd.DataFrame({'gender': ['M'], 'ehak': [1]}).to_csv(tmp_path / 'part-0.csv', index=False)
+        pd.DataFrame({'gender': ['M'], 'zip': [1]}).to_csv(tmp_path / 'part-1.csv', index=False)
+        with pytest.raises(ValueError):
+            ShardedDataset(str(tmp_path), QiQuery('', 'gender', '', '*')).classStatistics()
@@ -1,12 +1,17 @@
 import pytest
 import os
+import bz2
+import gzip
+import json
 import logging
 import pandas as pd
+import argparse
 import configparser
 from output_validation.utils.Constants import *
-from output_validation.Validator import Validator
+from output_validation.Validator import Validator, kRange
 from output_validation.input.Simulator import populateConfigFromFile
 from output_validation.input.Simulator import getSepNaive
+from output_validation.utils.Progress import Progress, CancellationToken, ValidationCancelled
 
 class TestValidator:
 
@@ -109,6 +114,7 @@ class TestValidator:
                 EQ_NOCLASSES : 50,
                 EQ_NORECORDS : 50,
                 EQ_SMALLEST : 1,
+                EQ_HISTOGRAM : {1: 50}
             },
             EQ_OUTPUT : {
                 EQ_AVG_NOSUP : 8.333,
@@ -118,6 +124,7 @@ class TestValidator:
                 EQ_NOCLASSES : 6,
                 EQ_NORECORDS : 50,
                 EQ_SMALLEST : 5,
+                EQ_HISTOGRAM : {5: 3, 6: 1, 12: 1, 17: 1}
             }
         }
 
@@ -190,3 +197,224 @@ class TestValidator:
         assert result[0][PRIVACY_VERIFICATION] == expectedPrivacyModelVerificationDict
         assert result[0][SUMMARY_STATISTICS][SS_INPUT] == expectedSummaryStatisticsDict[SS_INPUT]
         assert result[0][SUMMARY_STATISTICS][SS_OUTPUT] == expectedSummaryStatisticsDict[SS_OUTPUT]
+
+
+    def testSamplingFraction(self):
+        result = Validator(os.path.join(self.GENERAL_TESTFILES_LOC, 'general_input_test1.csv'),
+                    os.path.join(self.GENERAL_TESTFILES_LOC, 'general_output_test1.csv'),
+                    self.parseConfig(os.path.join(self.GENERAL_TEST_CONFS_LOC, 'conf_sampling.txt'))).analyzeAndValidate()
+
+        populationDict = result[0][ATTACK_RISKS][AR_OUTPUT][AR_POPULATION]
+        assert populationDict[AR_SAMPLING_FRACTION] == 0.05
+        # No sample uniques in the output
+        assert populationDict[AR_DANKAR] == '0.0 %'
+        # All input records are unique, Pitman is not applicable
+        assert result[0][ATTACK_RISKS][AR_INPUT][AR_POPULATION][AR_DANKAR_MODEL] == AR_ZAYATZ
+        assert result[0][ATTACK_RISKS][AR_INPUT][AR_POPULATION][AR_PITMAN] is None
+
+        # Output classes of 5 to 17 records are estimated to be 5 % of their population classes
+        assert result[0][ATTACK_RISKS][AR_OUTPUT][AR_ESTIMATED_JOURNALIST_RISK] == '1.0 %'
+        assert result[0][ATTACK_RISKS][AR_OUTPUT][AR_ESTIMATED_MARKETER_RISK] == '0.6 %'
+        # The input records are estimated to be population uniques
+        assert result[0][ATTACK_RISKS][AR_INPUT][AR_ESTIMATED_JOURNALIST_RISK] == '100.0 %'
+        assert result[0][ATTACK_RISKS][AR_INPUT][AR_ESTIMATED_MARKETER_RISK] == '100.0 %'
+
+
+    def testKSweep(self):
+        result = Validator(os.path.join(self.GENERAL_TESTFILES_LOC, 'general_input_test1.csv'),
+                    os.path.join(self.GENERAL_TESTFILES_LOC, 'general_output_test1.csv'),
+                    self.parseConfig(os.path.join(self.GENERAL_TEST_CONFS_LOC, 'conf_all.txt')),
+                    kSweep=(5, 7)).analyzeAndValidate()
+
+        # Output classes of sizes 5, 5, 5, 6, 12 and 17
+        assert result[0][ATTACK_RISKS][AR_OUTPUT][AR_K_SWEEP] == [
+            {K_ANONYMITY: 5, AR_RECORDS_AT_RISK: '0.0 %', AR_CLASSES_VIOLATING: 0, AR_SUPPRESSION_NEEDED: 0},
+            {K_ANONYMITY: 6, AR_RECORDS_AT_RISK: '30.0 %', AR_CLASSES_VIOLATING: 3, AR_SUPPRESSION_NEEDED: 15},
+            {K_ANONYMITY: 7, AR_RECORDS_AT_RISK: '42.0 %', AR_CLASSES_VIOLATING: 4, AR_SUPPRESSION_NEEDED: 21}
+        ]
+        assert result[0][ATTACK_RISKS][AR_INPUT][AR_K_SWEEP][0][AR_RECORDS_AT_RISK] == '100.0 %'
+
+
+    def testRiskiestClasses(self):
+        result = Validator(os.path.join(self.GENERAL_TESTFILES_LOC, 'general_input_test1.csv'),
+                    os.path.join(self.GENERAL_TESTFILES_LOC, 'general_output_test1.csv'),
+                    self.parseConfig(os.path.join(self.GENERAL_TEST_CONFS_LOC, 'conf_all.txt')),
+                    riskiestClasses=4).analyzeAndValidate()
+
+        # Output classes of sizes 5, 5, 5, 6, 12 and 17
+        assert [entry[RC_SIZE] for entry in result[0][RISKIEST_CLASSES]] == [5, 5, 5, 6]
+        assert result[0][SECTION_STATUS][RISKIEST_CLASSES] == ST_COMPLETE
+
+
+    def testSnapshot(self, tmp_path):
+        inputPath = os.path.join(self.GENERAL_TESTFILES_LOC, 'general_input_test1.csv')
+        outputPath = os.path.join(self.GENERAL_TESTFILES_LOC, 'general_output_test1.csv')
+        snapshotPath = str(tmp_path / 'snapshot.json')
+        result = Validator(inputPath, outputPath, self.parseConfig(os.path.join(self.GENERAL_TEST_CONFS_LOC, 'conf_all.txt')),
+                    snapshotPath=snapshotPath).analyzeAndValidate()
+        assert result[0][SNAPSHOT_FILE] == snapshotPath
+        with open(snapshotPath, encoding='UTF-8') as f:
+            snapshot = json.load(f)
+        assert snapshot[SN_HISTOGRAMS][EQ_OUTPUT] == {'5': 3, '6': 1, '12': 1, '17': 1}
+        assert snapshot[SN_VIOLATIONS] == dict()
+
+        # The same run has no changes
+        result = Validator(inputPath, outputPath, self.parseConfig(os.path.join(self.GENERAL_TEST_CONFS_LOC, 'conf_all.txt')),
+                    baselinePath=snapshotPath).analyzeAndValidate()
+        assert result[0][SNAPSHOT_DIFF] == {SD_METRICS: dict(), SD_HISTOGRAMS: {EQ_INPUT: dict(), EQ_OUTPUT: dict()},
+                                            SD_NEW_VIOLATIONS: dict(), SD_RESOLVED_VIOLATIONS: list()}
+
+        # With k = 6, the three classes of size 5 violate k-anonymity
+        config = self.parseConfig(os.path.join(self.GENERAL_TEST_CONFS_LOC, 'conf_all.txt'))
+        config[CONF_ARX][K_ANONYMITY] = '6'
+        diff = Validator(inputPath, outputPath, config, baselinePath=snapshotPath).analyzeAndValidate()[0][SNAPSHOT_DIFF]
+        assert list(diff[SD_NEW_VIOLATIONS].values()) == [[PR_K]] * 3
+        assert diff[SD_METRICS] == {f'{PRIVACY_VERIFICATION}/{PR_K}/{PR_VIOLATION_COUNT}': [0, 3, 3]}
+
+
+    def testShards(self, tmp_path):
+        config = self.parseConfig(os.path.join(self.GENERAL_TEST_CONFS_LOC, 'conf_all.txt'))
+        paths = dict()
+        for name in ['input', 'output']:
+            path = os.path.join(self.GENERAL_TESTFILES_LOC, f'general_{name}_test1.csv')
+            sep = getSepNaive(path)
+            df = pd.read_csv(path, sep=sep)
+            os.mkdir(tmp_path / name)
+            for i in range(3):
+                df.iloc[i::3].to_csv(tmp_path / name / f'part-{i}.csv', sep=sep, index=False)
+            paths[name] = (path, str(tmp_path / name))
+
+        full = Validator(paths['input'][0], paths['output'][0], config, plotSpecs='').analyzeAndValidate()[0]
+        sharded = Validator(paths['input'][1], paths['output'][1], config, plotSpecs='').analyzeAndValidate()[0]
+        for section in [EQUIVALENCE_CLASSES, PRIVACY_VERIFICATION, ATTACK_RISKS, DISTRIBUTION_DISTANCES]:
+            assert sharded[section] == full[section]
+            assert sharded[SECTION_STATUS][section] == ST_COMPLETE
+        # Record level sections need the combined dataset
+        assert sharded[SECTION_STATUS][INFORMATION_LOSS] == ST_SKIPPED
+
+
+    def testCompressed(self, tmp_path):
+        config = self.parseConfig(os.path.join(self.GENERAL_TEST_CONFS_LOC, 'conf_all.txt'))
+        paths = [os.path.join(self.GENERAL_TESTFILES_LOC, f'general_{name}_test1.csv') for name in ['input', 'output']]
+        full = Validator(*paths, config, plotSpecs='').analyzeAndValidate()[0]
+        for suffix, compress in [('gz', gzip.compress), ('bz2', bz2.compress)]:
+            compressedPaths = list()
+            for path in paths:
+                compressedPaths.append(str(tmp_path / f'{os.path.basename(path)}.{suffix}'))
+                with open(path, 'rb') as f, open(compressedPaths[-1], 'wb') as out:
+                    out.write(compress(f.read()))
+            assert getSepNaive(compressedPaths[0]) == getSepNaive(paths[0])
+            assert Validator(*compressedPaths, config, plotSpecs='').analyzeAndValidate()[0] == full
+
+
+    def testCandidates(self):
+        outputPath = os.path.join(self.GENERAL_TESTFILES_LOC, 'general_output_test1.csv')
+        inputPath = os.path.join(self.GENERAL_TESTFILES_LOC, 'general_input_test1.csv')
+        single = Validator(inputPath, outputPath,
+                    self.parseConfig(os.path.join(self.GENERAL_TEST_CONFS_LOC, 'conf_all.txt'))).analyzeAndValidate()
+        # The unanonymized input as a second candidate
+        result = Validator(inputPath, [outputPath, inputPath, 'randompath'],
+                    self.parseConfig(os.path.join(self.GENERAL_TEST_CONFS_LOC, 'conf_all.txt'))).analyzeAndValidate()
+
+        assert result[0][CANDIDATE_INPUT][EQUIVALENCE_CLASSES] == single[0][EQUIVALENCE_CLASSES][EQ_INPUT]
+        assert result[0][CANDIDATE_INPUT][ATTACK_RISKS] == single[0][ATTACK_RISKS][AR_INPUT]
+        # Unreadable candidates are skipped
+        assert list(result[0][CANDIDATES]) == [outputPath, inputPath]
+        candidate = result[0][CANDIDATES][outputPath]
+        assert candidate[EQUIVALENCE_CLASSES] == single[0][EQUIVALENCE_CLASSES][EQ_OUTPUT]
+        assert candidate[PRIVACY_VERIFICATION] == single[0][PRIVACY_VERIFICATION]
+        assert candidate[SUMMARY_STATISTICS] == single[0][SUMMARY_STATISTICS][SS_OUTPUT]
+
+        ranking = result[0][CANDIDATE_RANKING]
+        assert [row[CR_CANDIDATE] for row in ranking] == [outputPath, inputPath]
+        assert [row[CR_RANK] for row in ranking] == [1, 2]
+        assert ranking[0][EQ_SMALLEST] == 5
+        assert ranking[0][CR_SATISFIED]
+        assert ranking[1][AR_RECORDS_AT_RISK] == '100.0 %'
+        # Ranked on the raw fractions, rendered like the candidate results
+        assert ranking[0][SS_TOTAL_SUP] == candidate[SUMMARY_STATISTICS][SS_TOTAL_SUP][1]
+        assert ranking[0][AR_RECORDS_AT_RISK] == candidate[ATTACK_RISKS][AR_RECORDS_AT_RISK]
+        assert not ranking[1][CR_SATISFIED]
+
+
+    def testProgressAndCancellation(self):
+        events = list()
+        result = Validator(os.path.join(self.GENERAL_TESTFILES_LOC, 'general_input_test1.csv'),
+                    os.path.join(self.GENERAL_TESTFILES_LOC, 'general_output_test1.csv'),
+                    self.parseConfig(os.path.join(self.GENERAL_TEST_CONFS_LOC, 'conf_all.txt')),
+                    progress=Progress(lambda stage, done, total: events.append((stage, done, total)))).analyzeAndValidate()
+        stages = [stage for stage, _, _ in events]
+        assert stages.index(LOADING) < stages.index(EQUIVALENCE_CLASSES) < stages.index(PRIVACY_VERIFICATION) < stages.index(PLOTS)
+        # Loading reports bytes parsed out of the file size
+        assert [event for event in events if event[0] == LOADING][-1][1] == os.path.getsize(
+                    os.path.join(self.GENERAL_TESTFILES_LOC, 'general_output_test1.csv'))
+
+        token = CancellationToken()
+        def cancelOnPrivacyVerification(stage, done, total):
+            if stage == PRIVACY_VERIFICATION:
+                token.cancel()
+        validator = Validator(os.path.join(self.GENERAL_TESTFILES_LOC, 'general_input_test1.csv'),
+                    os.path.join(self.GENERAL_TESTFILES_LOC, 'general_output_test1.csv'),
+                    self.parseConfig(os.path.join(self.GENERAL_TEST_CONFS_LOC, 'conf_all.txt')),
+                    progress=Progress(cancelOnPrivacyVerification, token))
+        with pytest.raises(ValidationCancelled):
+            validator.analyzeAndValidate()
+
+
+    def testTimeBudget(self):
+        def validator():
+            return Validator(os.path.join(self.GENERAL_TESTFILES_LOC, 'general_input_test1.csv'),
+                    os.path.join(self.GENERAL_TESTFILES_LOC, 'general_output_test1.csv'),
+                    self.parseConfig(os.path.join(self.GENERAL_TEST_CONFS_LOC, 'conf_all.txt')), qiLatticeSize=0)
+
+        result = validator().analyzeAndValidate(timeBudget=600)[0]
+        assert set(result[SECTION_STATUS].values()) == {ST_COMPLETE}
+        assert PLOTS in result[SECTION_STATUS] and QI_LATTICE in result
+        assert result[VERIFICATION_BOUNDS] == {PR_K: VB_EXACT, PR_L: VB_EXACT, PR_XY: VB_EXACT}
+
+        result = validator().analyzeAndValidate(timeBudget=0)[0]
+        assert result[SECTION_STATUS][EQUIVALENCE_CLASSES] == ST_SKIPPED
+        assert result[SECTION_STATUS][PLOTS] == ST_SKIPPED
+        assert EQUIVALENCE_CLASSES not in result and PRIVACY_VERIFICATION not in result
+
+
+    def testPlotSpecs(self, tmp_path):
+        def validator(plotSpecs):
+            return Validator(os.path.join(self.GENERAL_TESTFILES_LOC, 'general_input_test1.csv'),
+                    os.path.join(self.GENERAL_TESTFILES_LOC, 'general_output_test1.csv'),
+                    self.parseConfig(os.path.join(self.GENERAL_TEST_CONFS_LOC, 'conf_all.txt')), plotSpecs=plotSpecs)
+
+        result = validator('').analyzeAndValidate()[0]
+        specs = result[PLOT_SPECS]
+        assert specs['distribution/out/distribution_patient_gender']['$schema'] == VEGA_LITE_SCHEMA
+        # Three prosecutor, three journalist and one marketer gauge per dataset
+        assert len([name for name in specs if name.startswith('attackmodels/')]) == 14
+        assert specs['attackmodels/out/Prosecutor_highest_risk']['data'][0]['value'] == 20.0
+
+        specsPath = str(tmp_path / 'specs.json')
+        result = validator(specsPath).analyzeAndValidate()[0]
+        assert result[PLOT_SPECS_FILE] == specsPath and PLOT_SPECS not in result
+        with open(specsPath, 'r', encoding='UTF-8') as f:
+            assert json.load(f).keys() == specs.keys()
+
+
+    def testReport(self):
+        validator = Validator(os.path.join(self.GENERAL_TESTFILES_LOC, 'general_input_test1.csv'),
+                    os.path.join(self.GENERAL_TESTFILES_LOC, 'general_output_test1.csv'),
+                    self.parseConfig(os.path.join(self.GENERAL_TEST_CONFS_LOC, 'conf_all.txt')), plotSpecs='')
+        report = validator.analyze()
+        assert report.outputClasses.smallest == 5
+        assert report.outputClasses.histogram == {5: 3, 6: 1, 12: 1, 17: 1}
+        assert report.outputSummary.totalSuppressed == 79
+        assert report.outputRisks.prosecutorHighest == 0.2
+        assert report.privacy.k == 5
+        # The json report is a rendering of the same results
+        assert report.toDict() == validator.analyzeAndValidate()[0]
+
+
+    def testKRange(self):
+        assert kRange('2:5') == (2, 5)
+        assert kRange('3:3') == (3, 3)
+        for value in ('5', '1:2:3', 'a:5', '5:2', '0:2', ':'):
+            with pytest.raises(argparse.ArgumentTypeError):
+                kRange(value)
@@ -0,0 +1,53 @@
+import pytest
+from output_validation.utils.Constants import *
+from output_validation.risk.PopulationUniqueness import PopulationUniqueness
+
+class TestPopulationUniqueness:
+
+
+    # 4 uniques, 2 classes of size 2, 2 classes of size 5 -> 18 records
+    FREQUENCIES = {1: 4, 2: 2, 5: 2}
+
+
+    def testIllegalSamplingFraction(self):
+        for fraction in [0, -0.5, 1.5]:
+            with pytest.raises(ValueError):
+                PopulationUniqueness(self.FREQUENCIES, fraction)
+
+
+    def testSampleIsPopulation(self):
+        model = PopulationUniqueness(self.FREQUENCIES, 1.0)
+        assert model.sampleSize == 18
+        assert model.populationSize == 18
+        assert model.zayatz() == pytest.approx(4/18)
+        assert model.snb() == pytest.approx(4/18, abs=1e-3)
+        assert model.dankar() == (AR_ZAYATZ, model.zayatz())
+
+
+    def testNoSampleUniques(self):
+        model = PopulationUniqueness({2: 4, 3: 1}, 0.05)
+        assert model.zayatz() == 0.0
+        assert model.pitman() == 0.0
+        assert model.snb() == 0.0
+
+
+    def testPitmanNotApplicable(self):
+        model = PopulationUniqueness({1: 10}, 0.05)
+        assert model.pitman() is None
+        assert model.dankar() == (AR_ZAYATZ, model.zayatz())
+
+
+    def testSmallSamplingFraction(self):
+        frequencies = {1: 120, 2: 40, 3: 15, 4: 8, 6: 3, 10: 1}
+        model = PopulationUniqueness(frequencies, 0.05)
+        sampleUniqueShare = 120 / model.sampleSize
+        # Sample uniques are less likely to be unique in a bigger population
+        for estimate in [model.zayatz(), model.pitman(), model.snb()]:
+            assert 0 < estimate < sampleUniqueShare
+        assert model.dankar() == (AR_PITMAN, model.pitman())
+
+        resDict = model.compute()
+        assert resDict[AR_SAMPLING_FRACTION] == 0.05
+        assert resDict[AR_DANKAR_MODEL] == AR_PITMAN
+        assert resDict[AR_DANKAR] == resDict[AR_PITMAN]
+        assert resDict[AR_ZAYATZ].endswith(' %')
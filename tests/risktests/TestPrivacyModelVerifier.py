@@ -1,10 +1,13 @@
 import pytest
 import os
 import logging
+import duckdb
 import pandas as pd
 from output_validation.utils.Constants import *
 from output_validation.risk.PrivacyModelVerifier import PrivacyModelVerifier
 from output_validation.utils.QiQuery import QiQuery
+from output_validation.utils.Partitioner import Partitioner
+from output_validation.utils.Progress import Progress
 
 class TestPrivacyModelVerifier:
 
@@ -112,4 +115,60 @@ class TestPrivacyModelVerifier:
         
         assert resdict[PR_K] == expected[PR_K]
         assert resdict[PR_L] == expected[PR_L]
-        assert resdict[PR_XY] == expected[PR_XY]   
\ No newline at end of file
+        assert resdict[PR_XY] == expected[PR_XY]   
+
+    def testViolationsSideFile(self, tmp_path):
+        violationsPath = str(tmp_path / 'violations.csv')
+        resdict = PrivacyModelVerifier(5,5,5,
+            self.initDf(os.path.join(self.PRIVACY_TESTFILES_LOC, 'privacy_model_verification_test2.csv'), sep='\t'),
+            QiQuery('id', 'gender, ehak', 'dgn',''), violationsPath, 1).compute()
+
+        assert resdict[PR_K] == [5, dict()]
+        assert resdict[PR_L][0] == 3
+        assert resdict[PR_L][1][PR_VIOLATION_COUNT] == 2
+        assert resdict[PR_L][1][PR_VIOLATION_FILE] == violationsPath
+        assert len(resdict[PR_L][1][PR_VIOLATION_SAMPLE]) == 1
+
+        violationsDf = pd.read_csv(violationsPath)
+        assert violationsDf.shape[0] == 2
+        assert sorted(violationsDf[L_DIVERSITY + '_dgn']) == [3, 4]
+        assert list(violationsDf[K_ANONYMITY]) == [5, 5]
+
+        # Partition by partition the same classes are written
+        partitioner = Partitioner(QiQuery('id', 'gender, ehak', 'dgn',''), 3, 2)
+        partitionedPath = str(tmp_path / 'violations.parquet')
+        PrivacyModelVerifier(5,5,5,
+            self.initDf(os.path.join(self.PRIVACY_TESTFILES_LOC, 'privacy_model_verification_test2.csv'), sep='\t'),
+            QiQuery('id', 'gender, ehak', 'dgn',''), partitionedPath, 1, partitioner).compute()
+        partitioner.close()
+        partitionedDf = duckdb.query(f"SELECT * FROM parquet_scan('{partitionedPath}')").df()
+        key = lambda df: sorted(map(str, df.itertuples(index=False, name=None)))
+        assert key(partitionedDf) == key(violationsDf)
+
+
+    def testPartitioned(self):
+        qiQueryHelper = QiQuery('id', 'gender, ehak', 'dgn','')
+        for name in ['privacy_model_verification_test2.csv', 'privacy_model_verification3_test3.csv']:
+            df = self.initDf(os.path.join(self.PRIVACY_TESTFILES_LOC, name), sep='\t')
+            expected = PrivacyModelVerifier(6,5,5, df, qiQueryHelper).compute()
+            partitioner = Partitioner(qiQueryHelper, 4, 2)
+            assert PrivacyModelVerifier(6,5,5, df, qiQueryHelper, partitioner=partitioner).compute() == expected
+            partitioner.close()
+
+
+    def testDeadline(self):
+        df = self.initDf(os.path.join(self.PRIVACY_TESTFILES_LOC, 'privacy_model_verification_test2.csv'), sep='\t')
+        qiQueryHelper = QiQuery('id', 'gender, ehak', 'dgn','')
+        verifier = PrivacyModelVerifier(5,5,5, df, qiQueryHelper)
+        verifier.compute()
+        assert verifier.complete
+        assert verifier.bounds == {PR_K: VB_EXACT, PR_L: VB_EXACT, PR_XY: VB_EXACT}
+
+        # Past the deadline only the smallest class size is known exactly
+        progress = Progress()
+        progress.setDeadline(0)
+        verifier = PrivacyModelVerifier(5,5,5, df, qiQueryHelper, progress=progress)
+        resdict = verifier.compute()
+        assert not verifier.complete
+        assert verifier.bounds == {PR_K: VB_EXACT, PR_L: VB_LOWER_BOUND, PR_XY: VB_LOWER_BOUND}
+        assert resdict == {PR_K: [5, dict()], PR_L: [1, dict()], PR_XY: [1, dict()]}
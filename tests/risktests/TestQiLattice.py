@@ -0,0 +1,54 @@
+import pytest
+import os
+import pandas as pd
+from output_validation.utils.Constants import *
+from output_validation.risk.QiLattice import QiLattice
+from output_validation.utils.QiQuery import QiQuery
+
+class TestQiLattice:
+
+
+    EQCLASS_TESTFILES_LOC = os.path.join(os.getcwd(), 'tests', 'testfiles', 'equivalence_class_tests')
+    PRIVACY_TESTFILES_LOC = os.path.join(os.getcwd(), 'tests', 'testfiles', 'privacy_model_verification_tests')
+
+
+    def testRollUpEqualsGrouping(self):
+        df = pd.read_csv(os.path.join(self.PRIVACY_TESTFILES_LOC, 'privacy_model_verification_test2.csv'), sep='\t')
+        result = QiLattice(df, 5, QiQuery('id', 'gender, ehak, dgn', '', ''), workers=2).compute()
+        assert [res[LT_SUBSET] for res in result] == [['gender'], ['ehak'], ['dgn'], ['gender', 'ehak'],
+                                                    ['gender', 'dgn'], ['ehak', 'dgn'], ['gender', 'ehak', 'dgn']]
+        for res in result:
+            sizes = df.groupby(res[LT_SUBSET]).size()
+            assert res[EQ_SMALLEST] == sizes.min()
+            assert res[EQ_NOCLASSES] == sizes.shape[0]
+            assert res[AR_RECORDS_AT_RISK] == str(round(sizes[sizes < 5].sum() / df.shape[0] * 100, 3)) + ' %'
+
+
+    def testMaxSubsetSizeAndSuppression(self):
+        df = pd.read_csv(os.path.join(self.EQCLASS_TESTFILES_LOC, 'equivalence_class_test2.csv'))
+        result = QiLattice(df, 3, QiQuery('id', 'gender, ehak', '', ''), 1).compute()
+        assert result == [
+            # The completely suppressed class of size 3 is not the smallest
+            {LT_SUBSET: ['gender'], EQ_SMALLEST: 2, EQ_NOCLASSES: 3, AR_RECORDS_AT_RISK: '20.0 %'},
+            {LT_SUBSET: ['ehak'], EQ_SMALLEST: 1, EQ_NOCLASSES: 4, AR_RECORDS_AT_RISK: '30.0 %'}
+        ]
+
+
+    def testContribution(self):
+        df = pd.read_csv(os.path.join(self.EQCLASS_TESTFILES_LOC, 'equivalence_class_test2.csv'))
+        result = QiLattice(df, 3, QiQuery('id', 'gender, ehak', '', ''), workers=2).contribution()
+        # Classes of size 4, 3 (completely suppressed), 2 and 1
+        assert result[CN_ALL] == {EQ_SMALLEST: 1, AR_RECORDS_AT_RISK: '30.0 %', CN_UNIQUE_RECORDS: 1}
+        assert result[CN_LEFT_OUT]['gender'] == {EQ_SMALLEST: 1, AR_RECORDS_AT_RISK: '30.0 %', CN_UNIQUE_RECORDS: 1,
+                                                CN_CHANGE: {EQ_SMALLEST: 0, AR_RECORDS_AT_RISK: '0.0 %', CN_UNIQUE_RECORDS: 0}}
+        assert result[CN_LEFT_OUT]['ehak'] == {EQ_SMALLEST: 2, AR_RECORDS_AT_RISK: '20.0 %', CN_UNIQUE_RECORDS: 0,
+                                              CN_CHANGE: {EQ_SMALLEST: 1, AR_RECORDS_AT_RISK: '-10.0 %', CN_UNIQUE_RECORDS: -1}}
+        assert result[CN_MOST_IDENTIFYING] == 'ehak'
+
+
+    def testContributionOfSingleColumn(self):
+        df = pd.read_csv(os.path.join(self.EQCLASS_TESTFILES_LOC, 'equivalence_class_test2.csv'))
+        result = QiLattice(df, 3, QiQuery('id', 'ehak', '', '')).contribution()
+        # Without its only QID, all records are in one class
+        assert result[CN_LEFT_OUT]['ehak'][EQ_SMALLEST] == 10
+        assert result[CN_LEFT_OUT]['ehak'][CN_CHANGE][CN_UNIQUE_RECORDS] == -1
@@ -0,0 +1,52 @@
+import pytest
+import os
+import numpy as np
+import pandas as pd
+from output_validation.utils.Constants import *
+from output_validation.risk.RecordRisk import RecordRisk
+from output_validation.utility.ClassSizes import ClassSizes
+from output_validation.utils.QiQuery import QiQuery
+
+class TestRecordRisk:
+
+
+    EQCLASS_TESTFILES_LOC = os.path.join(os.getcwd(), 'tests', 'testfiles', 'equivalence_class_tests')
+
+
+    def initRecordRisk(self, identifyingColumns, path=None):
+        df = pd.read_csv(os.path.join(self.EQCLASS_TESTFILES_LOC, 'equivalence_class_test2.csv'))
+        qiQueryHelper = QiQuery(identifyingColumns, 'gender, ehak', '', '')
+        eqClassStats = ClassSizes(None, df, qiQueryHelper).compute()[EQ_OUTPUT]
+        return RecordRisk(df, eqClassStats, qiQueryHelper, path)
+
+
+    def testSummary(self):
+        # Classes of size 4, 3 (completely suppressed), 2 and 1
+        resdict = self.initRecordRisk('id').compute()
+        assert resdict[AR_PERCENTILES] == {'p50': '33.333 %', 'p90': '50.0 %', 'p99': '100.0 %', AR_MAX: '100.0 %'}
+        assert resdict[AR_RISK_BANDS] == {
+            '[0.0 %, 5.0 %)': '0.0 %',
+            '[5.0 %, 10.0 %)': '0.0 %',
+            '[10.0 %, 20.0 %)': '0.0 %',
+            '[20.0 %, 50.0 %)': '70.0 %',
+            '[50.0 %, 100.0 %]': '30.0 %'
+        }
+        assert AR_RECORD_RISK_FILE not in resdict
+
+
+    def testExport(self, tmp_path):
+        for identifyingColumns, key in [('id', 'id'), ('', 'record')]:
+            path = str(tmp_path / f'risk_{key}.csv')
+            resdict = self.initRecordRisk(identifyingColumns, path).compute()
+            assert resdict[AR_RECORD_RISK_FILE] == path
+
+            riskDf = pd.read_csv(path)
+            assert list(riskDf.columns) == [key, 'risk']
+            assert riskDf.shape[0] == 10
+            assert sorted(riskDf['risk'].round(3)) == [0.25]*4 + [0.333]*3 + [0.5]*2 + [1.0]
+
+        # Positions are those of the dataset rows
+        df = self.initRecordRisk('', None).df
+        expected = 1 / df.groupby(['gender', 'ehak'])['gender'].transform('size')
+        assert list(riskDf['record']) == list(range(10))
+        assert np.allclose(riskDf['risk'], expected.values)
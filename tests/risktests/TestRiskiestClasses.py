@@ -0,0 +1,63 @@
+import pytest
+import os
+import pandas as pd
+from output_validation.utils.Constants import *
+from output_validation.risk.RiskiestClasses import RiskiestClasses
+from output_validation.utils.QiQuery import QiQuery
+
+class TestRiskiestClasses:
+
+
+    EQCLASS_TESTFILES_LOC = os.path.join(os.getcwd(), 'tests', 'testfiles', 'equivalence_class_tests')
+
+
+    def initRiskiestClasses(self, identifyingColumns, sensitiveColumns, count):
+        df = pd.read_csv(os.path.join(self.EQCLASS_TESTFILES_LOC, 'equivalence_class_test2.csv'))
+        # Sensitive values spread over the classes of size 4, 3 (completely suppressed), 2 and 1
+        df['dgn'] = ['A', 'B', 'A', 'A', 'B', 'A', 'A', 'A', 'B', 'C']
+        qiQueryHelper = QiQuery(identifyingColumns, 'gender, ehak', sensitiveColumns, '*')
+        return RiskiestClasses(df, count, qiQueryHelper)
+
+
+    def testRiskiest(self):
+        res = self.initRiskiestClasses('id', 'dgn', 3).compute()
+        # The completely suppressed class of size 3 is not a risk
+        assert [entry[RC_SIZE] for entry in res] == [1, 2, 4]
+        assert res[0] == {RC_CLASS: "gender = 'M' AND ehak = '130'",
+                          RC_SIZE: 1,
+                          RC_RISK: '100.0 %',
+                          RC_L: {'dgn': 1},
+                          RC_SAMPLE_RECORD: 10}
+        assert res[1][RC_L] == {'dgn': 2}
+        assert res[1][RC_SAMPLE_RECORD] == 4
+
+
+    def testWithoutIdentifier(self):
+        res = self.initRiskiestClasses('', '', 10).compute()
+        # Fewer classes than requested, records keyed by position
+        assert [entry[RC_SIZE] for entry in res] == [1, 2, 4]
+        assert [entry[RC_SAMPLE_RECORD] for entry in res] == [9, 3, 5]
+        assert res[0][RC_L] == dict()
+
+
+    def testIllegalCount(self):
+        with pytest.raises(ValueError):
+            self.initRiskiestClasses('id', 'dgn', 0)
+
+
+    def testSuppressedRecord(self):
+        df = pd.DataFrame({'id': [1, 2, 3, 4, 5, 6, 7],
+                           'gender': ['M', 'M', 'M', 'N', 'N', 'N', '*'],
+                           'ehak': ['1', '1', '1', '2', '2', '2', '*']})
+        res = RiskiestClasses(df, 2, QiQuery('id', 'gender, ehak', '', '*')).compute()
+        # The single completely suppressed record is not the riskiest class
+        assert [entry[RC_SIZE] for entry in res] == [3, 3]
+        assert [entry[RC_SAMPLE_RECORD] for entry in res] == [1, 4]
+
+
+    def testNumericTieBreak(self):
+        df = pd.DataFrame({'id': [10, 9, 11, 12], 'gender': ['M', 'F', 'M', 'F']})
+        res = RiskiestClasses(df, 1, QiQuery('id', 'gender', '', '*')).compute()
+        # Record keys compare as numbers, 9 before 10
+        assert res[0][RC_CLASS] == "gender = 'F'"
+        assert res[0][RC_SAMPLE_RECORD] == 9
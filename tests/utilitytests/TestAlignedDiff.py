@@ -0,0 +1,60 @@
+import pytest
+import os
+import logging
+import numpy as np
+import pandas as pd
+from output_validation.utils.Constants import *
+from output_validation.utility.AlignedDiff import AlignedDiff
+from output_validation.utils.QiQuery import QiQuery
+
+class TestAlignedDiff:
+
+
+    INFOLOSS_TESTFILES_LOC = os.path.join(os.getcwd(), 'tests', 'testfiles', 'information_loss_tests')
+
+
+    def initDf(self, path: str) -> pd.DataFrame:
+        df = pd.read_csv(path)
+        return df
+
+
+    def initDfs(self) -> tuple:
+        return (self.initDf(os.path.join(self.INFOLOSS_TESTFILES_LOC, 'information_loss_input.csv')),
+                self.initDf(os.path.join(self.INFOLOSS_TESTFILES_LOC, 'information_loss_output.csv')))
+
+
+    def testChunked(self):
+        expected = {
+            AD_CHANGED : {'id' : 0, 'gender' : 2, 'age' : 4},
+            AD_SUPPRESSED : {'id' : 0, 'gender' : 2, 'age' : 1},
+            AD_GENERALIZED : {'id' : 0, 'gender' : 0, 'age' : 3},
+            AD_RECORDS_PER_CHANGED : {1 : 2, 2 : 2},
+            AD_UNMATCHED : 0
+        }
+        inDf, outDf = self.initDfs()
+        for chunkSize in (1, 3, 100):
+            diff = AlignedDiff(inDf, outDf, QiQuery('id', 'gender, age', '', '*'), chunkSize)
+            assert diff.compute() == expected
+            assert diff.changed.shape == (4, 1)
+            assert diff.cells(diff.suppressed).tolist() == [[False, False, False],
+                                                            [False, False, False],
+                                                            [False, True, False],
+                                                            [False, True, True]]
+
+
+    def testAlignedByIdentifier(self):
+        inDf, outDf = self.initDfs()
+        # Reordered output with a record missing from the input
+        outDf = pd.concat([outDf.iloc[::-1], pd.DataFrame({'id' : [5], 'gender' : ['M'], 'age' : ['*']})])
+        diff = AlignedDiff(inDf, outDf, QiQuery('id', 'gender, age', '', '*'), 2)
+        res = diff.compute()
+        # The unmatched record is not counted as changed, suppressed or generalized
+        assert res[AD_CHANGED] == {'id' : 0, 'gender' : 2, 'age' : 4}
+        assert res[AD_SUPPRESSED] == {'id' : 0, 'gender' : 2, 'age' : 1}
+        assert res[AD_GENERALIZED] == {'id' : 0, 'gender' : 0, 'age' : 3}
+        assert res[AD_RECORDS_PER_CHANGED] == {1 : 2, 2 : 2}
+        assert res[AD_UNMATCHED] == 1
+
+        # Without the identifier, records are aligned by position
+        res = AlignedDiff(inDf, outDf.iloc[:4], QiQuery('', 'gender, age', '', '*')).compute()
+        assert res[AD_CHANGED] == {'id' : 4, 'gender' : 4, 'age' : 4}
@@ -5,6 +5,7 @@ import pandas as pd
 from output_validation.utils.Constants import *
 from output_validation.utility.ClassSizes import ClassSizes
 from output_validation.utils.QiQuery import QiQuery
+from output_validation.utils.Partitioner import Partitioner
 
 class TestClassSizes:
 
@@ -72,7 +73,8 @@ class TestClassSizes:
                 EQ_SMALLEST : 2,
                 EQ_SUPPRESSED : 0,
                 EQ_NOCLASSES : 3,
-                EQ_NORECORDS : 10
+                EQ_NORECORDS : 10,
+                EQ_HISTOGRAM : {2: 1, 3: 1, 5: 1}
             },
             EQ_OUTPUT : dict()
         }
@@ -100,7 +102,8 @@ class TestClassSizes:
                 EQ_SMALLEST : 2,
                 EQ_SUPPRESSED : 0,
                 EQ_NOCLASSES : 3,
-                EQ_NORECORDS : 10
+                EQ_NORECORDS : 10,
+                EQ_HISTOGRAM : {2: 1, 3: 1, 5: 1}
             }
         }
         assert expecteddict[EQ_OUTPUT][EQ_AVG_SUP] == eqStat[EQ_OUTPUT][EQ_AVG_SUP]
@@ -127,7 +130,8 @@ class TestClassSizes:
                 EQ_SMALLEST : 1,
                 EQ_SUPPRESSED : 3,
                 EQ_NOCLASSES : 4,
-                EQ_NORECORDS : 10
+                EQ_NORECORDS : 10,
+                EQ_HISTOGRAM : {1: 1, 2: 1, 4: 1}
             }
         }
         assert expecteddict[EQ_OUTPUT][EQ_AVG_SUP] == eqStat[EQ_OUTPUT][EQ_AVG_SUP]
@@ -138,4 +142,13 @@ class TestClassSizes:
         assert expecteddict[EQ_OUTPUT][EQ_NOCLASSES] == eqStat[EQ_OUTPUT][EQ_NOCLASSES]
         assert expecteddict[EQ_OUTPUT][EQ_NORECORDS] == eqStat[EQ_OUTPUT][EQ_NORECORDS]
 
-        assert expecteddict == eqStat
\ No newline at end of file
+        assert expecteddict == eqStat
+
+    def testPartitionedEqualsUnpartitioned(self):
+        df = self.initDf(os.path.join(self.EQCLASS_TESTFILES_LOC, 'equivalence_class_test2.csv'))
+        qiQueryHelper = QiQuery('id','gender, ehak','','')
+        expected = ClassSizes(df, df, qiQueryHelper).compute()
+        for partitions in [1, 3, 16]:
+            partitioner = Partitioner(qiQueryHelper, partitions, 2)
+            assert ClassSizes(df, df, qiQueryHelper, partitioner).compute() == expected
+            partitioner.close()
@@ -0,0 +1,42 @@
+import pytest
+import pandas as pd
+from output_validation.utils.Constants import *
+from output_validation.utility.Contingency import Contingency
+
+class TestContingency:
+
+
+    def testPairs(self):
+        inDf = pd.DataFrame({'x' : ['a', 'a', 'b', 'b'], 'y' : ['c', 'c', 'd', 'd'], 'z' : ['c', 'd', 'c', 'd']})
+        outDf = pd.DataFrame({'x' : ['a', 'a', 'b', 'b'], 'y' : ['*', '*', '*', '*'], 'z' : ['c', 'd', 'c', 'd']})
+        res = Contingency(inDf, outDf, [['x', 'y'], ['x', 'z'], ['x', 'missing']]).compute()
+
+        # Perfect association destroyed by suppression
+        assert res[0] == {
+            CT_COLUMNS : ['x', 'y'],
+            CT_CELLS : [2, 2],
+            CT_INPUT_CRAMERS_V : 1.0,
+            CT_OUTPUT_CRAMERS_V : 0.0,
+            CT_CRAMERS_V_DELTA : -1.0,
+            CT_INPUT_MI : 1.0,
+            CT_OUTPUT_MI : 0.0,
+            CT_MI_DELTA : -1.0
+        }
+        # Independent columns stay independent
+        assert res[1][CT_INPUT_CRAMERS_V] == 0.0
+        assert res[1][CT_MI_DELTA] == 0.0
+        # Groups with columns not in the datasets are skipped
+        assert len(res) == 2
+
+
+    def testKWay(self):
+        df = pd.DataFrame({'x' : ['a', 'a', 'b', 'b'], 'y' : [1, 1, 2, 2], 'z' : ['c', 'd', 'c', 'd']})
+        res = Contingency(df, df.copy(), [['x', 'y', 'z']]).compute()
+        # H(x) + H(y) + H(z) - H(x, y, z) = 1 + 1 + 1 - 2
+        assert res == [{
+            CT_COLUMNS : ['x', 'y', 'z'],
+            CT_CELLS : [4, 4],
+            CT_INPUT_MI : 1.0,
+            CT_OUTPUT_MI : 1.0,
+            CT_MI_DELTA : 0.0
+        }]
@@ -0,0 +1,65 @@
+import pytest
+import os
+import logging
+import pandas as pd
+from output_validation.utils.Constants import *
+from output_validation.utility.Distribution import Distribution
+from output_validation.utils.Hierarchy import Hierarchy
+from output_validation.utils.QiQuery import QiQuery
+
+class TestDistribution:
+
+
+    def testMissingDataset(self):
+        df = pd.DataFrame({'gender' : ['M', 'F']})
+        assert Distribution(None, df, QiQuery('', 'gender', '', '*')).computeDistances() == dict()
+
+
+    def testDistances(self):
+        inDf = pd.DataFrame({'gender' : ['M', 'F', 'M', 'F'], 'age' : [1, 2, 3, 4]})
+        outDf = pd.DataFrame({'gender' : ['M', 'F', '*', '*'], 'age' : ['1', '1', '4', '*']})
+        res = Distribution(inDf, outDf, QiQuery('', 'gender', 'age', '*')).computeDistances()
+
+        assert res['gender'][DD_TV] == 0.5
+        assert res['gender'][DD_JS] == 0.31128
+        assert res['gender'][DD_CHI_SQUARE] == 2.66667
+        assert res['gender'][DD_DOF] == 2
+        assert res['gender'][DD_KL] > 0
+        # Not an ordered column
+        assert res['gender'][DD_EMD] is None
+        # Area between the cumulative distributions of 1, 2, 3, 4 and 1, 1, 4
+        assert res['age'][DD_EMD] == 0.66667
+
+
+    def testOrderedColumns(self, tmp_path):
+        inDf = pd.DataFrame({'age' : [21, 25, 34, 38], 'education' : ['low', 'mid', 'high', 'high']})
+        outDf = pd.DataFrame({'age' : ['20-29', '20-29', '30-39', '*'], 'education' : ['basic', 'basic', 'higher', 'higher']})
+        path = str(tmp_path / 'education.csv')
+        with open(path, 'w') as f:
+            f.write('low;basic;*\nmid;basic;*\nhigh;higher;*\n')
+        qiQueryHelper = QiQuery('', 'age, education', '', '*')
+
+        # Ranges are placed at their midpoint, 24.5 and 34.5
+        res = Distribution(inDf, outDf, qiQueryHelper).computeDistances()
+        assert res['age'][DD_EMD] == 3.5
+        assert res['education'][DD_EMD] is None
+        # The hierarchy orders the values, basic between low and mid
+        res = Distribution(inDf, outDf, qiQueryHelper, hierarchies={'education' : Hierarchy(path)}).computeDistances()
+        assert res['education'][DD_EMD] == 0.25
+
+
+    def testIdentical(self):
+        df = pd.DataFrame({'age' : [1, 2, 2, 5]})
+        res = Distribution(df, df.copy(), QiQuery('', 'age', '', '*')).computeDistances()
+        assert res == {'age' : {DD_KL : 0.0, DD_JS : 0.0, DD_TV : 0.0, DD_CHI_SQUARE : 0.0, DD_DOF : 2, DD_EMD : 0.0}}
+
+
+    def testSpecs(self):
+        inDf = pd.DataFrame({'gender' : ['M', 'F', 'M', 'M']})
+        specs = Distribution(inDf, None, QiQuery('', 'gender', '', '*')).specs()
+
+        assert list(specs.keys()) == ['distribution/in/distribution_gender']
+        spec = specs['distribution/in/distribution_gender']
+        assert spec['$schema'] == VEGA_LITE_SCHEMA
+        assert spec['mark'] == 'bar'
+        assert spec['data']['values'] == [{'value': 'M', 'records': 75.0}, {'value': 'F', 'records': 25.0}]
@@ -0,0 +1,77 @@
+import pytest
+import os
+import logging
+import numpy as np
+import pandas as pd
+from output_validation.utils.Constants import *
+from output_validation.utility.ClassSizes import ClassSizes
+from output_validation.utility.InformationLoss import InformationLoss
+from output_validation.utils.Hierarchy import Hierarchy
+from output_validation.utils.QiQuery import QiQuery
+
+class TestInformationLoss:
+
+
+    INFOLOSS_TESTFILES_LOC = os.path.join(os.getcwd(), 'tests', 'testfiles', 'information_loss_tests')
+
+
+    def initDf(self, path: str) -> pd.DataFrame:
+        df = pd.read_csv(path)
+        return df
+
+
+    def initInformationLoss(self, hierarchies: dict) -> InformationLoss:
+        qiQueryHelper = QiQuery('id', 'gender, age', '', '*')
+        inDf = self.initDf(os.path.join(self.INFOLOSS_TESTFILES_LOC, 'information_loss_input.csv'))
+        outDf = self.initDf(os.path.join(self.INFOLOSS_TESTFILES_LOC, 'information_loss_output.csv'))
+        eqClassStats = ClassSizes(inDf, outDf, qiQueryHelper).compute()[EQ_OUTPUT]
+        return InformationLoss(inDf, outDf, qiQueryHelper, hierarchies, eqClassStats, 2)
+
+
+    def testHierarchy(self):
+        hierarchy = Hierarchy(os.path.join(self.INFOLOSS_TESTFILES_LOC, 'age_hierarchy.csv'))
+        assert hierarchy.height == 2
+        codes = hierarchy.encode(pd.Series(['21', '30-39', '*', 'unknown']))
+        assert list(hierarchy.nodeLeaves[codes[:3]]) == [1, 2, 4]
+        assert codes[3] == -1
+        assert list(hierarchy.nodeCounts([1, 1, 1, 2])[codes[:3]]) == [1, 3, 5]
+        # A numeric column with missing values is read as floats
+        floatCodes = hierarchy.encode(pd.Series([21.0, 34.0, np.nan, 21.5]))
+        assert list(floatCodes[:2]) == list(hierarchy.encode(pd.Series(['21', '34'])))
+        assert list(floatCodes[2:]) == [-1, -1]
+        assert list(hierarchy.encodeLeaves(pd.Series([25.0, 38.0]))) == [1, 3]
+
+
+    def testWithoutHierarchies(self):
+        expected = {
+            IL_DISCERNIBILITY : 7,
+            IL_AVG_CLASS_SIZE : 0.5
+        }
+        assert self.initInformationLoss(dict()).compute() == expected
+
+
+    def testWithHierarchies(self):
+        hierarchies = {
+            'gender' : Hierarchy(os.path.join(self.INFOLOSS_TESTFILES_LOC, 'gender_hierarchy.csv')),
+            'age' : Hierarchy(os.path.join(self.INFOLOSS_TESTFILES_LOC, 'age_hierarchy.csv'))
+        }
+        expected = {
+            IL_DISCERNIBILITY : 7,
+            IL_AVG_CLASS_SIZE : 0.5,
+            IL_GENILOSS : {'gender' : 0.5, 'age' : 0.5},
+            IL_TOTAL_GENILOSS : 0.5,
+            IL_PRECISION : 0.4375,
+            IL_NON_UNIFORM_ENTROPY : {'gender' : 2.0, 'age' : 5.0},
+            IL_TOTAL_NON_UNIFORM_ENTROPY : 7.0
+        }
+        assert self.initInformationLoss(hierarchies).compute() == expected
+
+
+    def testNotGeneralizingValue(self):
+        hierarchies = {'age' : Hierarchy(os.path.join(self.INFOLOSS_TESTFILES_LOC, 'age_hierarchy.csv'))}
+        informationLoss = self.initInformationLoss(hierarchies)
+        outAges = pd.Series(['30-39', '20-29', '34', '*'])
+        # The input ages are 21, 25, 34 and 38. 30-39 does not generalize 21,
+        # so that record counts like the root: -log2(1/4)
+        assert informationLoss.nonUniformEntropy('age', hierarchies['age'].encode(outAges)) == 5.0
+        assert list(hierarchies['age'].generalizes(hierarchies['age'].encode(outAges), np.arange(4))) == [False, True, True, True]
@@ -4,6 +4,7 @@ import pandas as pd
 from output_validation.utils.Constants import *
 from output_validation.utility.SummaryStatistics import SummaryStatistics
 from output_validation.utils.QiQuery import QiQuery
+from output_validation.utils.ColumnExecutor import ColumnExecutor
 
 class TestSummaryStatistics:
 
@@ -114,3 +115,12 @@ class TestSummaryStatistics:
         assert res[SS_OUTPUT][SS_TOTAL_SUP] == expected[SS_OUTPUT][SS_TOTAL_SUP]
 
         assert res == expected
+
+
+    def testColumnWorkers(self):
+        inDf = self.initDf(os.path.join(self.SUMMARYSTAT_TESTFILES_LOC, 'summary_statistics_test1.csv'))
+        outDf = inDf.astype(str).mask(inDf.index.to_series().mod(3).eq(0), '*', axis=0)
+        qiQueryHelper = QiQuery('id', 'gender, ehak', '', '*')
+        expected = SummaryStatistics(inDf, outDf, qiQueryHelper).compute()
+        assert SummaryStatistics(inDf, outDf, qiQueryHelper, executor=ColumnExecutor(2)).compute() == expected
+        assert expected[SS_OUTPUT][SS_TOTAL_GENSUP][0] > 0
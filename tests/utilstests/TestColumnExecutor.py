@@ -0,0 +1,72 @@
+import pytest
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from output_validation.utils.ColumnExecutor import ColumnExecutor
+
+
+class TestColumnExecutor:
+
+
+    def testJointCodes(self):
+        inDf = pd.DataFrame({'gender' : ['M', 'F', 'M', None], 'age' : [1, 2, 3, 4]})
+        outDf = pd.DataFrame({'gender' : ['M', '*', 'M'], 'zip' : ['1', '2', '2']})
+        res = ColumnExecutor().frequencies([inDf, outDf])
+
+        assert list(res.keys()) == ['gender', 'age', 'zip']
+        values, counts = res['gender']
+        assert list(values) == ['M', 'F', '*']
+        # The last count is the number of missing values
+        assert list(counts[0]) == [2, 1, 0, 1]
+        assert list(counts[1]) == [2, 0, 1, 0]
+        assert res['age'][1][1] is None
+        assert res['zip'][1][0] is None
+
+
+    def testProcessPool(self):
+        rng = np.random.default_rng(0)
+        inDf = pd.DataFrame(dict([(f'c{i}', rng.integers(0, 10, 1000)) for i in range(8)]))
+        outDf = inDf.astype(str).mask(rng.random(inDf.shape) < 0.2, '*')
+        # Numeric columns in both datasets are shared raw
+        inDf['n'] = rng.integers(0, 5, 1000).astype(float)
+        outDf['n'] = inDf['n'].mask(rng.random(1000) < 0.1)
+        expected = ColumnExecutor().frequencies([inDf, outDf])
+        res = ColumnExecutor(3).frequencies([inDf, outDf])
+
+        assert list(res.keys()) == list(expected.keys())
+        for col, (values, counts) in res.items():
+            assert list(values) == list(expected[col][0])
+            assert all([np.array_equal(a, b) for a, b in zip(counts, expected[col][1])])
+
+
+    def testConcurrentCalls(self):
+        # Candidates are analyzed on several threads at once
+        dfs = [pd.DataFrame({'text' : [f'c{i}'] * 50, 'code' : [str(i)] * 50, 'n' : [i] * 50}) for i in range(6)]
+        executor = ColumnExecutor(4)
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            results = list(pool.map(lambda df: executor.frequencies([df]), dfs))
+
+        for i, res in enumerate(results):
+            assert list(res['text'][0]) == [f'c{i}']
+            assert list(res['code'][0]) == [str(i)]
+            assert list(res['n'][0]) == [i]
+            assert list(res['text'][1][0]) == [50, 0]
+
+
+    def testRawColumns(self):
+        inDf = pd.DataFrame({'age' : [30, 40, 30], 'weight' : [1.5, np.nan, 2.0]})
+        outDf = pd.DataFrame({'age' : [30, 30, 50], 'weight' : [2.0, 2.0, np.nan]})
+        res = ColumnExecutor().frequencies([inDf, outDf])
+
+        values, counts = res['age']
+        assert list(values) == [30, 40, 50]
+        assert list(counts[0]) == [2, 1, 0, 0]
+        assert list(counts[1]) == [2, 0, 1, 0]
+        assert list(res['weight'][1][1]) == [0, 2, 1]
+
+        # As text, raw columns count like columns coded as strings
+        text = ColumnExecutor().frequencies([inDf, outDf], asText=True)
+        coded = ColumnExecutor().frequencies([inDf.astype(str), outDf.astype(str)])
+        for col in ['age', 'weight']:
+            for i in range(2):
+                assert dict(zip(text[col][0], text[col][1][i])) == dict(zip(coded[col][0], coded[col][1][i]))
@@ -0,0 +1,33 @@
+import pytest
+import os
+import duckdb
+import pandas as pd
+from output_validation.utils.Partitioner import Partitioner
+from output_validation.utils.QiQuery import QiQuery
+
+class TestPartitioner:
+
+
+    EQCLASS_TESTFILES_LOC = os.path.join(os.getcwd(), 'tests', 'testfiles', 'equivalence_class_tests')
+
+
+    def testIllegalPartitionCount(self):
+        with pytest.raises(ValueError):
+            Partitioner(QiQuery('','gender','',''), 0)
+
+
+    def testClassesNotSplit(self):
+        df = pd.read_csv(os.path.join(self.EQCLASS_TESTFILES_LOC, 'equivalence_class_test2.csv'))
+        partitioner = Partitioner(QiQuery('id','gender, ehak','',''), 3, 2)
+        paths = partitioner.partition(df)
+        assert paths == partitioner.partition(df)
+        # An equal dataset is a different object and written separately
+        assert paths != partitioner.partition(df.copy())
+
+        classes = partitioner.mapPartitions(df, lambda con: con.execute('SELECT gender, ehak, count(*) FROM df GROUP BY gender, ehak').fetchall())
+        merged = [row for partition in classes for row in partition]
+        expected = duckdb.query('SELECT gender, ehak, count(*) FROM df GROUP BY gender, ehak').fetchall()
+        assert sorted(merged, key=str) == sorted(expected, key=str)
+
+        partitioner.close()
+        assert not any([os.path.exists(path) for path in paths])
@@ -0,0 +1,34 @@
+import pytest
+import io
+from output_validation.utils.Progress import Progress, ProgressReader, CancellationToken, ValidationCancelled
+
+class TestProgress:
+
+
+    def testCallback(self):
+        events = list()
+        progress = Progress(lambda stage, done, total: events.append((stage, done, total)))
+        progress.stage('first')
+        progress.advance('first', 5, 10)
+        assert events == [('first', 0, None), ('first', 5, 10)]
+        # Reporting without a callback or token does nothing
+        Progress().advance('first', 1, 1)
+
+
+    def testCancellation(self):
+        token = CancellationToken()
+        progress = Progress(token=token)
+        progress.stage('first')
+        assert not token.cancelled
+        token.cancel()
+        with pytest.raises(ValidationCancelled):
+            progress.advance('first', 1, 2)
+
+
+    def testReader(self):
+        events = list()
+        reader = ProgressReader(io.BytesIO(b'a,b\n1,2\n'), 'Loading', 8,
+                                Progress(lambda stage, done, total: events.append(done)))
+        assert reader.read(4) == b'a,b\n'
+        assert reader.read() == b'1,2\n'
+        assert events == [4, 8]
@@ -1,4 +1,5 @@
 import pytest
+import duckdb
 from output_validation.utils.QiQuery import QiQuery
 
 class TestQiQuery:
@@ -10,22 +11,16 @@ class TestQiQuery:
         assert not qiQ_1.quasiIdentifyingColumns
         assert not qiQ_1.sensitiveColumns
         assert qiQ_1.blindSymbol == '*'
-        assert qiQ_1.ALLBLIND == '1 = 1'
-        assert qiQ_1.NOBLIND == '1 = 1'
         qiQ_2 = QiQuery('asd','bsd, csd, dsd','','')
         assert qiQ_2.identifyingColumns == 'asd'
         assert qiQ_2.quasiIdentifyingColumns == 'bsd, csd, dsd'
         assert not qiQ_2.sensitiveColumns
         assert qiQ_2.blindSymbol == '*'
-        assert qiQ_2.ALLBLIND == "bsd = '*' AND csd = '*' AND dsd = '*'"
-        assert qiQ_2.NOBLIND == "bsd IS DISTINCT FROM '*' OR csd IS DISTINCT FROM '*' OR dsd IS DISTINCT FROM '*'"
         qiQ_3 = QiQuery('id','qid','sens',"'")
         assert qiQ_3.identifyingColumns == 'id'
         assert qiQ_3.quasiIdentifyingColumns == 'qid'
         assert qiQ_3.sensitiveColumns == 'sens'
         assert qiQ_3.blindSymbol == "*"
-        assert qiQ_3.ALLBLIND == "qid = '*'"
-        assert qiQ_3.NOBLIND == "qid IS DISTINCT FROM '*'"
 
 
     def testStringToList(self):
@@ -86,3 +81,29 @@ class TestQiQuery:
         assert expected1 == computed1
         assert expected2 == computed2
         assert expected3 == computed3
+
+
+    def testQuoting(self):
+        qiQ_1 = QiQuery('','','','')
+        mydict1 = {'key1' : "O'Brien", 'key2' : 5}
+        expected1 = "key1 = 'O''Brien' AND key2 = 5"
+        assert qiQ_1.dictToQueryString(qiQ_1.AND, '=', mydict1) == expected1
+        assert qiQ_1.quoteIdentifier('col "x"') == '"col ""x"""'
+
+
+    def testParameterizedQuery(self):
+        qiQ_1 = QiQuery('id','one, two','sens','*')
+        assert qiQ_1.quasiIdentifyingColumnsList == ['one', 'two']
+        assert qiQ_1.identifyingColumnsList == ['id']
+        assert qiQ_1.quotedQuasiIdentifyingColumns == '"one", "two"'
+        condition = qiQ_1.parameterizedCondition(qiQ_1.AND, ' = ', ['one', 'two'])
+        assert condition == '"one" = ? AND "two" = ?'
+        # Conditions of the same shape are built once
+        assert qiQ_1.parameterizedCondition(qiQ_1.AND, '=', ['one', 'two']) is condition
+        assert qiQ_1.parameterizedCondition(qiQ_1.OR, '=', ['one'], 'CAST({} AS VARCHAR)') == 'CAST("one" AS VARCHAR) = ?'
+        assert qiQ_1.parameterizedCondition('somethingnotallowed', '=', ['one']) == '1 = 1'
+
+        con = duckdb.connect()
+        con.execute('''CREATE TABLE t AS SELECT * FROM (VALUES ('O''Brien', 5), ('x', 5)) v(one, two)''')
+        assert con.execute(f'SELECT count(*) FROM t WHERE {condition}', ["O'Brien", 5]).fetchall() == [(1,)]
+        con.close()
@@ -0,0 +1,61 @@
+import pytest
+from output_validation.utils.Constants import *
+from output_validation.utils.Results import ClassSizeResult, SummaryResult, AttackRiskResult, Report, percent
+
+
+class TestResults:
+
+
+    def testPercent(self):
+        assert percent(0.12) == '12.0 %'
+        assert percent(1/3) == '33.333 %'
+        assert percent(1/3, 1) == '33.3 %'
+
+
+    def testClassSizes(self):
+        result = ClassSizeResult(10, 2, {3: 1, 5: 1})
+        assert result.classes == 3
+        assert result.smallest == 3 and result.biggest == 5
+        assert result.averageSize == 10 / 3
+        assert result.averageSizeWithoutSuppressed == 4.0
+        assert result.toDict()[EQ_AVG_SUP] == 3.333
+        assert result.toDict()[EQ_NOCLASSES] == 3
+
+
+    def testSummary(self):
+        inputResult = SummaryResult(4, {'a': 2, 'b': 4}, {'a': ['x', 2], 'b': [1, 1]})
+        assert inputResult.toDict() == {SS_DISTINCT: {'a': 2, 'b': 4},
+                                        SS_MODES: {'a': ['x', 2], 'b': [1, 1]},
+                                        SS_INFORMATIVE: {'a': 4, 'b': 4}}
+
+        outputResult = SummaryResult(4, {'a': 2, 'b': 1}, {'a': ['x', 2], 'b': ['*', 4]}, {'a': 1, 'b': 4}, {'a': 2, 'b': 4})
+        assert outputResult.totalSuppressed == 5 and outputResult.totalChanged == 6
+        assert outputResult.suppressedOfChanged == 5 / 6
+        resDict = outputResult.toDict()
+        assert resDict[SS_SUP] == {'a': [1, '25.0 %'], 'b': [4, '100.0 %']}
+        assert resDict[SS_INFORMATIVE] == {'a': 3, 'b': 0}
+        assert resDict[SS_TOTAL_GENSUP] == [6, '75.0 %']
+        assert resDict[SS_TOTAL_SUP] == [5, '62.5 %']
+        assert resDict[SS_SUP_OF_CHANGED] == '83.333 %'
+
+
+    def testPopulationBasedRisks(self):
+        # 100 records in 20 classes, the smallest of size 2
+        risks = AttackRiskResult(0.1, 0.2, 0.5, 0.1, 0.1)
+        assert risks.journalistRisk == 0.5 and risks.marketerRisk == 0.2
+        risks = AttackRiskResult(0.1, 0.2, 0.5, 0.1, 0.1, samplingFraction=0.1, sampleRecords=100, populationUniqueness=0.0)
+        assert risks.journalistRisk == pytest.approx(0.05) and risks.marketerRisk == pytest.approx(0.02)
+        # A population unique is expected among the records
+        risks.populationUniqueness = 0.03
+        assert risks.journalistRisk == 1.0 and risks.marketerRisk == 0.03
+
+
+    def testReport(self):
+        report = Report(inputRisks=AttackRiskResult(0.5, 0.5, 0.5, 1.0, 1.0))
+        # Only computed sections are rendered
+        assert report.toDict() == {SECTION_STATUS: dict()}
+        report.status[ATTACK_RISKS] = ST_COMPLETE
+        assert report.toDict()[ATTACK_RISKS][AR_INPUT][AR_ESTIMATED_JOURNALIST_RISK] == '50.0 %'
+        assert report.toDict()[ATTACK_RISKS][AR_OUTPUT] == dict()
+        with pytest.raises(AttributeError):
+            report.unknown = 1
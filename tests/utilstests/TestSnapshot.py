@@ -0,0 +1,56 @@
+import pytest
+import json
+import pandas as pd
+from output_validation.utils.Constants import *
+from output_validation.utils.Results import Report, ClassSizeResult, PrivacyResult
+from output_validation.utils.Snapshot import Snapshot
+
+
+class TestSnapshot:
+
+
+    def initSnapshot(self, histogram, violatingClasses, key = b'secret'):
+        report = Report(outputClasses=ClassSizeResult(sum([size * count for size, count in histogram.items()]), 0, histogram),
+                        privacy=PrivacyResult(min(histogram), dict(), 0, dict(), min(histogram), dict()))
+        return Snapshot(report, violatingClasses, key)
+
+
+    def testClassKeys(self):
+        snapshot = self.initSnapshot({1: 1}, None)
+        # Integral floats, e.g. of a column with missing values, match integers
+        assert snapshot.classKey(['M', 56.0]) == snapshot.classKey(['M', 56])
+        assert snapshot.classKey(['M', None]) != snapshot.classKey(['M', 'None'])
+        assert len(snapshot.classKey(['M', 56])) == Snapshot.KEY_LENGTH
+        # Keys depend on the secret key
+        assert self.initSnapshot({1: 1}, None, b'other').classKey(['M', 56]) != snapshot.classKey(['M', 56])
+        assert self.initSnapshot({1: 1}, None, None).classKey(['M', 56]) != snapshot.classKey(['M', 56])
+
+
+    def testDiff(self, tmp_path):
+        path = str(tmp_path / 'snapshot.json')
+        before = pd.DataFrame({'gender': ['M', 'N'], 'ehak': [56, 245], PR_K: [True, True]})
+        self.initSnapshot({1: 2, 4: 1}, before).write(path)
+
+        after = pd.DataFrame({'gender': ['N', 'M'], 'ehak': [245, 50], PR_K: [True, True]})
+        snapshot = self.initSnapshot({1: 2, 2: 1, 4: 1}, after)
+        diff = snapshot.diff(snapshot.read(path))
+        assert diff[SD_HISTOGRAMS] == {EQ_OUTPUT: {'2': 1}}
+        assert diff[SD_METRICS][f'{EQ_OUTPUT}/{EQ_NORECORDS}'] == [6, 8, 2]
+        assert diff[SD_NEW_VIOLATIONS] == {snapshot.classKey(['M', 50]): [PR_K]}
+        assert diff[SD_RESOLVED_VIOLATIONS] == [snapshot.classKey(['M', 56])]
+
+
+    def testDifferentKey(self, tmp_path):
+        path = str(tmp_path / 'snapshot.json')
+        violating = pd.DataFrame({'gender': ['M'], 'ehak': [56], PR_K: [True]})
+        self.initSnapshot({1: 1}, violating).write(path)
+        snapshot = self.initSnapshot({1: 1}, violating, b'other')
+        # Classes under different keys cannot be compared
+        assert SD_NEW_VIOLATIONS not in snapshot.diff(snapshot.read(path))
+
+
+    def testVersion(self, tmp_path):
+        path = tmp_path / 'snapshot.json'
+        path.write_text(json.dumps({SN_VERSION: 0}))
+        with pytest.raises(ValueError):
+            self.initSnapshot({1: 1}, None).read(str(path))
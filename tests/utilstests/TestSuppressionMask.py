@@ -0,0 +1,30 @@
+import pytest
+import os
+import logging
+import pandas as pd
+from output_validation.utils.SuppressionMask import SuppressionMask
+from output_validation.utils.QiQuery import QiQuery
+
+class TestSuppressionMask:
+
+
+    def testMask(self):
+        df = pd.DataFrame({'id' : [1, 2, 3, 4],
+                            'gender' : ['M', '*', '*', 'F'],
+                            'age' : ['*', '*', '20-29', None],
+                            'costs' : [1.5, 2.0, 3.0, 4.0]})
+        mask = SuppressionMask(df, QiQuery('id', 'gender, age', 'costs', '*'))
+
+        assert mask.suppressedCounts() == {'id' : 0, 'gender' : 2, 'age' : 2, 'costs' : 0}
+        assert mask.mask('gender').tolist() == [False, True, True, False]
+        assert mask.fullySuppressed.tolist() == [False, True, False, False]
+        assert mask.anySuppressed.tolist() == [True, True, True, False]
+        assert mask.nrFullySuppressed == 1
+
+
+    def testNumericQid(self):
+        # Numeric columns cannot contain the blind symbol
+        df = pd.DataFrame({'age' : [20, 30], 'zip' : [111, 222]})
+        mask = SuppressionMask(df, QiQuery('', 'age, zip', '', '*'))
+        assert mask.nrFullySuppressed == 0
+        assert not mask.anySuppressed.any()
@@ -0,0 +1,151 @@
+import logging
+import numpy as np
+import pandas as pd
+from output_validation.utils import QiQuery
+from output_validation.utils.SuppressionMask import SuppressionMask
+from output_validation.utils.Constants import *
+
+
+class AlignedDiff:
+    '''Cell by cell comparison of every output record with its input
+    record. Records are aligned by the first identifying column if it
+    identifies the input records uniquely, by their position otherwise.
+    Every cell of a matched output record is classified as unchanged,
+    suppressed (blind in the output only) or generalized (any other
+    change), output records without an input record are only counted as
+    unmatched. The changed and suppressed flags are kept as bit-packed
+    matrices with one row per output record. The output is processed in
+    chunks, only the input rows matched to the current chunk are
+    gathered.'''
+
+    def __init__(self,
+                inDataDf: pd.DataFrame,
+                outDataDf: pd.DataFrame,
+                qiQueryHelper: QiQuery,
+                chunkSize: int = 100000,
+                inMask: SuppressionMask = None,
+                outMask: SuppressionMask = None):
+        self._inDataDf = inDataDf
+        self._outDataDf = outDataDf
+        self._qiQueryHelper = qiQueryHelper
+        self._chunkSize = chunkSize
+        self._inMask = inMask if inMask is not None else SuppressionMask(inDataDf, qiQueryHelper)
+        self._outMask = outMask if outMask is not None else SuppressionMask(outDataDf, qiQueryHelper)
+        self._columns = [col for col in inDataDf.columns if col in outDataDf.columns]
+        self._changed = None
+        self._suppressed = None
+        self._unmatched = 0
+
+
+    @property
+    def inDataDf(self):
+        '''Input dataset.'''
+        return self._inDataDf
+
+
+    @property
+    def outDataDf(self):
+        '''Output dataset.'''
+        return self._outDataDf
+
+
+    @property
+    def qiQueryHelper(self):
+        '''Queryhelper attribute.'''
+        return self._qiQueryHelper
+
+
+    @property
+    def chunkSize(self):
+        '''Number of output records compared at a time.'''
+        return self._chunkSize
+
+
+    @property
+    def columns(self):
+        '''Columns present in both datasets, in input order.'''
+        return self._columns
+
+
+    @property
+    def changed(self):
+        '''Bit-packed matrix of changed cells, None before compute.'''
+        return self._changed
+
+
+    @property
+    def suppressed(self):
+        '''Bit-packed matrix of suppressed cells, None before compute.'''
+        return self._suppressed
+
+
+    @property
+    def unmatched(self):
+        '''Number of output records without an input record.'''
+        return self._unmatched
+
+
+    def compute(self) -> dict:
+        '''Compares the datasets and returns the per column and per record
+        rollups of the classification.'''
+        nrOfRows = self.outDataDf.shape[0]
+        packedWidth = (len(self.columns) + 7) // 8
+        self._changed = np.zeros((nrOfRows, packedWidth), dtype=np.uint8)
+        self._suppressed = np.zeros((nrOfRows, packedWidth), dtype=np.uint8)
+        self._unmatched = 0
+        changedPerColumn = np.zeros(len(self.columns), dtype=np.int64)
+        suppressedPerColumn = np.zeros(len(self.columns), dtype=np.int64)
+        changedPerRecord = np.zeros(len(self.columns) + 1, dtype=np.int64)
+
+        positions = self.inputPositions()
+        for start in range(0, nrOfRows, self.chunkSize):
+            end = min(start + self.chunkSize, nrOfRows)
+            chunkPositions = positions(start, end)
+            matched = chunkPositions >= 0
+            self._unmatched += int((~matched).sum())
+
+            # Unmatched records are not compared, they are only counted
+            changed = np.zeros((end - start, len(self.columns)), dtype=bool)
+            suppressed = np.zeros((end - start, len(self.columns)), dtype=bool)
+            for i, col in enumerate(self.columns):
+                outValues = self.outDataDf[col].values[start:end][matched].astype(str)
+                inValues = self.inDataDf[col].values[chunkPositions[matched]].astype(str)
+                changed[matched, i] = outValues != inValues
+                suppressed[matched, i] = (self._outMask.mask(col)[start:end][matched]
+                                          & ~self._inMask.mask(col)[chunkPositions[matched]])
+
+            self._changed[start:end] = np.packbits(changed, axis=1)
+            self._suppressed[start:end] = np.packbits(suppressed, axis=1)
+            changedPerColumn += changed.sum(axis=0)
+            suppressedPerColumn += suppressed.sum(axis=0)
+            changedPerRecord += np.bincount(changed[matched].sum(axis=1), minlength=len(self.columns) + 1)
+
+        diffDict = dict()
+        diffDict[AD_CHANGED] = dict(zip(self.columns, changedPerColumn.tolist()))
+        diffDict[AD_SUPPRESSED] = dict(zip(self.columns, suppressedPerColumn.tolist()))
+        diffDict[AD_GENERALIZED] = dict(zip(self.columns, (changedPerColumn - suppressedPerColumn).tolist()))
+        diffDict[AD_RECORDS_PER_CHANGED] = dict([(nrChanged, int(records)) for nrChanged, records in enumerate(changedPerRecord) if records])
+        diffDict[AD_UNMATCHED] = self.unmatched
+        return diffDict
+
+
+    def inputPositions(self):
+        '''Returns a function mapping a range of output records to the
+        positions of their input records, -1 for unmatched records.'''
+        identifyingColumns = self.qiQueryHelper.identifyingColumnsList
+        key = identifyingColumns[0] if identifyingColumns else None
+        if key in self.inDataDf.columns and key in self.outDataDf.columns:
+            keyIndex = pd.Index(self.inDataDf[key])
+            if keyIndex.is_unique:
+                return lambda start, end: keyIndex.get_indexer(self.outDataDf[key].values[start:end])
+            logging.warning(f'Identifying column {key} is not unique in the input. Aligning records by position.')
+
+        if self.inDataDf.shape[0] != self.outDataDf.shape[0]:
+            logging.warning('Input and output differ in the number of records. Aligning records by position.')
+        nrOfInputRows = self.inDataDf.shape[0]
+        return lambda start, end: np.where(np.arange(start, end) < nrOfInputRows, np.arange(start, end), -1)
+
+
+    def cells(self, matrix: np.ndarray) -> np.ndarray:
+        '''Unpacks one of the bit-packed matrices to a boolean matrix.'''
+        return np.unpackbits(matrix, axis=1, count=len(self.columns)).astype(bool)
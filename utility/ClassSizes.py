@@ -1,8 +1,10 @@
-from xdrlib import ConversionError
 import pandas as pd
 import logging
 import duckdb
 from output_validation.utils import QiQuery
+from output_validation.utils.Partitioner import Partitioner
+from output_validation.utils.SuppressionMask import SuppressionMask
+from output_validation.utils.Results import ClassSizeResult, render
 from output_validation.utils.Constants import *
 
 class ClassSizes:
@@ -11,10 +13,16 @@ class ClassSizes:
     def __init__(self, 
                 inDataDf: pd.DataFrame, 
                 outDataDf: pd.DataFrame,
-                qiQueryHelper: QiQuery):
+                qiQueryHelper: QiQuery,
+                partitioner: Partitioner = None,
+                inMask: SuppressionMask = None,
+                outMask: SuppressionMask = None):
         self._inDataDf = inDataDf
         self._outDataDf = outDataDf
         self._qiQueryHelper = qiQueryHelper
+        self._partitioner = partitioner
+        self._inMask = inMask
+        self._outMask = outMask
 
 
     @property
@@ -35,105 +43,107 @@ class ClassSizes:
         return self._qiQueryHelper
 
 
+    @property
+    def partitioner(self):
+        '''Hash partitioner, if equivalence classes are computed
+        partition by partition.'''
+        return self._partitioner
+
+
+    @property
+    def inMask(self):
+        '''Suppressed cells of the input dataset.'''
+        if self._inMask is None:
+            self._inMask = SuppressionMask(self.inDataDf, self.qiQueryHelper)
+        return self._inMask
+
+
+    @property
+    def outMask(self):
+        '''Suppressed cells of the output dataset.'''
+        if self._outMask is None:
+            self._outMask = SuppressionMask(self.outDataDf, self.qiQueryHelper)
+        return self._outMask
+
+
     def compute(self) -> dict:
         '''Computes equivalence class statistics for both datasets.'''
         eqDict = dict()
+        inputResult, outputResult = self.computeResults()
+        eqDict[EQ_INPUT] = render(inputResult)
+        eqDict[EQ_OUTPUT] = render(outputResult)
+        return eqDict
+
+
+    def computeResults(self) -> tuple:
+        '''Equivalence class statistics of the input and output
+        datasets, None for a missing dataset.'''
         if not self.qiQueryHelper.quasiIdentifyingColumns:
             raise RuntimeError('Unable to compute equivalence class statistics, quasi-identifying columns not specified.')
-        eqDict[EQ_INPUT] = self.computeInput() if self.inDataDf is not None else dict()
-        eqDict[EQ_OUTPUT] = self.computeOutput() if self.outDataDf is not None else dict()
-        return eqDict
+        return (self.computeInputResult() if self.inDataDf is not None else None,
+                self.computeOutputResult() if self.outDataDf is not None else None)
 
 
     def computeInput(self) -> dict:
         '''Computes equivalence class statistics for the input dataset.'''
-        inDict = dict()
-        ecStats = self.averageEcValue(self.inDataDf, True)
-        inDict[EQ_AVG_SUP] = ecStats[0]
-        inDict[EQ_AVG_NOSUP] = ecStats[1]
-        inDict[EQ_SUPPRESSED] = ecStats[2]
-        # Not including completely suppressed equivalence class, if it exists
-        inDict[EQ_SMALLEST] = self.smallestEqClassSize(self.inDataDf)
-        inDict[EQ_BIGGEST] = self.biggestEqClassSize(self.inDataDf)
-        inDict[EQ_NOCLASSES] = ecStats[3]
-        inDict[EQ_NORECORDS] = self.inDataDf.shape[0]
-        return inDict
+        return self.computeInputResult().toDict()
 
     
     def computeOutput(self) -> dict:
         '''Computes equivalence class statistics for the output dataset.'''
-        outDict = dict()
-        ecStats = self.averageEcValue(self.outDataDf, False)
-        outDict[EQ_AVG_SUP] = ecStats[0]
-        outDict[EQ_AVG_NOSUP] = ecStats[1]
-        outDict[EQ_SUPPRESSED] = ecStats[2]
-        # Not including completely suppressed equivalence class, if it exists
-        outDict[EQ_SMALLEST] = self.smallestEqClassSize(self.outDataDf)
-        outDict[EQ_BIGGEST] = self.biggestEqClassSize(self.outDataDf)
-        outDict[EQ_NOCLASSES] = ecStats[3]
-        outDict[EQ_NORECORDS] = self.outDataDf.shape[0]
-        return outDict
-    
+        return self.computeOutputResult().toDict()
 
-    def averageEcValue(self, df, indata) -> tuple:
-        '''Calculates the average equivalence class size
-        based on number of rows with matching quasi-identifiers.'''
-        
-        nrOfRows = df.shape[0]
-        # Find all equivalence classes and their respective sizes
 
-        eqClassesSizesDf = duckdb.query(f'''SELECT DISTINCT {self.qiQueryHelper.quasiIdentifyingColumns}, count(*) as {K_ANONYMITY} FROM df 
-                            GROUP BY {self.qiQueryHelper.quasiIdentifyingColumns} ORDER BY {K_ANONYMITY} DESC''').to_df()
-        nrOfEqClasses = eqClassesSizesDf.shape[0]
-
-        if nrOfEqClasses == 0:
-            inout = 'Input' if indata else 'Output'
-            raise RuntimeError(f'{inout} dataset has no rows!')
-
-        avgEcWithAllsuppressed = round(nrOfRows / nrOfEqClasses, 3)
-
-        suppressedClassSize = None
-        if not indata:
-            ALLBLIND = self.qiQueryHelper.ALLBLIND
-            # Can throw a runtime exception when non-string column has no suppressed values.
-            # This means the suppressed class size is 0, but we can keep going.
-            try:
-                suppressedClassSize = duckdb.query(f'''SELECT {K_ANONYMITY} FROM eqClassesSizesDf WHERE {ALLBLIND} ''').fetchall()
-            except RuntimeError as e:
-                logging.warning(str(e))
-                suppressedClassSize = 0
-        
-        if not suppressedClassSize:
-            suppressedClassSize = 0
-            formula = nrOfEqClasses
-        else:
-            suppressedClassSize = suppressedClassSize[0][0]
-            formula = nrOfEqClasses-1
-
-        divisor = formula if nrOfEqClasses > 1 else 1
-        avgEcWithoutAllsuppressed = round((nrOfRows-suppressedClassSize) / divisor, 3)
-
-        return (avgEcWithAllsuppressed, avgEcWithoutAllsuppressed, suppressedClassSize, eqClassesSizesDf.shape[0])
+    def computeInputResult(self) -> ClassSizeResult:
+        '''Equivalence class statistics of the input dataset.'''
+        histogram, suppressedClassSize = self.classSizeHistogram(self.inDataDf, True)
+        return ClassSizeResult(self.inDataDf.shape[0], suppressedClassSize, histogram)
 
 
-    def smallestEqClassSize(self, df) -> int:
-        '''Returns the size of the smallest equivalence class.'''
+    def computeOutputResult(self) -> ClassSizeResult:
+        '''Equivalence class statistics of the output dataset.'''
+        histogram, suppressedClassSize = self.classSizeHistogram(self.outDataDf, False)
+        return ClassSizeResult(self.outDataDf.shape[0], suppressedClassSize, histogram)
 
-        NOBLIND = self.qiQueryHelper.NOBLIND
 
-        minEqClassSize = duckdb.query(f'''SELECT {K_ANONYMITY} FROM 
-                                            (SELECT DISTINCT {self.qiQueryHelper.quasiIdentifyingColumns}, count(*) as {K_ANONYMITY} FROM df
-                                            WHERE {NOBLIND} GROUP BY {self.qiQueryHelper.quasiIdentifyingColumns} ORDER BY {K_ANONYMITY} ASC LIMIT 1)''').fetchall()
-        return minEqClassSize[0][0] if minEqClassSize else 0
-
-
-    def biggestEqClassSize(self, df) -> int:
-        '''Returns the size of the biggest NOT COMPLETELY suppressed
-        equivalence class.'''
-
-        NOBLIND = self.qiQueryHelper.NOBLIND
+    def classSizeHistogram(self, df, indata) -> tuple:
+        '''Returns the number of equivalence classes per class size, not
+        including the completely suppressed class, and the size of the
+        completely suppressed class. Computed with a single aggregation
+        over the dataset, or over each of its partitions, from which the
+        completely suppressed class known from the suppression mask is
+        taken out.'''
+        if self.partitioner is None:
+            con = duckdb.connect()
+            histogram = self.partitionHistogram(con, df)
+            con.close()
+        else:
+            # Partitions never share an equivalence class, so the
+            # histograms of the partitions add up
+            histogram = dict()
+            for partitionHistogram in self.partitioner.mapPartitions(df, self.partitionHistogram):
+                for size, count in partitionHistogram.items():
+                    histogram[size] = histogram.get(size, 0) + count
+
+        if not histogram:
+            inout = 'Input' if indata else 'Output'
+            raise RuntimeError(f'{inout} dataset has no rows!')
 
-        maxEqClassSize = duckdb.query(f'''SELECT {K_ANONYMITY} FROM 
-                                            (SELECT DISTINCT {self.qiQueryHelper.quasiIdentifyingColumns}, count(*) as {K_ANONYMITY} FROM df
-                                            WHERE {NOBLIND} GROUP BY {self.qiQueryHelper.quasiIdentifyingColumns} ORDER BY {K_ANONYMITY} DESC LIMIT 1)''').fetchall()
-        return maxEqClassSize[0][0] if maxEqClassSize else 0
\ No newline at end of file
+        suppressedClassSize = (self.inMask if indata else self.outMask).nrFullySuppressed
+        if suppressedClassSize:
+            histogram[suppressedClassSize] -= 1
+            if not histogram[suppressedClassSize]:
+                del histogram[suppressedClassSize]
+        return dict(sorted(histogram.items())), suppressedClassSize
+
+
+    def partitionHistogram(self, con, df = None) -> dict:
+        '''Returns the class size histogram of df, including the completely
+        suppressed class. If df is not given, the view df of the connection
+        is used.'''
+        if df is not None:
+            con.register('df', df)
+        histogram = con.execute(f'''SELECT {K_ANONYMITY}, count(*) FROM 
+                            (SELECT count(*) as {K_ANONYMITY} FROM df GROUP BY {self.qiQueryHelper.quotedQuasiIdentifyingColumns})
+                            GROUP BY {K_ANONYMITY}''').fetchall()
+        return dict([(int(size), int(count)) for size, count in histogram])
@@ -0,0 +1,111 @@
+import logging
+import numpy as np
+import pandas as pd
+from output_validation.utils.Constants import *
+
+
+class Contingency:
+    '''Comparison of the joint distributions of groups of columns in the
+    input and output datasets. Joint frequency tables are kept sparse as
+    coordinate lists of the integer coded values of the non-empty cells,
+    so their size is bounded by the number of records rather than by the
+    product of the cardinalities. Association is measured by Cramer's V
+    for pairs and by mutual information (total correlation for more
+    than two columns) for all groups.'''
+
+    def __init__(self,
+                inDataDf: pd.DataFrame,
+                outDataDf: pd.DataFrame,
+                columnGroups: list):
+        self._inDataDf = inDataDf
+        self._outDataDf = outDataDf
+        self._columnGroups = columnGroups
+
+
+    @property
+    def inDataDf(self):
+        '''Input dataset.'''
+        return self._inDataDf
+
+
+    @property
+    def outDataDf(self):
+        '''Output dataset.'''
+        return self._outDataDf
+
+
+    @property
+    def columnGroups(self):
+        '''Groups of columns whose joint distributions are compared.'''
+        return self._columnGroups
+
+
+    def compute(self) -> list:
+        '''Returns the association of every column group in both
+        datasets and its change from input to output.'''
+        resList = list()
+        for columns in self.columnGroups:
+            missing = [col for col in columns if col not in self.inDataDf.columns or col not in self.outDataDf.columns]
+            if missing or len(columns) < 2:
+                logging.warning(f'Skipping contingency comparison of {columns}, expected at least two columns present in both datasets.')
+                continue
+            inTable = self.table(self.inDataDf, columns)
+            outTable = self.table(self.outDataDf, columns)
+
+            resDict = dict()
+            resDict[CT_COLUMNS] = columns
+            resDict[CT_CELLS] = [len(inTable[1]), len(outTable[1])]
+            if len(columns) == 2:
+                inV, outV = self.cramersV(*inTable), self.cramersV(*outTable)
+                resDict[CT_INPUT_CRAMERS_V] = round(inV, 5)
+                resDict[CT_OUTPUT_CRAMERS_V] = round(outV, 5)
+                resDict[CT_CRAMERS_V_DELTA] = round(outV - inV, 5)
+            inMi, outMi = self.mutualInformation(*inTable), self.mutualInformation(*outTable)
+            resDict[CT_INPUT_MI] = round(inMi, 5)
+            resDict[CT_OUTPUT_MI] = round(outMi, 5)
+            resDict[CT_MI_DELTA] = round(outMi - inMi, 5)
+            resList.append(resDict)
+        return resList
+
+
+    def table(self, df: pd.DataFrame, columns: list) -> tuple:
+        '''Sparse joint frequency table of the columns: a matrix of value
+        codes with a row per non-empty cell, and the cell counts.'''
+        codes = np.column_stack([pd.factorize(df[col].astype(str))[0] for col in columns])
+        if codes.shape[0] == 0:
+            return codes, np.zeros(0, dtype=np.int64)
+        return np.unique(codes, axis=0, return_counts=True)
+
+
+    def marginals(self, coordinates: np.ndarray, counts: np.ndarray) -> list:
+        '''Marginal counts of every column of a sparse table.'''
+        return [np.bincount(coordinates[:, i], weights=counts) for i in range(coordinates.shape[1])]
+
+
+    def cramersV(self, coordinates: np.ndarray, counts: np.ndarray) -> float:
+        '''Cramer's V of a sparse two dimensional table. The chi-square
+        statistic is n * (sum n_ij^2 / (n_i n_j) - 1), a sum over the
+        non-empty cells only.'''
+        n = counts.sum()
+        rows, cols = self.marginals(coordinates, counts)
+        smaller = min(len(rows), len(cols)) - 1
+        if n == 0 or smaller == 0:
+            return 0.0
+        chiSquare = n * (np.sum(counts**2 / (rows[coordinates[:, 0]] * cols[coordinates[:, 1]])) - 1)
+        return float(np.sqrt(max(chiSquare, 0.0) / (n * smaller)))
+
+
+    def mutualInformation(self, coordinates: np.ndarray, counts: np.ndarray) -> float:
+        '''Total correlation in bits of a sparse table, the sum of the
+        marginal entropies minus the joint entropy. For two columns
+        this is their mutual information.'''
+        n = counts.sum()
+        if n == 0:
+            return 0.0
+        marginalEntropy = sum([self.entropy(marginal[marginal > 0] / n) for marginal in self.marginals(coordinates, counts)])
+        return float(max(marginalEntropy - self.entropy(counts / n), 0.0))
+
+
+    def entropy(self, probabilities: np.ndarray) -> float:
+        '''Entropy in bits.'''
+        return -np.sum(probabilities * np.log2(probabilities))
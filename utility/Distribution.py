@@ -1,20 +1,29 @@
 import pandas as pd
+import numpy as np
 import logging
 from output_validation.utils import QiQuery
+from output_validation.utils.ColumnExecutor import ColumnExecutor
 import matplotlib.pyplot as plt
 from output_validation.utils.Constants import *
 import os
+import re
 
 class Distribution:
 
+    # A range of numbers, e.g. 20-29 or the ARX interval [20, 30[
+    INTERVAL = re.compile(r'^[\[(]?\s*(-?\d+(?:\.\d+)?)\s*(?:-|,|\.\.)\s*(-?\d+(?:\.\d+)?)\s*[\[\])]?$')
 
     def __init__(self, 
                 inDataDf: pd.DataFrame, 
                 outDataDf: pd.DataFrame,
-                qiQueryHelper: QiQuery):
+                qiQueryHelper: QiQuery,
+                executor: ColumnExecutor = None,
+                hierarchies: dict = None):
         self._inDataDf = inDataDf
         self._outDataDf = outDataDf
         self._qiQueryHelper = qiQueryHelper
+        self._executor = executor if executor is not None else ColumnExecutor()
+        self._hierarchies = hierarchies if hierarchies is not None else dict()
 
 
     @property
@@ -35,6 +44,19 @@ class Distribution:
         return self._qiQueryHelper
 
 
+    @property
+    def executor(self):
+        '''Column executor counting the values of the columns.'''
+        return self._executor
+
+
+    @property
+    def hierarchies(self):
+        '''Generalization hierarchies by column, ordering the values
+        of their columns.'''
+        return self._hierarchies
+
+
     def generate(self) -> None:
         '''Generates distribution plots for both datasets.'''
         if self.inDataDf is not None:
@@ -43,20 +65,142 @@ class Distribution:
             self.generateDistributionPlots(self.outDataDf, OUT)
 
 
+    def computeDistances(self) -> dict:
+        '''Compares the value distributions of every QID and sensitive
+        column of the input and output datasets. Returns the distances
+        per column, empty if either dataset is missing.'''
+        if self.inDataDf is None or self.outDataDf is None:
+            return dict()
+        columns = (self.qiQueryHelper.quasiIdentifyingColumnsList
+                    + self.qiQueryHelper.sensitiveColumnsList)
+        columns = [col for col in columns if col in self.inDataDf.columns and col in self.outDataDf.columns]
+        # Values are compared as text, so they are never missing
+        frequencies = self.executor.frequencies([self.inDataDf, self.outDataDf], columns, asText=True)
+        return dict([(col, self.columnDistances(col, values, *counts)) for col, (values, counts) in frequencies.items()])
+
+
+    def columnDistances(self, col: str, values: pd.Index, inCounts: np.ndarray, outCounts: np.ndarray) -> dict:
+        '''Distances between the input and output value distributions of
+        a column, given the values of the column and their counts in both
+        datasets, suppressed values included.'''
+        order = np.argsort(np.asarray(values, dtype=str), kind='stable')
+        values = values[order]
+        inFreq = inCounts[:-1][order].astype(np.float64)
+        outFreq = outCounts[:-1][order].astype(np.float64)
+        p = inFreq / inFreq.sum()
+        q = outFreq / outFreq.sum()
+
+        resDict = dict()
+        # Jeffreys smoothing keeps KL finite for values missing from the output
+        pSmooth = (inFreq + 0.5) / (inFreq.sum() + 0.5 * len(values))
+        qSmooth = (outFreq + 0.5) / (outFreq.sum() + 0.5 * len(values))
+        resDict[DD_KL] = round(float(np.sum(pSmooth * np.log2(pSmooth / qSmooth))), 5)
+        m = (p + q) / 2
+        resDict[DD_JS] = round(float(self.partialKl(p, m) + self.partialKl(q, m)) / 2, 5)
+        resDict[DD_TV] = round(float(np.abs(p - q).sum() / 2), 5)
+        chiSquare, dof = self.chiSquare(inFreq, outFreq)
+        resDict[DD_CHI_SQUARE] = round(chiSquare, 5)
+        resDict[DD_DOF] = dof
+        resDict[DD_EMD] = self.earthMovers(col, values, inFreq, outFreq)
+        return resDict
+
+
+    def partialKl(self, p: np.ndarray, m: np.ndarray) -> float:
+        '''KL divergence in bits of p from m, where m is
+        positive wherever p is.'''
+        nonZero = p > 0
+        return np.sum(p[nonZero] * np.log2(p[nonZero] / m[nonZero]))
+
+
+    def chiSquare(self, inFreq: np.ndarray, outFreq: np.ndarray) -> tuple:
+        '''Chi-square statistic of homogeneity of the two frequency
+        tables and its degrees of freedom.'''
+        observed = np.vstack([inFreq, outFreq])
+        expected = np.outer(observed.sum(axis=1), observed.sum(axis=0)) / observed.sum()
+        return float(np.sum((observed - expected)**2 / expected)), int(observed.shape[1] - 1)
+
+
+    def earthMovers(self, col: str, values: pd.Index, inFreq: np.ndarray, outFreq: np.ndarray) -> float:
+        '''Earth mover's distance of ordered columns, i.e. the area between
+        the two cumulative distributions over the positions of the values.
+        Suppressed values are not counted. None if a value of either dataset
+        has no position, e.g. a category or a masked date of a column without
+        a hierarchy.'''
+        blind = values == self.qiQueryHelper.blindSymbol
+        inFreq, outFreq = inFreq[~blind], outFreq[~blind]
+        positions = self.positions(col, values[~blind])
+        if positions is None or not inFreq.sum() or not outFreq.sum():
+            return None
+        order = np.argsort(positions, kind='stable')
+        cdfDifference = np.cumsum(inFreq[order]) / inFreq.sum() - np.cumsum(outFreq[order]) / outFreq.sum()
+        return round(float(np.sum(np.abs(cdfDifference[:-1]) * np.diff(positions[order]))), 5)
+
+
+    def positions(self, col: str, values: pd.Index) -> np.ndarray:
+        '''Positions of the values of a column on its order, None if some
+        value has none. With a hierarchy a value is placed at the mean of
+        the original values it generalizes (their ranks in the hierarchy if
+        they are not numbers). Otherwise numbers are their own position and
+        ranges of numbers are placed at their midpoint.'''
+        hierarchy = self.hierarchies.get(col)
+        if hierarchy is not None:
+            codes = hierarchy.encode(pd.Series(values, dtype=object, name=col), warn=False)
+            if (codes >= 0).all():
+                return hierarchy.nodePositions()[codes]
+        positions = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').values.astype(np.float64)
+        for i in np.flatnonzero(np.isnan(positions)):
+            interval = self.INTERVAL.match(str(values[i]).strip())
+            if interval is None:
+                return None
+            positions[i] = (float(interval.group(1)) + float(interval.group(2))) / 2
+        return positions
+
+
+    def specs(self) -> dict:
+        '''Vega-Lite specifications of the distribution charts of both
+        datasets with the chart data inline, keyed like the plot files.
+        Nothing is rendered.'''
+        specDict = dict()
+        for df, inOut in [(self.inDataDf, IN), (self.outDataDf, OUT)]:
+            if df is None:
+                continue
+            for col in self.qiQueryHelper.quasiIdentifyingColumnsList:
+                types, counts = self.distributionData(df, col)
+                specDict['/'.join(['distribution', inOut, 'distribution_' + str(col)])] = {
+                    '$schema': VEGA_LITE_SCHEMA,
+                    'title': f'Distribution of {col} ({inOut}put)',
+                    'data': {'values': [{'value': str(key), 'records': float(count)} for key, count in zip(types, counts)]},
+                    'mark': 'bar',
+                    'encoding': {
+                        'x': {'field': 'value', 'type': 'nominal', 'sort': None, 'title': str(col),
+                            'axis': {'labelAngle': -90, 'labels': len(counts) <= 40}},
+                        'y': {'field': 'records', 'type': 'quantitative', 'title': 'Records affected [%]'}
+                    }
+                }
+        return specDict
+
+
+    def distributionData(self, df, col) -> tuple:
+        '''Returns the values of a column, most frequent first, and the
+        percentage of records holding every value.'''
+        distDict = dict(df[col].value_counts())
+        total = df.shape[0]
+        types = list()
+        counts = list()
+        for key, val in distDict.items():
+            types.append(key)
+            counts.append(round(100*(val / total), 5))
+        return types, counts
+
+
     def generateDistributionPlots(self, df, inOut) -> None:
         '''Generates distribution plots per column for the given dataset.'''
 
-        for col in self.qiQueryHelper.commaSeparatedColumnsAsList(self.qiQueryHelper.quasiIdentifyingColumns):
+        for col in self.qiQueryHelper.quasiIdentifyingColumnsList:
             col = col.strip()
             fig = plt.figure()
             ax = fig.add_axes([0,0,1,1])
-            distDict = dict(df[col].value_counts())
-            total = df.shape[0]
-            types = list()
-            counts = list()
-            for key, val in distDict.items():
-                types.append(key)
-                counts.append(round(100*(val / total), 5))
+            types, counts = self.distributionData(df, col)
 
             # Visibility and understandability largely disappears when we have
             # more than 100 values. Visualisation of the distribution still helps.
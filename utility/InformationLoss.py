@@ -0,0 +1,137 @@
+import logging
+import numpy as np
+import pandas as pd
+from output_validation.utils import QiQuery
+from output_validation.utils.Constants import *
+
+
+class InformationLoss:
+    '''Hierarchy aware utility metrics of the output dataset. The output
+    QID columns are coded once into hierarchy node codes, all per cell
+    losses are then gathered from per node lookup arrays. Non-uniform
+    entropy compares every output record with the input record at the
+    same position and is skipped if the datasets are not aligned.'''
+
+    def __init__(self,
+                inDataDf: pd.DataFrame,
+                outDataDf: pd.DataFrame,
+                qiQueryHelper: QiQuery,
+                hierarchies: dict,
+                eqClassStats: dict,
+                confMinK: int):
+        self._inDataDf = inDataDf
+        self._outDataDf = outDataDf
+        self._qiQueryHelper = qiQueryHelper
+        self._hierarchies = hierarchies
+        self._eqClassStats = eqClassStats
+        self._confMinK = confMinK
+
+
+    @property
+    def inDataDf(self):
+        '''Input dataset.'''
+        return self._inDataDf
+
+
+    @property
+    def outDataDf(self):
+        '''Output dataset.'''
+        return self._outDataDf
+
+
+    @property
+    def qiQueryHelper(self):
+        '''Queryhelper attribute.'''
+        return self._qiQueryHelper
+
+
+    @property
+    def hierarchies(self):
+        '''Generalization hierarchies per QID column.'''
+        return self._hierarchies
+
+
+    @property
+    def eqClassStats(self):
+        '''Result of the module ClassSizes.py for the output dataset.'''
+        return self._eqClassStats
+
+
+    @property
+    def confMinK(self):
+        '''The minimum k-anonymity threshold specified
+        in the configuration file.'''
+        return self._confMinK
+
+
+    def compute(self) -> dict:
+        '''Computes the information loss metrics of the output dataset.'''
+        lossDict = dict()
+        lossDict[IL_DISCERNIBILITY] = self.discernibility()
+        lossDict[IL_AVG_CLASS_SIZE] = self.averageClassSizeMetric()
+
+        columns = [col for col in self.qiQueryHelper.quasiIdentifyingColumnsList if col in self.hierarchies]
+        if not columns:
+            logging.info('No hierarchies specified for QID columns. Skipping hierarchy based metrics.')
+            return lossDict
+
+        codes = dict([(col, self.hierarchies[col].encode(self.outDataDf[col])) for col in columns])
+        genILoss = dict([(col, self.meanLoss(self.hierarchies[col].genILoss(), codes[col])) for col in columns])
+        precisionLoss = dict([(col, self.meanLoss(self.hierarchies[col].precisionLoss(), codes[col])) for col in columns])
+        lossDict[IL_GENILOSS] = dict([(col, round(loss, 5)) for col, loss in genILoss.items()])
+        lossDict[IL_TOTAL_GENILOSS] = round(float(np.mean(list(genILoss.values()))), 5)
+        lossDict[IL_PRECISION] = round(1 - float(np.mean(list(precisionLoss.values()))), 5)
+
+        if self.inDataDf is not None and self.inDataDf.shape[0] == self.outDataDf.shape[0]:
+            entropy = dict([(col, round(self.nonUniformEntropy(col, codes[col]), 5)) for col in columns])
+            lossDict[IL_NON_UNIFORM_ENTROPY] = entropy
+            lossDict[IL_TOTAL_NON_UNIFORM_ENTROPY] = round(sum(entropy.values()), 5)
+        else:
+            logging.info('Input and output records not aligned. Skipping non-uniform entropy.')
+        return lossDict
+
+
+    def discernibility(self) -> int:
+        '''Discernibility metric: every record is penalized by the size
+        of its equivalence class, completely suppressed records by the
+        size of the dataset.'''
+        histogram = self.eqClassStats[EQ_HISTOGRAM]
+        return (sum([size * size * count for size, count in histogram.items()])
+                + self.eqClassStats[EQ_SUPPRESSED] * self.eqClassStats[EQ_NORECORDS])
+
+
+    def averageClassSizeMetric(self) -> float:
+        '''Average equivalence class size (without the completely
+        suppressed class) relative to the k-anonymity threshold.'''
+        if not self.confMinK:
+            return None
+        return round(self.eqClassStats[EQ_AVG_NOSUP] / self.confMinK, 5)
+
+
+    def meanLoss(self, lossPerNode: np.ndarray, codes: np.ndarray) -> float:
+        '''Gathers the loss of every cell from the per node losses and
+        averages them. Values not in the hierarchy are not counted.'''
+        known = codes >= 0
+        if not known.any():
+            return 0.0
+        return float(lossPerNode[codes[known]].mean())
+
+
+    def nonUniformEntropy(self, col: str, codes: np.ndarray) -> float:
+        '''Sum over records of -log2(P(input value | output value)), with the
+        probabilities estimated from the input value frequencies. An output
+        value that does not generalize its input value tells nothing about
+        it, so the record counts as suppressed: -log2(P(input value)).
+        Records with a value not in the hierarchy are not counted.'''
+        hierarchy = self.hierarchies[col]
+        leafCodes = hierarchy.encodeLeaves(self.inDataDf[col])
+        valid = (leafCodes >= 0) & (codes >= 0)
+        leafCounts = np.bincount(leafCodes[leafCodes >= 0], minlength=len(hierarchy.leaves)).astype(np.float64)
+        nodeCounts = hierarchy.nodeCounts(leafCounts)
+        generalizing = hierarchy.generalizes(codes[valid], leafCodes[valid])
+        if not generalizing.all():
+            logging.info(f'{int((~generalizing).sum())} output values of column {col} do not generalize their input value.')
+        ratios = np.where(generalizing,
+                          leafCounts[leafCodes[valid]] / nodeCounts[codes[valid]],
+                          leafCounts[leafCodes[valid]] / leafCounts.sum())
+        return float(-np.log2(ratios).sum())
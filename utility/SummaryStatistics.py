@@ -1,8 +1,12 @@
+import numpy as np
 import pandas as pd
 import logging
-import duckdb
 from output_validation.utils.Constants import *
 from output_validation.utils import QiQuery
+from output_validation.utility.AlignedDiff import AlignedDiff
+from output_validation.utils.SuppressionMask import SuppressionMask
+from output_validation.utils.Results import SummaryResult, render
+from output_validation.utils.ColumnExecutor import ColumnExecutor
 
 class SummaryStatistics:
 
@@ -10,10 +14,19 @@ class SummaryStatistics:
     def __init__(self, 
                 inDataDf: pd.DataFrame, 
                 outDataDf: pd.DataFrame,
-                qiQueryHelper: QiQuery):
+                qiQueryHelper: QiQuery,
+                aligned: bool = False,
+                inMask: SuppressionMask = None,
+                outMask: SuppressionMask = None,
+                executor: ColumnExecutor = None):
         self._inDataDf = inDataDf
         self._outDataDf = outDataDf
         self._qiQueryHelper = qiQueryHelper
+        self._aligned = aligned
+        self._inMask = inMask
+        self._outMask = outMask
+        self._executor = executor if executor is not None else ColumnExecutor()
+        self._frequencies = None
 
 
     @property
@@ -34,101 +47,148 @@ class SummaryStatistics:
         return self._qiQueryHelper
 
 
+    @property
+    def aligned(self):
+        '''Whether changed values are counted by comparing
+        every output record with its input record.'''
+        return self._aligned
+
+
+    @property
+    def executor(self):
+        '''Column executor counting the values of the columns.'''
+        return self._executor
+
+
+    @property
+    def frequencies(self):
+        '''Frequency tables of the columns of both datasets,
+        counted once with values coded jointly.'''
+        if self._frequencies is None:
+            self._frequencies = self.executor.frequencies([df for df in [self.inDataDf, self.outDataDf] if df is not None])
+        return self._frequencies
+
+
+    @property
+    def inMask(self):
+        '''Suppressed cells of the input dataset.'''
+        if self._inMask is None:
+            self._inMask = SuppressionMask(self.inDataDf, self.qiQueryHelper)
+        return self._inMask
+
+
+    @property
+    def outMask(self):
+        '''Suppressed cells of the output dataset.'''
+        if self._outMask is None:
+            self._outMask = SuppressionMask(self.outDataDf, self.qiQueryHelper)
+        return self._outMask
+
+
     def compute(self) -> dict:
         '''Computes summary statistics for both datasets.'''
         statSict = dict()
+        inputResult, outputResult = self.computeResults()
+        statSict[SS_INPUT] = render(inputResult)
+        statSict[SS_OUTPUT] = render(outputResult)
+        return statSict
 
-        inputResult = dict()
-        if self.inDataDf is not None:
-            inputResult = self.computeInput()
-        statSict[SS_INPUT]= inputResult
-
-        outputResult = dict()
-        if self.outDataDf is not None:
-            outputResult = self.computeOutput()
-        statSict[SS_OUTPUT] = outputResult
 
-        return statSict
+    def computeResults(self) -> tuple:
+        '''Summary statistics of the input and output datasets,
+        None for a missing dataset.'''
+        return (self.computeInputResult() if self.inDataDf is not None else None,
+                self.computeOutputResult() if self.outDataDf is not None else None)
 
 
     def computeInput(self) -> dict:
         '''Computes summary statistics for the input dataset.'''
-        inDict = dict()
-        inDict[SS_DISTINCT] = dict([(col, len(list(self.inDataDf[col].value_counts()))) for col in list(self.inDataDf.columns)])
-        # Modes with their respective quantities
-        inDict[SS_MODES] = self.nonblindModesPerColumn(self.inDataDf, list(self.inDataDf.columns))
-        # The number of not suppressed values for both input and output
-        inDict[SS_INFORMATIVE] = dict([(col, self.inDataDf.shape[0]) for col in self.inDataDf.columns])
-        return inDict
+        return self.computeInputResult().toDict()
 
 
     def computeOutput(self) -> dict:
         '''Computes summary statistics for the output dataset.'''
-        outDict = dict()
-        outDict[SS_DISTINCT] = dict([(col, len(list(self.outDataDf[col].value_counts()))) for col in list(self.outDataDf.columns)])
-        # Modes with their respective quantities
-        outDict[SS_MODES] = self.nonblindModesPerColumn(self.outDataDf, list(self.outDataDf.columns))
-        # suppressed values per column
-        outDict[SS_SUP] = self.suppressedValuesPerColumn()
-        outDict[SS_INFORMATIVE] = dict([(col, (self.outDataDf.shape[0] - blinds[0])) for col, blinds in outDict[SS_SUP].items()])
+        return self.computeOutputResult().toDict()
+
+
+    def computeInputResult(self) -> SummaryResult:
+        '''Summary statistics of the input dataset.'''
+        return SummaryResult(self.inDataDf.shape[0],
+                            self.distinctValuesPerColumn(self.inDataDf, True),
+                            # Modes with their respective quantities
+                            self.nonblindModesPerColumn(self.inDataDf, list(self.inDataDf.columns), True))
+
+
+    def computeOutputResult(self) -> SummaryResult:
+        '''Summary statistics of the output dataset.'''
+        result = SummaryResult(self.outDataDf.shape[0],
+                            self.distinctValuesPerColumn(self.outDataDf, False),
+                            # Modes with their respective quantities
+                            self.nonblindModesPerColumn(self.outDataDf, list(self.outDataDf.columns), False),
+                            # Suppressed values per column
+                            self.outMask.suppressedCounts())
 
         if self.inDataDf is not None:
-            # Generalized or suppressed values per column and total (0, 1)
-            changestats = self.extractChangedValueStats()
-            outDict[SS_GENSUP] = changestats[0]
-            # Total modified values (generalized or suppressed)
-            totalValuesInDf = self.outDataDf.shape[0] * len(self.outDataDf.columns)
-            outDict[SS_TOTAL_GENSUP] = [changestats[1], str(round(changestats[1]/totalValuesInDf*100, 3)) + ' %']
-            # Total suppressed values
-            outDict[SS_TOTAL_SUP] = (lambda x : [x, str(round(x/totalValuesInDf*100, 3)) + ' %'])(sum(list(map(lambda x: x[1][0], outDict[SS_SUP].items()))))
-            outDict[SS_SUP_OF_CHANGED] = str(round(outDict[SS_TOTAL_SUP][0]/outDict[SS_TOTAL_GENSUP][0]*100, 3)) + ' %'
-        else:
-            outDict[SS_GENSUP] = dict()
-            outDict[SS_TOTAL_GENSUP] = [0,'0 %']
-            outDict[SS_TOTAL_SUP] = [0,'0 %']
-            outDict[SS_SUP_OF_CHANGED] = '0 %'
-
-        return outDict
+            # Generalized or suppressed values per column
+            if self.aligned:
+                result.alignedDiff = AlignedDiff(self.inDataDf, self.outDataDf, self.qiQueryHelper,
+                                                inMask=self.inMask, outMask=self.outMask).compute()
+                result.changed = result.alignedDiff[AD_CHANGED]
+            else:
+                result.changed = self.extractChangedValueStats()[0]
+        return result
     
 
-    def nonblindModesPerColumn(self, df, cols) -> dict:
+    def columnCounts(self, col: str, indata: bool) -> tuple:
+        '''Values of the column and their counts in the input or output
+        dataset, the last count being the number of missing values.'''
+        values, counts = self.frequencies[col]
+        return values, counts[0 if indata or self.inDataDf is None else 1]
+
+
+    def distinctValuesPerColumn(self, df, indata: bool) -> dict:
+        '''Returns the number of distinct values, missing values not
+        counted, per column.'''
+        return dict([(col, int(np.count_nonzero(self.columnCounts(col, indata)[1][:-1]))) for col in df.columns])
+
+
+    def nonblindModesPerColumn(self, df, cols, indata: bool) -> dict:
         '''Returns a dictionary where keys are column names and values are
         modes (excluding suppressed values unless the attribude contains
-        only suppressed values) paired with their counts in the corresponding column.'''
+        only suppressed values) paired with their counts in the corresponding column.
+        Of equally frequent values, the one occurring first is the mode.'''
         
         res = dict()
         for col in cols:
-            mode = list(duckdb.query(f'''SELECT {col} AS Mode, COUNT(*) AS Count FROM df
-                GROUP BY Mode ORDER BY COUNT(*) DESC LIMIT 2''').fetchall())
-            if not mode:
+            if not df.shape[0]:
                 raise RuntimeError(f'Column {col} mode was not detected, does it contain any values?')
-            elif len(mode) == 1:
-                res[col] = list(mode[0])
+            values, counts = self.columnCounts(col, indata)
+            counts = counts.copy()
+            # Only text columns can hold the blind symbol
+            if df[col].dtype == object or pd.api.types.is_string_dtype(df[col].dtype):
+                counts[:-1][np.asarray(values, dtype=object) == self.qiQueryHelper.blindSymbol] = 0
+            if not counts.any():
+                res[col] = [self.qiQueryHelper.blindSymbol, df.shape[0]]
             else:
-                res[col] = list(mode[0]) if mode[0][0] != self.qiQueryHelper.blindSymbol else list(mode[1])
+                code = int(np.argmax(counts))
+                res[col] = [values[code:code + 1].tolist()[0] if code < len(values) else np.nan, int(counts[code])]
         return res
 
 
-    def suppressedValuesPerColumn(self) -> dict:
-        '''Calculates the number of suppressed values and 
-        the percentage of all values that have been
-        suppressed per column.'''
-
-        init = dict(self.outDataDf.isin([self.qiQueryHelper.blindSymbol]).sum(axis=0))
-        values = dict([(key, [value, str((round(100*(value/self.outDataDf.shape[0]), 1))) + ' %']) for key, value in init.items()])
-        return values
-
-
     def extractChangedValueStats(self) -> tuple:
-        '''Calculates the number of changed cells per column and
-        the the total number of changed columns.'''
+        '''Calculates the number of changed cells per column, output values
+        not occurring in the input column, and the total number of changed
+        cells. Missing output values are changed if the input column has
+        no missing values.'''
 
         changedValuesPerColumn = dict()
         totalChangedValues = 0
         for col in self.inDataDf:
-            s = set(self.inDataDf[col])
-            changed = len([x for x in self.outDataDf[col] if x not in s])
+            _, (inCounts, outCounts) = self.frequencies[col]
+            if outCounts is None:
+                continue
+            changed = int(outCounts[inCounts == 0].sum())
             changedValuesPerColumn[col] = changed
             totalChangedValues += changed
         
-        return changedValuesPerColumn, totalChangedValues
\ No newline at end of file
+        return changedValuesPerColumn, totalChangedValues
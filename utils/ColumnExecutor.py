@@ -0,0 +1,182 @@
+import os
+import numpy as np
+import pandas as pd
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+
+
+# Columns shared raw, i.e. coded by the workers. They are stored as their
+# 8 byte bit patterns and viewed back with their dtype.
+RAW_DTYPES = (np.dtype(np.int64), np.dtype(np.uint64), np.dtype(np.float64))
+CODED = 'coded'
+RAW = 'raw'
+# Workers are started by a fork server where there is one, as forking
+# a process running other threads can copy their locks held
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+# Coded and raw arrays of the datasets, attached once per worker process
+workerArrays = None
+
+
+def attachArrays(blocks: list) -> None:
+    '''Attaches the shared memory blocks holding the coded and the raw
+    arrays of the datasets in a worker process.'''
+    global workerArrays
+    workerArrays = {CODED: list(), RAW: list(), 'blocks': list()}
+    for kind, dtype in [(CODED, np.int32), (RAW, np.int64)]:
+        for name, shape in blocks[kind]:
+            block = shared_memory.SharedMemory(name=name)
+            workerArrays['blocks'].append(block)
+            workerArrays[kind].append(np.ndarray(shape, dtype=dtype, buffer=block.buf))
+
+
+def countCodes(codes: list, positions: list, size: int) -> list:
+    '''Counts the codes of one column in every dataset, None for the
+    datasets without the column.'''
+    return [np.bincount(codes[i][position], minlength=size) if position >= 0 else None
+            for i, position in enumerate(positions)]
+
+
+def codeRaw(raws: list, positions: list, dtype: str, asText: bool) -> tuple:
+    '''Codes one raw numeric column jointly over the datasets and counts
+    the codes, like the coded columns. As text, missing values are
+    counted as the value 'nan'.'''
+    present = [i for i, position in enumerate(positions) if position >= 0]
+    series = [raws[i][positions[i]].view(dtype) for i in present]
+    columnCodes, columnValues = pd.factorize(np.concatenate(series) if len(series) > 1 else series[0])
+    columnCodes[columnCodes < 0] = len(columnValues)
+    counts, start = [None] * len(positions), 0
+    for i, values in zip(present, series):
+        counts[i] = np.bincount(columnCodes[start:start + len(values)], minlength=len(columnValues) + 1)
+        start += len(values)
+    if not asText:
+        return pd.Index(columnValues), counts
+    textValues = [str(value) for value in columnValues]
+    if any(datasetCounts[-1] for datasetCounts in counts if datasetCounts is not None):
+        textValues.append('nan')
+        counts = [np.append(datasetCounts, 0) if datasetCounts is not None else None for datasetCounts in counts]
+    return pd.Index(textValues, dtype=object), counts
+
+
+def countColumn(task: tuple) -> tuple:
+    '''Counts one column in a worker process, coding it first if it is
+    shared raw.'''
+    if task[0] == RAW:
+        return codeRaw(workerArrays[RAW], *task[1:])
+    return None, countCodes(workerArrays[CODED], *task[1:])
+
+
+class ColumnExecutor:
+    '''Per column frequency tables of datasets, the basis of the column
+    statistics. Every column is coded jointly over the datasets, so the
+    code of a value is the same in all of them. Numeric columns of the
+    same 8 byte dtype in all datasets are kept raw and coded together
+    with the counting. With several workers, the raw arrays of each
+    dataset are written to shared memory and a process pool codes and
+    counts the columns, getting only the position of a column; the
+    datasets are never pickled. The other columns are coded before, in
+    the calling process, into shared memory as well. Every call starts
+    its own pool, so calls from several threads do not share state.
+    Tables come back in column order, whatever the number of workers.'''
+
+    def __init__(self, workers: int = None):
+        self._workers = workers if workers else 1
+
+
+    @property
+    def workers(self):
+        '''Number of processes counting columns, 1 to count
+        in the calling process.'''
+        return self._workers
+
+
+    def frequencies(self, dfs: list, columns: list = None, asText: bool = False) -> dict:
+        '''Maps every column to its values and, for every dataset, the
+        number of times each value occurs, None if the dataset does not
+        have the column. The last count is the number of missing values.
+        Columns default to all columns of the datasets, as text the
+        values are compared as strings.'''
+        if columns is None:
+            columns = list(dict.fromkeys([col for df in dfs for col in df.columns]))
+        pooled = self.workers > 1 and len(columns) > 1
+        # Shared memory blocks of the arrays and their shapes, by kind
+        shared = {CODED: list(), RAW: list()} if pooled else None
+        try:
+            tasks, values, arrays = self.encode(dfs, columns, asText, shared)
+            if pooled:
+                results = self.countInPool(shared, tasks)
+            else:
+                results = [codeRaw(arrays[RAW], *task[1:]) if task[0] == RAW else (None, countCodes(arrays[CODED], *task[1:]))
+                           for task in tasks]
+        finally:
+            for block, _ in (shared[CODED] + shared[RAW] if shared is not None else list()):
+                block.close()
+                block.unlink()
+        return dict([(col, (columnValues if columnValues is not None else codedValues, counts))
+                     for col, codedValues, (columnValues, counts) in zip(columns, values, results)])
+
+
+    def encode(self, dfs: list, columns: list, asText: bool = False, shared: dict = None) -> tuple:
+        '''Splits the columns into raw and coded ones and codes the latter
+        jointly over the datasets. Returns a task per column, the values of the coded
+        columns (None for the others) and, for every dataset, a coded and a
+        raw array with a row per column of that kind it has, allocated in
+        shared memory blocks added to shared if given. The task of a column
+        holds its row in every array of its kind (-1 if the dataset does
+        not have the column). Missing values get the code following the
+        codes of the values.'''
+        kinds, positions = list(), list()
+        rows = {CODED: [0] * len(dfs), RAW: [0] * len(dfs)}
+        for col in columns:
+            dtypes = set([df[col].dtype for df in dfs if col in df.columns])
+            kind = RAW if len(dtypes) == 1 and dtypes.pop() in RAW_DTYPES else CODED
+            columnPositions = [-1] * len(dfs)
+            for i, df in enumerate(dfs):
+                if col in df.columns:
+                    columnPositions[i] = rows[kind][i]
+                    rows[kind][i] += 1
+            kinds.append(kind)
+            positions.append(columnPositions)
+        arrays = dict([(kind, [self.allocate((rows[kind][i], df.shape[0]), dtype, shared[kind] if shared is not None else None)
+                               for i, df in enumerate(dfs)]) for kind, dtype in [(CODED, np.int32), (RAW, np.int64)]])
+
+        tasks, values = list(), list()
+        for col, kind, columnPositions in zip(columns, kinds, positions):
+            present = [i for i, df in enumerate(dfs) if columnPositions[i] >= 0]
+            if kind == RAW:
+                for i in present:
+                    arrays[RAW][i][columnPositions[i]] = dfs[i][col].values.view(np.int64)
+                tasks.append((RAW, columnPositions, dfs[present[0]][col].dtype.str, asText))
+                values.append(None)
+                continue
+            series = [dfs[i][col].astype(str) if asText else dfs[i][col] for i in present]
+            columnCodes, columnValues = pd.factorize(pd.concat(series, ignore_index=True) if len(series) > 1 else series[0])
+            columnCodes[columnCodes < 0] = len(columnValues)
+            start = 0
+            for i in present:
+                arrays[CODED][i][columnPositions[i]] = columnCodes[start:start + dfs[i].shape[0]]
+                start += dfs[i].shape[0]
+            tasks.append((CODED, columnPositions, len(columnValues) + 1))
+            values.append(columnValues)
+        return tasks, values, arrays
+
+
+    def allocate(self, shape: tuple, dtype, blocks: list = None) -> np.ndarray:
+        '''Returns an empty array, in a new shared memory block added to
+        blocks with the shape of the array if blocks is given.'''
+        if blocks is None:
+            return np.empty(shape, dtype=dtype)
+        block = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1))
+        blocks.append((block, shape))
+        return np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+    def countInPool(self, shared: dict, tasks: list) -> list:
+        '''Codes and counts the columns in a process pool of its own over
+        the arrays in shared memory.'''
+        shapes = dict([(kind, [(block.name, shape) for block, shape in blocks]) for kind, blocks in shared.items()])
+        with ProcessPoolExecutor(max_workers=min(self.workers, os.cpu_count() or 1),
+                                mp_context=multiprocessing.get_context(START_METHOD),
+                                initializer=attachArrays, initargs=(shapes,)) as executor:
+            return list(executor.map(countColumn, tasks))
@@ -1,11 +1,15 @@
 # General validation constants
 CONF_MAIN = 'Main'
 CONF_ARX = 'ARX'
+CONF_HIERARCHIES = 'Hierarchies'
 K_ANONYMITY = 'kanonymity'
+SAMPLING_FRACTION = 'samplingfraction'
 L_DIVERSITY = 'ldiversity'
+XY_ANONYMITY = 'xyanonymity'
 IDENTIFYING = 'id_columns'
 QUASI_IDENTIFYING = 'qi_columns'
 SENSITIVE_ATTRIBUTES = 'sa_columns'
+CONTINGENCY_COLUMNS = 'contingency_columns'
 IN = 'in'
 OUT = 'out'
 EMPTY_WHERE = '1 = 1'
@@ -22,6 +26,12 @@ SS_SUP = 'Suppressed'
 SS_TOTAL_GENSUP = 'Total generalized or suppressed'
 SS_TOTAL_SUP = 'Total suppressed'
 SS_SUP_OF_CHANGED = 'Suppressed of total changed'
+SS_ALIGNED_DIFF = 'Aligned record comparison'
+AD_CHANGED = 'Changed values'
+AD_SUPPRESSED = 'Suppressed values'
+AD_GENERALIZED = 'Generalized values'
+AD_RECORDS_PER_CHANGED = 'Records per number of changed values'
+AD_UNMATCHED = 'Records without input record'
 
 
 # Equivalence class module
@@ -36,6 +46,7 @@ EQ_SUPPRESSED = 'Completely suppressed class size'
 EQ_NOCLASSES = 'Number of classes'
 EQ_NORECORDS = 'Number of records'
 EQ_SMALLEST = 'Smallest equivalence class size'
+EQ_HISTOGRAM = 'Class size histogram'
 
 # Privacy verification module
 PRIVACY_VERIFICATION = 'Privacy model verification'
@@ -43,6 +54,9 @@ PRIVACY_VERIFICATION = 'Privacy model verification'
 PR_K = 'K and violations'
 PR_L = 'L and violations'
 PR_XY = 'XY and violations'
+PR_VIOLATION_COUNT = 'Number of violations'
+PR_VIOLATION_SAMPLE = 'Sample of violations'
+PR_VIOLATION_FILE = 'Violations file'
 
 # Attack model risk analysis module
 ATTACK_RISKS = 'Attacker model risks'
@@ -63,4 +77,118 @@ AR_ESTIMATED_PROSECUTOR_RISK = 'Estimated prosecutor risk'
 AR_RECORDS_AT_RISK = 'Records at risk'
 AR_HIGHEST_RISK = 'Highest risk'
 AR_SUCCESS_RATE = 'Success rate'
-AR_OVERVIEW = 'Overview'
\ No newline at end of file
+AR_OVERVIEW = 'Overview'
+AR_POPULATION = 'Population uniqueness'
+AR_SAMPLING_FRACTION = 'Sampling fraction'
+AR_PITMAN = 'Pitman'
+AR_ZAYATZ = 'Zayatz'
+AR_SNB = 'SNB'
+AR_DANKAR = 'Dankar'
+AR_DANKAR_MODEL = 'Dankar decision rule model'
+AR_RECORD_RISK = 'Record level risk'
+AR_PERCENTILES = 'Percentiles'
+AR_MAX = 'max'
+AR_RISK_BANDS = 'Records per risk band'
+AR_RECORD_RISK_FILE = 'Record level risk file'
+AR_K_SWEEP = 'K sweep'
+AR_CLASSES_VIOLATING = 'Classes violating'
+AR_SUPPRESSION_NEEDED = 'Records to suppress'
+
+# Riskiest equivalence classes module
+RISKIEST_CLASSES = 'Riskiest equivalence classes'
+# Inner keys
+RC_CLASS = 'Equivalence class'
+RC_SIZE = 'Class size'
+RC_RISK = 'Prosecutor risk'
+RC_L = 'L per sensitive attribute'
+RC_SAMPLE_RECORD = 'Sample record'
+
+# QID subset lattice module
+QI_LATTICE = 'QID subset risks'
+# Inner keys
+LT_SUBSET = 'QID subset'
+
+# QID contribution module
+QI_CONTRIBUTION = 'QID contribution to risk'
+# Inner keys
+CN_ALL = 'All QID'
+CN_LEFT_OUT = 'Without QID'
+CN_CHANGE = 'Change'
+CN_UNIQUE_RECORDS = 'Unique records'
+CN_MOST_IDENTIFYING = 'Most identifying QID'
+
+# Information loss module
+INFORMATION_LOSS = 'Information loss'
+# Inner keys
+IL_DISCERNIBILITY = 'Discernibility metric'
+IL_AVG_CLASS_SIZE = 'Average equivalence class size metric'
+IL_GENILOSS = 'Generalized information loss'
+IL_TOTAL_GENILOSS = 'Total generalized information loss'
+IL_PRECISION = 'Precision'
+IL_NON_UNIFORM_ENTROPY = 'Non-uniform entropy'
+IL_TOTAL_NON_UNIFORM_ENTROPY = 'Total non-uniform entropy'
+
+# Distribution distance module
+DISTRIBUTION_DISTANCES = 'Distribution distances'
+# Inner keys
+DD_KL = 'Kullback-Leibler divergence'
+DD_JS = 'Jensen-Shannon divergence'
+DD_TV = 'Total variation distance'
+DD_CHI_SQUARE = 'Chi-square statistic'
+DD_DOF = 'Chi-square degrees of freedom'
+DD_EMD = "Earth mover's distance"
+
+# Contingency table module
+CONTINGENCY = 'Joint distribution comparison'
+# Inner keys
+CT_COLUMNS = 'Columns'
+CT_CELLS = 'Non-empty cells (input, output)'
+CT_INPUT_CRAMERS_V = "Input Cramer's V"
+CT_OUTPUT_CRAMERS_V = "Output Cramer's V"
+CT_CRAMERS_V_DELTA = "Cramer's V change"
+CT_INPUT_MI = 'Input mutual information'
+CT_OUTPUT_MI = 'Output mutual information'
+CT_MI_DELTA = 'Mutual information change'
+
+# Output candidate comparison
+CANDIDATE_INPUT = 'Input analysis'
+CANDIDATES = 'Output candidates'
+CANDIDATE_RANKING = 'Output candidate ranking'
+# Inner keys
+CR_CANDIDATE = 'Candidate'
+CR_RANK = 'Rank'
+CR_SATISFIED = 'Privacy models satisfied'
+
+# Time bounded analysis
+SECTION_STATUS = 'Section status'
+VERIFICATION_BOUNDS = 'Privacy model verification bounds'
+# Inner values
+ST_COMPLETE = 'complete'
+ST_PARTIAL = 'partial'
+ST_SKIPPED = 'skipped'
+VB_EXACT = 'exact'
+VB_LOWER_BOUND = 'lower bound'
+
+# Chart specifications instead of plot files
+PLOT_SPECS = 'Plot specifications'
+PLOT_SPECS_FILE = 'Plot specifications file'
+VEGA_LITE_SCHEMA = 'https://vega.github.io/schema/vega-lite/v5.json'
+
+# Run snapshots and their comparison
+SNAPSHOT = 'Snapshot'
+SNAPSHOT_FILE = 'Snapshot file'
+SNAPSHOT_DIFF = 'Changes since snapshot'
+SN_VERSION = 'Version'
+SN_KEY_ID = 'Key id'
+SN_METRICS = 'Metrics'
+SN_HISTOGRAMS = 'Class size histograms'
+SN_VIOLATIONS = 'Violating classes'
+# Inner keys
+SD_METRICS = 'Changed metrics'
+SD_HISTOGRAMS = 'Changed class size histograms'
+SD_NEW_VIOLATIONS = 'New violating classes'
+SD_RESOLVED_VIOLATIONS = 'Resolved violating classes'
+
+# Progress stages besides the result sections
+LOADING = 'Loading'
+PLOTS = 'Plots'
@@ -0,0 +1,135 @@
+import logging
+import numpy as np
+import pandas as pd
+
+
+class Hierarchy:
+    '''Generalization hierarchy of a single attribute in the ARX
+    csv format: one row per original value, followed by its
+    generalizations from the lowest to the highest level.
+    Every distinct value of every level is a node, and the
+    per node loss values are precomputed into arrays indexed
+    by node code, so that loss metrics are array gathers.'''
+
+    def __init__(self, path: str, sep: str = ';'):
+        levelsDf = pd.read_csv(path, sep=sep, header=None, dtype=str, keep_default_na=False)
+        self._levels = levelsDf.shape[1]
+        self._leaves = pd.Index(levelsDf[0])
+        if not self._leaves.is_unique:
+            raise ValueError(f'Hierarchy {path} contains duplicate original values.')
+
+        # Node codes are assigned level by level, so that a value occurring
+        # on several levels is coded as its lowest level occurrence
+        nodeValues = list()
+        nodeLevels = list()
+        ancestors = np.empty(levelsDf.shape, dtype=np.int64)
+        for level in range(self._levels):
+            values, inverse = np.unique(levelsDf[level].values, return_inverse=True)
+            ancestors[:, level] = inverse + len(nodeValues)
+            nodeValues.extend(values)
+            nodeLevels.extend([level] * len(values))
+
+        self._nodes = pd.Index(nodeValues)
+        self._nodeLevels = np.array(nodeLevels, dtype=np.int64)
+        # Ancestor node of every leaf on every level
+        self._ancestors = ancestors
+        # Number of leaves generalized to every node
+        self._nodeLeaves = np.bincount(ancestors.ravel(), minlength=len(nodeValues))
+        self._firstNodeCode = pd.Series(np.arange(len(nodeValues)), index=self._nodes).groupby(level=0).first()
+        # Node codes, as encoded, of the ancestors of every leaf on every level
+        self._ancestorCodes = self._firstNodeCode.reindex(self._nodes).values[ancestors]
+
+
+    @property
+    def height(self):
+        '''Highest generalization level.'''
+        return self._levels - 1
+
+
+    @property
+    def leaves(self):
+        '''The original values.'''
+        return self._leaves
+
+
+    @property
+    def nodeLevels(self):
+        '''Generalization level per node code.'''
+        return self._nodeLevels
+
+
+    @property
+    def nodeLeaves(self):
+        '''Number of original values generalized to each node code.'''
+        return self._nodeLeaves
+
+
+    def encode(self, column: pd.Series, warn: bool = True) -> np.ndarray:
+        '''Returns the node code of every value in the column,
+        -1 for values not in the hierarchy.'''
+        codes = self._firstNodeCode.reindex(self.text(column)).values
+        unknown = np.isnan(codes)
+        if warn and unknown.any():
+            logging.warning(f'{int(unknown.sum())} values of column {column.name} are not in its hierarchy.')
+        return np.where(unknown, -1, codes).astype(np.int64)
+
+
+    def encodeLeaves(self, column: pd.Series) -> np.ndarray:
+        '''Returns the leaf index of every value in the column,
+        -1 for values that are not original values.'''
+        return self._leaves.get_indexer(self.text(column))
+
+
+    def text(self, column: pd.Series) -> np.ndarray:
+        '''Returns the values of the column as the text they are compared
+        with in the hierarchy: integral floats as integers, so a numeric
+        column read with missing values matches its leaves, and missing
+        values as the empty string.'''
+        text = column.astype(str).values.astype(object)
+        if column.dtype.kind == 'f':
+            values = column.values
+            integral = np.isfinite(values) & (np.abs(values) < 2 ** 53)
+            integral[integral] = values[integral] == np.floor(values[integral])
+            text[integral] = values[integral].astype(np.int64).astype(str)
+        text[column.isna().values] = ''
+        return text
+
+
+    def generalizes(self, codes: np.ndarray, leafCodes: np.ndarray) -> np.ndarray:
+        '''Whether every node code is the leaf or one of its
+        generalizations, for pairs of known codes.'''
+        return (self._ancestorCodes[leafCodes] == codes[:, None]).any(axis=1)
+
+
+    def nodePositions(self) -> np.ndarray:
+        '''Position per node code on the order of the original values: the
+        mean of the original values the node generalizes if they are all
+        numbers, of their ranks in the hierarchy file otherwise.'''
+        leafPositions = pd.to_numeric(pd.Series(self.leaves), errors='coerce').values.astype(np.float64)
+        if np.isnan(leafPositions).any():
+            leafPositions = np.arange(len(self.leaves), dtype=np.float64)
+        return self.nodeCounts(leafPositions) / self.nodeLeaves
+
+
+    def genILoss(self) -> np.ndarray:
+        '''Loss per node code: the share of the other original
+        values the node generalizes to.'''
+        totalLeaves = len(self.leaves)
+        if totalLeaves < 2:
+            return np.zeros(len(self._nodes))
+        return (self.nodeLeaves - 1) / (totalLeaves - 1)
+
+
+    def precisionLoss(self) -> np.ndarray:
+        '''Loss per node code: the generalization level relative
+        to the height of the hierarchy.'''
+        if self.height == 0:
+            return np.zeros(len(self._nodes))
+        return self.nodeLevels / self.height
+
+
+    def nodeCounts(self, leafCounts: np.ndarray) -> np.ndarray:
+        '''Sums the given per leaf counts up to every node code.'''
+        return np.bincount(self._ancestors.ravel(),
+                            weights=np.repeat(leafCounts, self._levels),
+                            minlength=len(self._nodes))
@@ -0,0 +1,114 @@
+import os
+import logging
+import tempfile
+import duckdb
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from output_validation.utils import QiQuery
+from output_validation.utils.Progress import Progress
+
+
+class Partitioner:
+    '''Hash partitions the rows of a dataset by their QID values into
+    on-disk parquet partitions. As all rows of an equivalence class end up
+    in the same partition, the partitions can be aggregated independently
+    and the per partition class statistics merged exactly, while the
+    grouping hash tables only ever hold the classes of one partition.'''
+
+    def __init__(self,
+                qiQueryHelper: QiQuery,
+                partitions: int,
+                workers: int = None,
+                directory: str = None,
+                progress: Progress = None):
+        if partitions < 1:
+            raise ValueError(f'Expected the number of partitions to be >= 1, got {partitions}.')
+        self._qiQueryHelper = qiQueryHelper
+        self._partitions = partitions
+        self._workers = workers if workers else os.cpu_count()
+        self._directory = directory
+        self._progress = progress if progress is not None else Progress()
+        # Written datasets by id, holding a reference to the dataset so
+        # that its id is not reused while its partitions are kept
+        self._written = dict()
+
+
+    @property
+    def qiQueryHelper(self):
+        '''Queryhelper attribute.'''
+        return self._qiQueryHelper
+
+
+    @property
+    def partitions(self):
+        '''Number of hash partitions.'''
+        return self._partitions
+
+
+    @property
+    def workers(self):
+        '''Number of partitions processed in parallel.'''
+        return self._workers
+
+
+    @property
+    def progress(self):
+        '''Progress reporter, checked for cancellation between partitions.'''
+        return self._progress
+
+
+    def partition(self, df: pd.DataFrame) -> list:
+        '''Writes the dataset into hash partitions and returns the paths
+        of the non-empty partition files. Every dataset is written once.'''
+        written = self._written.get(id(df))
+        if written is not None and written[0] is df:
+            return written[2]
+
+        tmpdir = tempfile.TemporaryDirectory(prefix='partitions_', dir=self._directory)
+        qiColumns = self.qiQueryHelper.quasiIdentifyingColumnsList
+        hashes = pd.util.hash_pandas_object(df[qiColumns], index=False).values
+        partitionIds = (hashes % np.uint64(self.partitions)).astype(np.int64)
+        # Sorting row positions once avoids a full scan per partition
+        order = np.argsort(partitionIds, kind='stable')
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(partitionIds, minlength=self.partitions))))
+
+        paths = list()
+        con = duckdb.connect()
+        for i in range(self.partitions):
+            if bounds[i] == bounds[i+1]:
+                continue
+            path = os.path.join(tmpdir.name, f'partition_{i}.parquet')
+            con.register('part', df.iloc[order[bounds[i]:bounds[i+1]]])
+            con.execute(f'''COPY part TO '{path}' (FORMAT PARQUET)''')
+            con.unregister('part')
+            paths.append(path)
+        con.close()
+
+        logging.info(f'Wrote {len(paths)} non-empty hash partitions to {tmpdir.name}')
+        self._written[id(df)] = (df, tmpdir, paths)
+        return paths
+
+
+    def mapPartitions(self, df: pd.DataFrame, func) -> list:
+        '''Calls func with a DuckDB connection in which the view df
+        holds the rows of a single partition, for all partitions in
+        parallel. Returns the results in partition order.'''
+        def run(path):
+            self.progress.check()
+            con = duckdb.connect()
+            try:
+                con.execute(f'''CREATE VIEW df AS SELECT * FROM parquet_scan('{path}')''')
+                return func(con)
+            finally:
+                con.close()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(run, self.partition(df)))
+
+
+    def close(self) -> None:
+        '''Removes all written partitions.'''
+        for _, tmpdir, _ in self._written.values():
+            tmpdir.cleanup()
+        self._written = dict()
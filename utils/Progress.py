@@ -0,0 +1,151 @@
+import time
+import threading
+
+
+class ValidationCancelled(Exception):
+    '''Raised when a validation is cancelled through its cancellation token.'''
+
+
+class DeadlineExceeded(ValidationCancelled):
+    '''Raised when the time budget of a validation is spent.'''
+
+
+class CancellationToken:
+    '''Cooperative cancellation of a validation. The validation checks the
+    token between stages and inside long loops and stops by raising
+    ValidationCancelled once cancel has been called, from any thread.'''
+
+    def __init__(self):
+        self._event = threading.Event()
+
+
+    @property
+    def cancelled(self):
+        '''Whether cancellation has been requested.'''
+        return self._event.is_set()
+
+
+    def cancel(self) -> None:
+        '''Requests cancellation.'''
+        self._event.set()
+
+
+    def check(self) -> None:
+        '''Raises ValidationCancelled if cancellation has been requested.'''
+        if self.cancelled:
+            raise ValidationCancelled('Validation was cancelled.')
+
+
+class Progress:
+    '''Reports the progress of a validation to a callback, called with the
+    current stage, the amount of work done and the total amount of work of
+    the stage (None if unknown). Every report also checks the cancellation
+    token and the deadline. Without a callback, a token and a deadline,
+    reporting does nothing.'''
+
+    def __init__(self, callback = None, token: CancellationToken = None):
+        self._callback = callback
+        self._token = token
+        self._deadline = None
+        self._lock = threading.Lock()
+
+
+    @property
+    def callback(self):
+        '''Function called with (stage, done, total) on every report.'''
+        return self._callback
+
+
+    @property
+    def token(self):
+        '''Cancellation token checked on every report.'''
+        return self._token
+
+
+    @property
+    def deadline(self):
+        '''Monotonic time after which checks raise DeadlineExceeded,
+        None if there is no deadline.'''
+        return self._deadline
+
+
+    @property
+    def expired(self):
+        '''Whether the deadline has passed.'''
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+
+    def setDeadline(self, budget: float) -> None:
+        '''Sets the deadline budget seconds from now, or removes it if
+        budget is None.'''
+        self._deadline = None if budget is None else time.monotonic() + budget
+
+
+    def stage(self, stage: str, total: int = None) -> None:
+        '''Reports the start of a stage.'''
+        self.advance(stage, 0, total)
+
+
+    def advance(self, stage: str, done: int, total: int = None) -> None:
+        '''Reports progress within a stage.'''
+        self.check()
+        if self.callback is not None:
+            # Stages may report from several worker threads
+            with self._lock:
+                self.callback(stage, done, total)
+
+
+    def check(self) -> None:
+        '''Raises ValidationCancelled if the validation was cancelled
+        and DeadlineExceeded if the deadline has passed.'''
+        if self.token is not None:
+            self.token.check()
+        if self.expired:
+            raise DeadlineExceeded('Time budget of the validation was spent.')
+
+
+class ProgressReader:
+    '''Binary file wrapper reporting the number of bytes read, so the
+    progress of parsing a file can be followed and cancelled.'''
+
+    def __init__(self, file, stage: str, total: int, progress: Progress):
+        self._file = file
+        self._stage = stage
+        self._total = total
+        self._progress = progress
+        self._done = 0
+
+
+    def read(self, size: int = -1) -> bytes:
+        '''Reads from the file and reports the bytes read so far.'''
+        data = self._file.read(size)
+        self._done += len(data)
+        self._progress.advance(self._stage, self._done, self._total)
+        return data
+
+
+    def readline(self, size: int = -1) -> bytes:
+        '''Reads a line from the file.'''
+        line = self._file.readline(size)
+        self._done += len(line)
+        return line
+
+
+    def __iter__(self):
+        return iter(self.readline, b'')
+
+
+    def readable(self) -> bool:
+        '''The file is read only.'''
+        return True
+
+
+    def seekable(self) -> bool:
+        '''The file is read once from the start, so decompressors reading
+        from it do not seek.'''
+        return False
+
+
+    def close(self) -> None:
+        '''Closes the file.'''
+        self._file.close()
@@ -16,12 +16,13 @@ class QiQuery:
         self._sensitiveColumns = sensitiveColumns
         self._quasiIdentifyingColumns = quasiIdentifyingColumns
         self._blindSymbol = blindSymbol
-        if not quasiIdentifyingColumns:
-            self._NOBLIND = EMPTY_WHERE
-            self._ALLBLIND = EMPTY_WHERE
-        else:
-            self._NOBLIND = self.createQueryString(self.OR, f"IS DISTINCT FROM '{blindSymbol}'")
-            self._ALLBLIND = self.createQueryString(self.AND, f"= '{blindSymbol}'")
+        # Parsed column lists and built conditions, by their input
+        self._columnLists = dict()
+        self._conditions = dict()
+        self._identifyingColumnsList = self.commaSeparatedColumnsAsList(identifyingColumns)
+        self._quasiIdentifyingColumnsList = self.commaSeparatedColumnsAsList(quasiIdentifyingColumns)
+        self._sensitiveColumnsList = self.commaSeparatedColumnsAsList(sensitiveColumns)
+        self._quotedQuasiIdentifyingColumns = ', '.join([self.quoteIdentifier(col) for col in self._quasiIdentifyingColumnsList])
 
     
     @property
@@ -43,29 +44,64 @@ class QiQuery:
 
 
     @property
-    def blindSymbol(self):
-        '''The current suppressed value symbol.'''
-        return self._blindSymbol
+    def identifyingColumnsList(self):
+        '''The identifying columns as a list.'''
+        return list(self._identifyingColumnsList)
 
 
     @property
-    def NOBLIND(self):
-        '''Non blind values query clause.'''
-        return self._NOBLIND
+    def quasiIdentifyingColumnsList(self):
+        '''The QID columns as a list.'''
+        return list(self._quasiIdentifyingColumnsList)
 
 
     @property
-    def ALLBLIND(self):
-        '''All blind values query clause.'''
-        return self._ALLBLIND
+    def sensitiveColumnsList(self):
+        '''The sensitive columns as a list.'''
+        return list(self._sensitiveColumnsList)
+
+
+    @property
+    def quotedQuasiIdentifyingColumns(self):
+        '''The QID columns as a comma separated list of quoted identifiers.'''
+        return self._quotedQuasiIdentifyingColumns
+
+
+    @property
+    def blindSymbol(self):
+        '''The current suppressed value symbol.'''
+        return self._blindSymbol
 
 
     def commaSeparatedColumnsAsList(self, columns) -> list:
         '''Converts a comma separated string to list of strings'''
-        if not columns.strip():
-            return list()
-
-        return list(filter(lambda x: x != '', map(lambda x: re.sub(r'\s+', '_', x.strip()), columns.split(','))))
+        if columns not in self._columnLists:
+            if not columns.strip():
+                self._columnLists[columns] = list()
+            else:
+                self._columnLists[columns] = list(filter(lambda x: x != '', map(lambda x: re.sub(r'\s+', '_', x.strip()), columns.split(','))))
+        return list(self._columnLists[columns])
+
+
+    def quoteIdentifier(self, column: str) -> str:
+        '''Quotes a column name for use in a query.'''
+        return '"' + str(column).replace('"', '""') + '"'
+
+
+    def parameterizedCondition(self, clause: str, operation: str, columns: list, expression: str = '{}') -> str:
+        '''Returns a condition of the form "col" operation ? AND/OR "col" operation ? ...
+        for the given columns, with a parameter to bind for every column. The quoted
+        column can be wrapped in an expression, e.g. 'CAST({} AS VARCHAR)'. Conditions
+        are built once per shape (clause, operation, columns, expression) and reused.'''
+        shape = (clause, operation.strip(), tuple(columns), expression)
+        if shape not in self._conditions:
+            if 'AND' not in clause and 'OR' not in clause:
+                logging.warning(f'Illegal clause: {clause}! Returning dummy condition.')
+                self._conditions[shape] = EMPTY_WHERE
+            else:
+                self._conditions[shape] = clause.join([f'{expression.format(self.quoteIdentifier(col))} {operation.strip()} ?'
+                                                    for col in columns]) or EMPTY_WHERE
+        return self._conditions[shape]
 
 
     def createQueryString(self, clause: str, operation: str) -> str:
@@ -75,7 +111,7 @@ class QiQuery:
             logging.warning(f'Illegal clause: {clause}! Returning dummy condition.')
             return EMPTY_WHERE
         
-        return clause.join([f"{i} {operation.strip()}" for i in self.commaSeparatedColumnsAsList(self.quasiIdentifyingColumns)]).strip()
+        return clause.join([f"{i} {operation.strip()}" for i in self.quasiIdentifyingColumnsList]).strip()
 
 
     def dictToQueryString(self, clause: str, operation: str, queryDict: dict) -> str:
@@ -87,6 +123,6 @@ class QiQuery:
         res = ''
         for key, value in queryDict.items():
             if isinstance(value, str):
-                value = "'" + value + "'"
+                value = "'" + value.replace("'", "''") + "'"
             res += (str(key) + ' ' + operation.strip() + ' ' + str(value) + clause)
         return res[:-(len(clause))]
\ No newline at end of file
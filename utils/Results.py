@@ -0,0 +1,339 @@
+from dataclasses import dataclass
+from output_validation.utils.Constants import *
+
+
+def percent(fraction: float, digits: int = 3) -> str:
+    '''Formats a fraction as a percentage string of the json report.'''
+    return str(round(fraction*100, digits)) + ' %'
+
+
+def render(result) -> dict:
+    '''Renders a result as a dictionary of the json report,
+    an empty dictionary if there is no result.'''
+    return result.toDict() if result is not None else dict()
+
+
+@dataclass
+class ClassSizeResult:
+    '''Equivalence class statistics of one dataset. The histogram maps
+    class sizes to the number of classes of that size, not including
+    the completely suppressed class.'''
+    __slots__ = ('records', 'suppressed', 'histogram')
+    records: int
+    suppressed: int
+    histogram: dict
+
+
+    @property
+    def classes(self) -> int:
+        '''Number of classes, including the completely suppressed class.'''
+        return sum(self.histogram.values()) + (1 if self.suppressed else 0)
+
+
+    @property
+    def smallest(self) -> int:
+        '''Smallest class size, not including the completely suppressed class.'''
+        return min(self.histogram) if self.histogram else 0
+
+
+    @property
+    def biggest(self) -> int:
+        '''Biggest class size, not including the completely suppressed class.'''
+        return max(self.histogram) if self.histogram else 0
+
+
+    @property
+    def averageSize(self) -> float:
+        '''Average class size, including the completely suppressed class.'''
+        return self.records / self.classes
+
+
+    @property
+    def averageSizeWithoutSuppressed(self) -> float:
+        '''Average class size, without the completely suppressed class.'''
+        divisor = self.classes - 1 if self.suppressed else self.classes
+        return (self.records - self.suppressed) / (divisor if self.classes > 1 else 1)
+
+
+    def toDict(self) -> dict:
+        return {EQ_AVG_SUP: round(self.averageSize, 3),
+                EQ_AVG_NOSUP: round(self.averageSizeWithoutSuppressed, 3),
+                EQ_SUPPRESSED: self.suppressed,
+                EQ_SMALLEST: self.smallest,
+                EQ_BIGGEST: self.biggest,
+                EQ_NOCLASSES: self.classes,
+                EQ_NORECORDS: self.records,
+                EQ_HISTOGRAM: self.histogram}
+
+
+@dataclass(init=False)
+class SummaryResult:
+    '''Summary statistics of one dataset. Modes map columns to a value
+    and its count. Suppressed values per column are only known for the
+    output dataset, changed values only if the input is given as well.'''
+    __slots__ = ('records', 'distinct', 'modes', 'suppressed', 'changed', 'alignedDiff')
+    records: int
+    distinct: dict
+    modes: dict
+    suppressed: dict
+    changed: dict
+    alignedDiff: dict
+
+    def __init__(self, records: int, distinct: dict, modes: dict,
+                suppressed: dict = None, changed: dict = None, alignedDiff: dict = None):
+        self.records = records
+        self.distinct = distinct
+        self.modes = modes
+        self.suppressed = suppressed
+        self.changed = changed
+        self.alignedDiff = alignedDiff
+
+
+    @property
+    def informative(self) -> dict:
+        '''Number of values that are not suppressed per column.'''
+        if self.suppressed is None:
+            return dict([(col, self.records) for col in self.distinct])
+        return dict([(col, self.records - count) for col, count in self.suppressed.items()])
+
+
+    @property
+    def totalValues(self) -> int:
+        '''Number of values in the dataset.'''
+        return self.records * len(self.distinct)
+
+
+    @property
+    def totalSuppressed(self) -> int:
+        '''Number of suppressed values.'''
+        return sum(self.suppressed.values()) if self.suppressed is not None else 0
+
+
+    @property
+    def totalChanged(self) -> int:
+        '''Number of generalized or suppressed values.'''
+        return sum(self.changed.values()) if self.changed is not None else 0
+
+
+    @property
+    def suppressedOfChanged(self) -> float:
+        '''Fraction of the changed values that are suppressed.'''
+        return self.totalSuppressed / self.totalChanged if self.totalChanged else 0.0
+
+
+    def toDict(self) -> dict:
+        resDict = {SS_DISTINCT: self.distinct, SS_MODES: self.modes, SS_INFORMATIVE: self.informative}
+        if self.suppressed is None:
+            return resDict
+        resDict[SS_SUP] = dict([(col, [count, percent(count / self.records, 1)]) for col, count in self.suppressed.items()])
+        if self.alignedDiff is not None:
+            resDict[SS_ALIGNED_DIFF] = self.alignedDiff
+        if self.changed is None:
+            resDict[SS_GENSUP] = dict()
+            resDict[SS_TOTAL_GENSUP] = [0, '0 %']
+            resDict[SS_TOTAL_SUP] = [0, '0 %']
+            resDict[SS_SUP_OF_CHANGED] = '0 %'
+            return resDict
+        resDict[SS_GENSUP] = self.changed
+        resDict[SS_TOTAL_GENSUP] = [self.totalChanged, percent(self.totalChanged / self.totalValues)]
+        resDict[SS_TOTAL_SUP] = [self.totalSuppressed, percent(self.totalSuppressed / self.totalValues)]
+        resDict[SS_SUP_OF_CHANGED] = percent(self.suppressedOfChanged) if self.totalChanged else '0 %'
+        return resDict
+
+
+@dataclass
+class KSweepResult:
+    '''Records at risk (as a fraction), violating classes and records
+    to suppress for one k of the k sweep.'''
+    __slots__ = ('k', 'recordsAtRisk', 'classesViolating', 'suppressionNeeded')
+    k: int
+    recordsAtRisk: float
+    classesViolating: int
+    suppressionNeeded: int
+
+
+    def toDict(self) -> dict:
+        return {K_ANONYMITY: self.k,
+                AR_RECORDS_AT_RISK: percent(self.recordsAtRisk),
+                AR_CLASSES_VIOLATING: self.classesViolating,
+                AR_SUPPRESSION_NEEDED: self.suppressionNeeded}
+
+
+@dataclass(init=False)
+class AttackRiskResult:
+    '''Attacker model risks of one dataset, all risks and shares of
+    records as fractions. Records at risk are those in classes smaller
+    than the k-anonymity threshold, None without a threshold, and are only
+    rendered for output candidates. Given the sampling fraction, the number
+    of records and the estimated share of population uniques, the journalist
+    and marketer risks are based on the estimated population instead of
+    the sample.'''
+    __slots__ = ('prosecutorLowest', 'prosecutorAverage', 'prosecutorHighest', 'recordsAffectedLowest',
+                 'recordsAffectedHighest', 'population', 'kSweep', 'recordRisk',
+                 'samplingFraction', 'sampleRecords', 'populationUniqueness', 'recordsAtRisk')
+    prosecutorLowest: float
+    prosecutorAverage: float
+    prosecutorHighest: float
+    recordsAffectedLowest: float
+    recordsAffectedHighest: float
+    population: dict
+    kSweep: list
+    recordRisk: dict
+    samplingFraction: float
+    sampleRecords: int
+    populationUniqueness: float
+    recordsAtRisk: float
+
+    def __init__(self, prosecutorLowest: float, prosecutorAverage: float, prosecutorHighest: float,
+                recordsAffectedLowest: float, recordsAffectedHighest: float,
+                population: dict = None, kSweep: list = None, recordRisk: dict = None,
+                samplingFraction: float = None, sampleRecords: int = None, populationUniqueness: float = None,
+                recordsAtRisk: float = None):
+        self.prosecutorLowest = prosecutorLowest
+        self.prosecutorAverage = prosecutorAverage
+        self.prosecutorHighest = prosecutorHighest
+        self.recordsAffectedLowest = recordsAffectedLowest
+        self.recordsAffectedHighest = recordsAffectedHighest
+        self.population = population
+        self.kSweep = kSweep
+        self.recordRisk = recordRisk
+        self.samplingFraction = samplingFraction
+        self.sampleRecords = sampleRecords
+        self.populationUniqueness = populationUniqueness
+        self.recordsAtRisk = recordsAtRisk
+
+
+    @property
+    def populationBased(self) -> bool:
+        '''Whether the journalist and marketer risks are based on the
+        estimated population.'''
+        return None not in (self.samplingFraction, self.sampleRecords, self.populationUniqueness)
+
+
+    @property
+    def journalistRisk(self) -> float:
+        '''Estimated journalist risk. Without a sampling fraction the sample
+        is assumed to be the population and this is the highest prosecutor
+        risk. Otherwise a class of the sample is estimated to be the
+        sampling fraction of its population class, the risk of the smallest
+        class is scaled accordingly, unless at least one record of the
+        sample is expected to be a population unique.'''
+        if not self.populationBased:
+            return self.prosecutorHighest
+        if self.populationUniqueness * self.sampleRecords >= 1:
+            return 1.0
+        return min(1.0, self.samplingFraction * self.prosecutorHighest)
+
+
+    @property
+    def marketerRisk(self) -> float:
+        '''Estimated marketer risk, the expected share of records matched
+        correctly. Without a sampling fraction this is the average prosecutor
+        risk. Otherwise it is the average risk of the estimated population
+        classes, at least the estimated share of population uniques, which
+        are matched with certainty.'''
+        if not self.populationBased:
+            return self.prosecutorAverage
+        return max(self.populationUniqueness, min(1.0, self.samplingFraction * self.prosecutorAverage))
+
+
+    def toDict(self) -> dict:
+        resDict = {AR_PROSECUTOR_LOWEST: percent(self.prosecutorLowest),
+                AR_PROSECUTOR_AVERAGE: percent(self.prosecutorAverage),
+                AR_PROSECUTOR_HIGHEST: percent(self.prosecutorHighest),
+                AR_RECORDS_AFFECTED_LOWEST: percent(self.recordsAffectedLowest),
+                AR_RECORDS_AFFECTED_HIGHEST: percent(self.recordsAffectedHighest),
+                AR_ESTIMATED_JOURNALIST_RISK: percent(self.journalistRisk),
+                AR_ESTIMATED_MARKETER_RISK: percent(self.marketerRisk)}
+        if self.population is not None:
+            resDict[AR_POPULATION] = self.population
+        if self.kSweep is not None:
+            resDict[AR_K_SWEEP] = [render(point) for point in self.kSweep]
+        if self.recordRisk is not None:
+            resDict[AR_RECORD_RISK] = self.recordRisk
+        return resDict
+
+
+@dataclass(init=False)
+class PrivacyResult:
+    '''Smallest k, l and XY values with the violating equivalence
+    classes, and whether the values are exact or lower bounds.'''
+    __slots__ = ('k', 'kViolations', 'l', 'lViolations', 'xy', 'xyViolations', 'bounds')
+    k: int
+    kViolations: dict
+    l: int
+    lViolations: dict
+    xy: int
+    xyViolations: dict
+    bounds: dict
+
+    def __init__(self, k: int, kViolations: dict, l: int, lViolations: dict,
+                xy: int, xyViolations: dict, bounds: dict = None):
+        self.k = k
+        self.kViolations = kViolations
+        self.l = l
+        self.lViolations = lViolations
+        self.xy = xy
+        self.xyViolations = xyViolations
+        self.bounds = bounds if bounds is not None else dict()
+
+
+    def toDict(self) -> dict:
+        return {PR_K: [self.k, self.kViolations],
+                PR_L: [self.l, self.lViolations],
+                PR_XY: [self.xy, self.xyViolations]}
+
+
+@dataclass(init=False)
+class Report:
+    '''Result of a validation. Sections that were not computed are None.
+    The sections without a result class of their own are kept as
+    computed, the status tells whether every section is complete,
+    partial or skipped.'''
+    __slots__ = ('inputSummary', 'outputSummary', 'inputClasses', 'outputClasses',
+                 'privacy', 'inputRisks', 'outputRisks', 'sections', 'status')
+    inputSummary: SummaryResult
+    outputSummary: SummaryResult
+    inputClasses: ClassSizeResult
+    outputClasses: ClassSizeResult
+    privacy: PrivacyResult
+    inputRisks: AttackRiskResult
+    outputRisks: AttackRiskResult
+    sections: dict
+    status: dict
+
+    def __init__(self, inputSummary: SummaryResult = None, outputSummary: SummaryResult = None,
+                inputClasses: ClassSizeResult = None, outputClasses: ClassSizeResult = None,
+                privacy: PrivacyResult = None, inputRisks: AttackRiskResult = None,
+                outputRisks: AttackRiskResult = None, sections: dict = None, status: dict = None):
+        self.inputSummary = inputSummary
+        self.outputSummary = outputSummary
+        self.inputClasses = inputClasses
+        self.outputClasses = outputClasses
+        self.privacy = privacy
+        self.inputRisks = inputRisks
+        self.outputRisks = outputRisks
+        self.sections = sections if sections is not None else dict()
+        self.status = status if status is not None else dict()
+
+
+    def computed(self, section: str) -> bool:
+        '''Whether the section was computed, completely or partially.'''
+        return self.status.get(section) in (ST_COMPLETE, ST_PARTIAL)
+
+
+    def toDict(self) -> dict:
+        '''Renders the report in the layout of the json report.'''
+        resDict = dict()
+        if self.computed(SUMMARY_STATISTICS):
+            resDict[SUMMARY_STATISTICS] = {SS_INPUT: render(self.inputSummary), SS_OUTPUT: render(self.outputSummary)}
+        if self.computed(EQUIVALENCE_CLASSES):
+            resDict[EQUIVALENCE_CLASSES] = {EQ_INPUT: render(self.inputClasses), EQ_OUTPUT: render(self.outputClasses)}
+        if self.computed(PRIVACY_VERIFICATION):
+            resDict[PRIVACY_VERIFICATION] = render(self.privacy)
+            resDict[VERIFICATION_BOUNDS] = self.privacy.bounds if self.privacy is not None else dict()
+        if self.computed(ATTACK_RISKS):
+            resDict[ATTACK_RISKS] = {AR_INPUT: render(self.inputRisks), AR_OUTPUT: render(self.outputRisks)}
+        resDict.update(self.sections)
+        resDict[SECTION_STATUS] = self.status
+        return resDict
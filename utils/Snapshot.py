@@ -0,0 +1,180 @@
+import hmac
+import json
+import hashlib
+import logging
+import pandas as pd
+from output_validation.utils.Constants import *
+from output_validation.utils.Results import Report
+
+
+class Snapshot:
+    '''Compact record of a validation run to compare later runs against
+    without keeping the datasets: the class size histograms, the scalar
+    metrics of the report and the violating equivalence classes. Classes
+    are stored as HMACs of their QID values under a secret key that stays
+    the same across runs, so a snapshot holds no values of the dataset
+    and its size depends on the number of violating classes only. Without
+    a key the classes are plain hashes, which are only pseudonymous: the
+    QID values of a class can be found by hashing every combination of
+    small QID domains.'''
+
+    VERSION = 2
+    # Length of the hexadecimal class keys
+    KEY_LENGTH = 16
+
+    def __init__(self, report: Report, violatingClasses: pd.DataFrame = None, key: bytes = None):
+        self._report = report
+        self._violatingClasses = violatingClasses
+        self._key = key.encode('utf-8') if isinstance(key, str) else key
+
+
+    @property
+    def report(self):
+        '''Report of the run.'''
+        return self._report
+
+
+    @property
+    def violatingClasses(self):
+        '''QID values of the violating output classes with a column per
+        privacy model, None if the violations are unknown.'''
+        return self._violatingClasses
+
+
+    @property
+    def key(self):
+        '''Secret key of the class HMACs, None for plain hashes.'''
+        return self._key
+
+
+    @property
+    def keyId(self):
+        '''Identifies the key without revealing it, so snapshots with
+        different keys are not compared. None without a key.'''
+        if self.key is None:
+            return None
+        return hmac.new(self.key, b'snapshot key id', hashlib.sha256).hexdigest()[:self.KEY_LENGTH]
+
+
+    def compute(self) -> dict:
+        '''Returns the snapshot of the run.'''
+        snapshot = {SN_VERSION: self.VERSION, SN_KEY_ID: self.keyId, SN_METRICS: self.metrics(), SN_HISTOGRAMS: dict()}
+        for key, classes in [(EQ_INPUT, self.report.inputClasses), (EQ_OUTPUT, self.report.outputClasses)]:
+            if classes is not None:
+                snapshot[SN_HISTOGRAMS][key] = dict([(str(size), count) for size, count in sorted(classes.histogram.items())])
+        if self.violatingClasses is not None:
+            snapshot[SN_VIOLATIONS] = self.classKeys(self.violatingClasses)
+        return snapshot
+
+
+    def metrics(self) -> dict:
+        '''Flattens the scalar results of the report to metric names,
+        joined keys of the json report, and their values.'''
+        metrics = dict()
+        for key, classes in [(EQ_INPUT, self.report.inputClasses), (EQ_OUTPUT, self.report.outputClasses)]:
+            if classes is not None:
+                for name, value in [(EQ_NORECORDS, classes.records), (EQ_SUPPRESSED, classes.suppressed),
+                                    (EQ_NOCLASSES, classes.classes), (EQ_SMALLEST, classes.smallest),
+                                    (EQ_BIGGEST, classes.biggest), (EQ_AVG_SUP, round(classes.averageSize, 3))]:
+                    metrics[f'{key}/{name}'] = value
+
+        summary = self.report.outputSummary
+        if summary is not None:
+            for name, values in [(SS_DISTINCT, summary.distinct), (SS_SUP, summary.suppressed), (SS_GENSUP, summary.changed)]:
+                for col, value in (values or dict()).items():
+                    metrics[f'{SS_OUTPUT}/{name}/{col}'] = int(value)
+
+        privacy = self.report.privacy
+        if privacy is not None:
+            for name, value in [(PR_K, privacy.k), (PR_L, privacy.l), (PR_XY, privacy.xy)]:
+                metrics[f'{PRIVACY_VERIFICATION}/{name}'] = int(value)
+        if self.violatingClasses is not None:
+            for model in [PR_K, PR_L, PR_XY]:
+                if model in self.violatingClasses.columns:
+                    metrics[f'{PRIVACY_VERIFICATION}/{model}/{PR_VIOLATION_COUNT}'] = int(self.violatingClasses[model].sum())
+
+        for key, risks in [(AR_INPUT, self.report.inputRisks), (AR_OUTPUT, self.report.outputRisks)]:
+            if risks is not None:
+                for name, value in [(AR_PROSECUTOR_LOWEST, risks.prosecutorLowest),
+                                    (AR_PROSECUTOR_AVERAGE, risks.prosecutorAverage),
+                                    (AR_PROSECUTOR_HIGHEST, risks.prosecutorHighest),
+                                    (AR_RECORDS_AFFECTED_HIGHEST, risks.recordsAffectedHighest)]:
+                    metrics[f'{key}/{name}'] = round(value, 6)
+        return metrics
+
+
+    def classKeys(self, violatingDf: pd.DataFrame) -> dict:
+        '''Maps the key of every violating class to the privacy models
+        it violates.'''
+        qiColumns = [col for col in violatingDf.columns if col not in (PR_K, PR_L, PR_XY)]
+        models = [model for model in (PR_K, PR_L, PR_XY) if model in violatingDf.columns]
+        keys = dict()
+        for row in violatingDf.itertuples(index=False):
+            rowdict = dict(zip(violatingDf.columns, row))
+            keys[self.classKey([rowdict[col] for col in qiColumns])] = [model for model in models if rowdict[model]]
+        return dict(sorted(keys.items()))
+
+
+    def classKey(self, values: list) -> str:
+        '''HMAC, or without a key hash, of the QID values of a class. Values
+        are compared as text, integral floats as integers, so a column read
+        as numbers with and without missing values gives the same keys.'''
+        def text(value):
+            if pd.isna(value):
+                return ''
+            if isinstance(value, float) and value.is_integer():
+                return str(int(value))
+            return str(value)
+        message = '\x1f'.join(map(text, values)).encode('utf-8')
+        if self.key is None:
+            return hashlib.sha256(message).hexdigest()[:self.KEY_LENGTH]
+        return hmac.new(self.key, message, hashlib.sha256).hexdigest()[:self.KEY_LENGTH]
+
+
+    def write(self, path: str) -> None:
+        '''Writes the snapshot as compact json.'''
+        if self.key is None and self.violatingClasses is not None:
+            logging.warning('Snapshot classes are stored as plain hashes, which can be reversed for small QID domains. '
+                            'Use a snapshot key to store them as HMACs.')
+        with open(path, 'w', encoding='UTF-8') as f:
+            json.dump(self.compute(), f, separators=(',', ':'))
+        logging.info(f'Wrote snapshot to {path}')
+
+
+    def read(self, path: str) -> dict:
+        '''Reads a snapshot written by an earlier run.'''
+        with open(path, 'r', encoding='UTF-8') as f:
+            snapshot = json.load(f)
+        if snapshot.get(SN_VERSION) != self.VERSION:
+            raise ValueError(f'Unsupported snapshot version {snapshot.get(SN_VERSION)} in {path}, expected {self.VERSION}.')
+        return snapshot
+
+
+    def diff(self, baseline: dict) -> dict:
+        '''Compares the run with the snapshot of an earlier run. Returns the
+        changed metrics as [earlier, current, change] (a side of None if
+        only the other run has the metric), the change of the number of
+        classes per class size and the violating classes that appeared or
+        disappeared. Violations are compared only if both runs know them
+        and use the same key.'''
+        current = self.compute()
+        metrics = dict()
+        for name in list(dict.fromkeys(list(baseline[SN_METRICS]) + list(current[SN_METRICS]))):
+            old, new = baseline[SN_METRICS].get(name), current[SN_METRICS].get(name)
+            if old != new:
+                metrics[name] = [old, new, round(new - old, 6) if old is not None and new is not None else None]
+
+        histograms = dict()
+        for key in current[SN_HISTOGRAMS]:
+            old, new = baseline[SN_HISTOGRAMS].get(key, dict()), current[SN_HISTOGRAMS][key]
+            changes = dict([(size, new.get(size, 0) - old.get(size, 0)) for size in sorted(set(old) | set(new), key=int)])
+            histograms[key] = dict([(size, change) for size, change in changes.items() if change])
+
+        diffDict = {SD_METRICS: metrics, SD_HISTOGRAMS: histograms}
+        if SN_VIOLATIONS in baseline and SN_VIOLATIONS in current and baseline.get(SN_KEY_ID) != current[SN_KEY_ID]:
+            logging.warning('The baseline snapshot was written with a different snapshot key, violating classes are not compared.')
+        elif SN_VIOLATIONS in baseline and SN_VIOLATIONS in current:
+            old, new = baseline[SN_VIOLATIONS], current[SN_VIOLATIONS]
+            diffDict[SD_NEW_VIOLATIONS] = dict([(key, models) for key, models in new.items() if key not in old])
+            diffDict[SD_RESOLVED_VIOLATIONS] = [key for key in old if key not in new]
+        return diffDict
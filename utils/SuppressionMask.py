@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+from output_validation.utils import QiQuery
+
+
+class SuppressionMask:
+    '''Suppressed cells of a dataset, detected once when the dataset is
+    loaded. Holds a boolean mask per column and, over the QID columns,
+    whether a record is completely or partly suppressed. Columns with a
+    non-object dtype cannot contain the blind symbol and are never
+    compared against it.'''
+
+    def __init__(self, df: pd.DataFrame, qiQueryHelper: QiQuery):
+        self._columns = list(df.columns)
+        self._masks = np.zeros((len(self._columns), df.shape[0]), dtype=bool)
+        for i, col in enumerate(self._columns):
+            if df[col].dtype == object or pd.api.types.is_string_dtype(df[col].dtype):
+                self._masks[i] = (df[col] == qiQueryHelper.blindSymbol).fillna(False).to_numpy(dtype=bool)
+
+        qiIndexes = [self._columns.index(col) for col in
+                    qiQueryHelper.quasiIdentifyingColumnsList if col in self._columns]
+        if qiIndexes:
+            self._fullySuppressed = self._masks[qiIndexes].all(axis=0)
+            self._anySuppressed = self._masks[qiIndexes].any(axis=0)
+        else:
+            self._fullySuppressed = np.zeros(df.shape[0], dtype=bool)
+            self._anySuppressed = np.zeros(df.shape[0], dtype=bool)
+
+
+    @property
+    def columns(self):
+        '''Columns of the dataset.'''
+        return self._columns
+
+
+    @property
+    def fullySuppressed(self):
+        '''Records with all QID values suppressed.'''
+        return self._fullySuppressed
+
+
+    @property
+    def anySuppressed(self):
+        '''Records with at least one QID value suppressed.'''
+        return self._anySuppressed
+
+
+    @property
+    def nrFullySuppressed(self):
+        '''Size of the completely suppressed equivalence class.'''
+        return int(self.fullySuppressed.sum())
+
+
+    def mask(self, col: str) -> np.ndarray:
+        '''Suppressed cells of the column.'''
+        return self._masks[self._columns.index(col)]
+
+
+    def suppressedCounts(self) -> dict:
+        '''Number of suppressed values per column.'''
+        return dict(zip(self._columns, self._masks.sum(axis=1).tolist()))